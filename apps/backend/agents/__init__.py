@@ -2,5 +2,10 @@ from .weather import WeatherAgent
 from .ports import PortsAgent
 from .grid import GridAgent
 from .alerts import AlertsAgent
+from .alerts_store import AlertStore
+from .http_pool import HTTPPool, get_http_pool, close_http_pool, refresh_all
+from .scheduler import RefreshScheduler
 
-__all__ = ['WeatherAgent', 'PortsAgent', 'GridAgent', 'AlertsAgent']
+__all__ = ['WeatherAgent', 'PortsAgent', 'GridAgent', 'AlertsAgent', 'AlertStore',
+           'HTTPPool', 'get_http_pool', 'close_http_pool', 'refresh_all',
+           'RefreshScheduler']
@@ -1,12 +1,24 @@
 import pandas as pd
 import json
+import os
 from datetime import datetime, timedelta
-from pathlib import Path
+from typing import Optional
 from .base import AgentBase
+from storage import get_snapshot_registry
+from .alerts_store import AlertStore, ALERT_COLUMNS
 
 class AlertsAgent(AgentBase):
     """Agent for alerts/news data"""
     
+    # Alerts are kept in their own store; re-sent alert sets would only duplicate history
+    record_history = False
+    
+    def __init__(self, *args, capacity: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if capacity is None:
+            capacity = int(os.getenv("ALERTS_CAPACITY", "10000"))
+        self.store = AlertStore(capacity)
+    
     def fetch_live(self) -> pd.DataFrame:
         """Fetch live alerts data (placeholder for real API)"""
         # In a real implementation, this might call news APIs
@@ -15,10 +27,8 @@ class AlertsAgent(AgentBase):
     
     def load_snapshot(self) -> pd.DataFrame:
         """Load alerts snapshot from file"""
-        snapshot_path = Path("data/snapshots/alerts_sample.json")
-        if snapshot_path.exists():
-            with open(snapshot_path, 'r') as f:
-                data = json.load(f)
+        data = get_snapshot_registry().load("alerts_sample.json", lambda path: json.loads(path.read_text()))
+        if data is not None:
             return pd.DataFrame(data)
         
         # Generate sample data if snapshot doesn't exist
@@ -86,22 +96,45 @@ class AlertsAgent(AgentBase):
     def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
         """Normalize alerts data to standard schema"""
         if data.empty:
-            return pd.DataFrame(columns=['id', 'ts', 'title', 'summary', 'severity', 'tags', 'region_ids', 'asset_ids'])
-        
-        required_cols = ['id', 'ts', 'title', 'summary', 'severity', 'tags', 'region_ids', 'asset_ids']
+            return pd.DataFrame(columns=ALERT_COLUMNS)
         
         # Ensure all required columns exist
-        for col in required_cols:
+        for col in ALERT_COLUMNS:
             if col not in data.columns:
                 raise ValueError(f"Missing required column: {col}")
         
+        data = data[ALERT_COLUMNS].copy()
+        
         # Convert timestamp if needed
         if not pd.api.types.is_datetime64_any_dtype(data['ts']):
             data['ts'] = pd.to_datetime(data['ts'])
         
         # Ensure lists are properly formatted
         for col in ['tags', 'region_ids', 'asset_ids']:
-            if not data[col].apply(lambda x: isinstance(x, list)).all():
-                data[col] = data[col].apply(lambda x: x if isinstance(x, list) else [])
+            data[col] = [x if isinstance(x, list) else [] for x in data[col]]
         
-        return data[required_cols].copy()
+        return data
+    
+    def load_data(self) -> pd.DataFrame:
+        """Load alerts and ingest them into the indexed store"""
+        data = super().load_data()
+        self.store.ingest_frame(data)
+        return data
+    
+    async def load_data_async(self, force: bool = False) -> pd.DataFrame:
+        """Async load that also ingests into the indexed store"""
+        data = await super().load_data_async(force=force)
+        self.store.ingest_frame(data)
+        return data
+    
+    def adopt(self, data: pd.DataFrame):
+        """Alerts loaded by another worker still feed this worker's store"""
+        self.store.ingest_frame(data)
+    
+    def ingest(self, alerts) -> int:
+        """Push alert records (e.g. from a feed) straight into the store"""
+        return self.store.ingest(alerts)
+    
+    def page(self, **filters):
+        """One page of the alert store; see AlertStore.query"""
+        return self.store.query(**filters)
@@ -0,0 +1,168 @@
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+ALERT_COLUMNS = ['id', 'ts', 'title', 'summary', 'severity', 'tags', 'region_ids', 'asset_ids']
+INDEXED_FIELDS = ('tags', 'region_ids', 'asset_ids', 'severity')
+
+
+def to_epoch(ts: Any) -> float:
+    """Timestamp as UTC epoch seconds (naive values are taken as UTC)"""
+    stamp = pd.Timestamp(ts)
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert('UTC').tz_localize(None)
+    return stamp.value / 1e9
+
+
+class AlertStore:
+    """Bounded in-memory alert store.
+
+    Alerts live in a fixed-size ring buffer addressed by a monotonically
+    increasing sequence number (slot = seq % capacity), so ingestion is O(1)
+    and the oldest alert is evicted once the buffer is full. Inverted indexes
+    map each tag, region id, asset id and severity to the live sequence
+    numbers carrying it. Re-ingesting an id with changed content replaces
+    the previous alert (as a new, most recent entry); unchanged re-sends
+    are ignored.
+
+    Pages are returned newest-ingested first; the cursor is the sequence
+    number to continue below, so pages stay stable while new alerts arrive.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._seqs = np.full(capacity, -1, dtype=np.int64)
+        self._ts = np.zeros(capacity, dtype=np.float64)
+        self._next_seq = 0
+        self._by_id: Dict[str, int] = {}
+        self._index: Dict[str, Dict[str, Set[int]]] = {field: {} for field in INDEXED_FIELDS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    @staticmethod
+    def _keys(alert: Dict[str, Any], field: str) -> Sequence[str]:
+        value = alert.get(field)
+        if value is None:
+            return ()
+        if isinstance(value, str):
+            return (value,)
+        return value
+
+    def _unindex(self, seq: int) -> None:
+        """Drop a live alert from its slot and every index"""
+        slot = seq % self.capacity
+        alert = self._slots[slot]
+        self._slots[slot] = None
+        self._seqs[slot] = -1
+        if self._by_id.get(alert['id']) == seq:
+            del self._by_id[alert['id']]
+        for field in INDEXED_FIELDS:
+            postings = self._index[field]
+            for key in self._keys(alert, field):
+                seqs = postings.get(key)
+                if seqs is not None:
+                    seqs.discard(seq)
+                    if not seqs:
+                        del postings[key]
+
+    def _append(self, alert: Dict[str, Any]) -> int:
+        previous = self._by_id.get(alert['id'])
+        if previous is not None:
+            # Periodic snapshot reloads re-send unchanged alerts; keep their slot
+            if self._slots[previous % self.capacity] == alert:
+                return previous
+            self._unindex(previous)
+
+        seq = self._next_seq
+        self._next_seq += 1
+        slot = seq % self.capacity
+        if self._slots[slot] is not None:
+            self._unindex(int(self._seqs[slot]))
+
+        self._slots[slot] = alert
+        self._seqs[slot] = seq
+        self._ts[slot] = to_epoch(alert['ts'])
+        self._by_id[alert['id']] = seq
+        for field in INDEXED_FIELDS:
+            postings = self._index[field]
+            for key in self._keys(alert, field):
+                postings.setdefault(key, set()).add(seq)
+        return seq
+
+    def ingest(self, alerts: Iterable[Dict[str, Any]]) -> int:
+        """Append a batch of alert records under a single lock acquisition"""
+        batch = [dict(alert) for alert in alerts]
+        for alert in batch:
+            for field in ('id', 'ts'):
+                if alert.get(field) is None:
+                    raise ValueError(f"Alert missing required field '{field}': {alert}")
+            if isinstance(alert['ts'], pd.Timestamp):
+                alert['ts'] = alert['ts'].to_pydatetime()
+        with self._lock:
+            for alert in batch:
+                self._append(alert)
+        return len(batch)
+
+    def ingest_frame(self, data: pd.DataFrame) -> int:
+        """Append the rows of a normalized alerts frame, oldest first"""
+        if data.empty:
+            return 0
+        return self.ingest(data.sort_values('ts', kind='stable').to_dict('records'))
+
+    def _candidates(self, filters: Dict[str, Optional[Sequence[str]]]) -> np.ndarray:
+        """Live sequence numbers matching every field filter (any value per field)"""
+        matched: Optional[Set[int]] = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            postings = self._index[field]
+            union: Set[int] = set()
+            for value in values:
+                union |= postings.get(value, set())
+            matched = union if matched is None else matched & union
+            if not matched:
+                return np.empty(0, dtype=np.int64)
+        if matched is None:
+            return self._seqs[self._seqs >= 0]
+        return np.fromiter(matched, dtype=np.int64, count=len(matched))
+
+    def query(self, tags: Optional[Sequence[str]] = None,
+              region_ids: Optional[Sequence[str]] = None,
+              asset_ids: Optional[Sequence[str]] = None,
+              severity: Optional[Sequence[str]] = None,
+              start: Any = None, end: Any = None,
+              cursor: Optional[int] = None,
+              limit: Optional[int] = 100) -> Tuple[List[Dict[str, Any]], Optional[int], int]:
+        """Filter alerts and return (page, next_cursor, total_matches); limit=None returns every match"""
+        filters = {'tags': tags, 'region_ids': region_ids, 'asset_ids': asset_ids, 'severity': severity}
+        with self._lock:
+            seqs = self._candidates(filters)
+            slots = seqs % self.capacity
+            mask = np.ones(len(seqs), dtype=bool)
+            if start is not None:
+                mask &= self._ts[slots] >= to_epoch(start)
+            if end is not None:
+                mask &= self._ts[slots] <= to_epoch(end)
+            seqs = seqs[mask]
+            total = len(seqs)
+            if cursor is not None:
+                seqs = seqs[seqs < cursor]
+            seqs = np.sort(seqs)[::-1]
+            if limit is not None:
+                seqs = seqs[:limit + 1]
+            page = [self._slots[seq % self.capacity] for seq in seqs[:limit].tolist()]
+
+        next_cursor = int(seqs[limit - 1]) if limit is not None and len(seqs) > limit else None
+        return page, next_cursor, total
+
+    @staticmethod
+    def frame(alerts: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Alert records as a DataFrame in the standard column order"""
+        return pd.DataFrame(alerts, columns=ALERT_COLUMNS)
@@ -1,19 +1,42 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
 import pandas as pd
+import polars as pl
 from datetime import datetime, timedelta
 import os
 import json
 from pathlib import Path
+from world import WorldRepository, get_world_repository
+from storage import FileLock, file_lock_async, read_frame, write_frame
+from metrics import Histogram
+from profiling import Phase
+from payloads.arrow import polars_to_frame
+
+LOAD_SECONDS = Histogram('agent_load_seconds', 'Agent load_data latency by where the data came from',
+                         labels=('agent', 'outcome'))
+
+def region_expr() -> pl.Expr:
+    """Region label derived from region_id"""
+    return pl.when(pl.col('region_id') == '').then(pl.lit('Unknown')).otherwise(pl.col('region_id'))
 
 class AgentBase(ABC):
     """Base class for all data agents"""
     
-    def __init__(self, cache_dir: str = ".cache", ttl_minutes: int = 30):
+    # Whether scheduled refreshes are appended to the layer history store
+    record_history = True
+    
+    # Graph-backed layers: asset types shown per planet and the layer's columns
+    layer_asset_types: Dict[str, List[str]] = {}
+    output_columns: List[str] = ['id', 'name', 'lat', 'lon', 'region']
+    
+    def __init__(self, cache_dir: str = ".cache", ttl_minutes: int = 30,
+                 world: Optional[WorldRepository] = None):
+        # Created on first write (locks and atomic writes make parent directories)
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
         self.ttl_minutes = ttl_minutes
         self.use_offline = os.getenv("USE_OFFLINE_SNAPSHOTS", "true").lower() == "true"
+        self.world = world if world is not None else get_world_repository()
     
     @abstractmethod
     def fetch_live(self) -> pd.DataFrame:
@@ -30,6 +53,47 @@ class AgentBase(ABC):
         """Normalize data to standard schema"""
         pass
     
+    def layer_columns(self) -> List[pl.Expr]:
+        """Derived columns of a graph-backed layer, computed from world node columns"""
+        return []
+    
+    def layer_valid(self) -> pl.Expr:
+        """Range checks on the derived layer columns"""
+        return pl.lit(True)
+    
+    def pipeline(self, planet: str = 'earth', region: Optional[str] = None,
+                 asset_types: Optional[List[str]] = None,
+                 columns: Optional[List[str]] = None) -> pl.LazyFrame:
+        """Lazy layer pipeline; filters and projection are pushed down to the world scan"""
+        filters = [
+            pl.col('type') == 'asset',
+            pl.col('planet') == planet,
+            pl.col('asset_type').is_in(asset_types or self.layer_asset_types.get(planet, [])),
+        ]
+        if region is not None:
+            filters.append(pl.col('region_id') == region)
+        
+        return (
+            self.world.scan()
+            .filter(*filters)
+            # Add derived fields expected by frontend
+            .with_columns(*self.layer_columns(), region_expr().alias('region'))
+            .filter(self.layer_valid())
+            .select(columns or self.output_columns)
+        )
+    
+    def query(self, **filters) -> pl.DataFrame:
+        """Run the lazy pipeline with the given planet/region/asset-type filters"""
+        return self.pipeline(**filters).collect()
+    
+    def _load_from_graph(self) -> pd.DataFrame:
+        """Load this agent's layer from the shared world repository"""
+        try:
+            return polars_to_frame(self.query())
+        except Exception as e:
+            print(f"Failed to load {self.__class__.__name__} from graph: {e}")
+            return pd.DataFrame()
+    
     def get_cache_path(self) -> Path:
         """Get cache file path for this agent"""
         return self.cache_dir / f"{self.__class__.__name__.lower()}.parquet"
@@ -43,34 +107,99 @@ class AgentBase(ABC):
         cache_age = datetime.now() - datetime.fromtimestamp(cache_path.stat().st_mtime)
         return cache_age < timedelta(minutes=self.ttl_minutes)
     
-    def load_data(self) -> pd.DataFrame:
-        """Load data with caching and offline fallback"""
-        # Try cache first
+    async def fetch_live_async(self) -> pd.DataFrame:
+        """Fetch live data without blocking the event loop.
+
+        Agents with real upstream APIs override this to use the shared
+        pooled client; the default runs ``fetch_live`` in a worker thread.
+        """
+        return await asyncio.to_thread(self.fetch_live)
+    
+    def get_lock_path(self) -> Path:
+        """Lock file serializing live refreshes of this agent across workers"""
+        return self.cache_dir / f"{self.__class__.__name__.lower()}.lock"
+    
+    def _load_cached(self) -> Optional[pd.DataFrame]:
+        """Return cached data if it is still valid"""
         if self.is_cache_valid():
             try:
-                return pd.read_parquet(self.get_cache_path())
+                return read_frame(self.get_cache_path())
             except Exception as e:
                 print(f"Cache load failed: {e}")
+        return None
+    
+    def _store_live(self, live_data: pd.DataFrame) -> pd.DataFrame:
+        """Normalize and cache freshly fetched data"""
+        normalized = self.normalize(live_data)
+        try:
+            # Temp file + rename: other workers never read a partial cache file
+            write_frame(normalized, self.get_cache_path())
+        except Exception as e:
+            print(f"Cache write failed: {e}")
+        return normalized
+    
+    def _load_snapshot_fallback(self) -> Tuple[str, pd.DataFrame]:
+        """Load snapshot data, or an empty frame as last resort"""
+        try:
+            snapshot_data = self.load_snapshot()
+            return 'snapshot', self.normalize(snapshot_data)
+        except Exception as e:
+            print(f"Snapshot load failed: {e}")
+            return 'empty', pd.DataFrame()
+    
+    def _observe(self, phase: Phase, outcome: str, data: pd.DataFrame) -> pd.DataFrame:
+        """Record where a load's data came from (cache, live, snapshot, empty)"""
+        LOAD_SECONDS.labels(self.__class__.__name__, outcome).observe(phase.finish(outcome))
+        return data
+    
+    def load_data(self) -> pd.DataFrame:
+        """Load data with caching and offline fallback"""
+        phase = Phase(f"agent.{self.__class__.__name__}")
+        # Try cache first
+        cached = self._load_cached()
+        if cached is not None:
+            return self._observe(phase, 'cache', cached)
         
         # Try live data if not offline mode
         if not self.use_offline:
             try:
-                live_data = self.fetch_live()
-                normalized = self.normalize(live_data)
-                # Cache the result
-                normalized.to_parquet(self.get_cache_path())
-                return normalized
+                with FileLock(self.get_lock_path()):
+                    # Another worker may have refreshed the cache while we waited
+                    cached = self._load_cached()
+                    if cached is not None:
+                        return self._observe(phase, 'cache', cached)
+                    return self._observe(phase, 'live', self._store_live(self.fetch_live()))
             except Exception as e:
                 print(f"Live data fetch failed: {e}")
         
         # Fallback to snapshot
-        try:
-            snapshot_data = self.load_snapshot()
-            return self.normalize(snapshot_data)
-        except Exception as e:
-            print(f"Snapshot load failed: {e}")
-            # Return empty DataFrame as last resort
-            return pd.DataFrame()
+        return self._observe(phase, *self._load_snapshot_fallback())
+    
+    async def load_data_async(self, force: bool = False) -> pd.DataFrame:
+        """Async variant of load_data using fetch_live_async.
+
+        ``force`` skips the cache and goes straight to the live source.
+        """
+        phase = Phase(f"agent.{self.__class__.__name__}")
+        cached = None if force else self._load_cached()
+        if cached is not None:
+            return self._observe(phase, 'cache', cached)
+        
+        if not self.use_offline:
+            try:
+                async with file_lock_async(self.get_lock_path()):
+                    cached = None if force else self._load_cached()
+                    if cached is not None:
+                        return self._observe(phase, 'cache', cached)
+                    return self._observe(phase, 'live', self._store_live(await self.fetch_live_async()))
+            except Exception as e:
+                print(f"Live data fetch failed: {e}")
+        
+        return self._observe(phase, *self._load_snapshot_fallback())
+    
+    def adopt(self, data: pd.DataFrame):
+        """Hook for data loaded by another worker (via the shared layer cache)"""
+        pass
     
     def clear_cache(self):
         """Clear cached data"""
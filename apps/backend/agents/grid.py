@@ -1,22 +1,17 @@
 import pandas as pd
-import json
-import os
-from datetime import datetime
-from pathlib import Path
+import polars as pl
+from typing import Dict, List
 from .base import AgentBase
 
 class GridAgent(AgentBase):
     """Agent for power grid data"""
     
-    def _get_data_path(self) -> Path:
-        """Get path to world_nodes.json, resolving relative to backend directory"""
-        # Try relative to current working directory first (for CI)
-        rel_path = Path("data/world_nodes.json")
-        if rel_path.exists():
-            return rel_path
-        # Fallback: relative to this file's parent's parent (backend directory)
-        backend_dir = Path(__file__).parent.parent
-        return backend_dir / "data" / "world_nodes.json"
+    # Asset types shown on the grid layer, per planet
+    layer_asset_types: Dict[str, List[str]] = {
+        'earth': ['grid'],
+        'mars': ['colony', 'life_support', 'transport', 'power'],
+    }
+    output_columns = ['id', 'name', 'region', 'capacity_mw', 'load_mw', 'stress_index']
     
     def fetch_live(self) -> pd.DataFrame:
         """Fetch live grid data"""
@@ -28,30 +23,21 @@ class GridAgent(AgentBase):
         """Load grid snapshot"""
         return self._load_from_graph()
         
-    def _load_from_graph(self) -> pd.DataFrame:
-        """Load grid nodes from world_nodes.json"""
-        try:
-            data_path = self._get_data_path()
-            with open(data_path, "r") as f:
-                data = json.load(f)
-            
-            grids = [
-                n for n in data.get("nodes", []) 
-                if n.get("type") == "asset" and n.get("asset_type") == "grid"
-            ]
-            
-            # Add derived fields expected by frontend
-            for g in grids:
-                capacity = g.get('capacity', 100000)
-                g['capacity_mw'] = capacity
-                g['load_mw'] = capacity * 0.8 # Synthetic load
-                g['stress_index'] = 0.85 # Synthetic stress
-                g['region'] = g.get('region_id', 'Unknown') # Map region_id to name if needed
-            
-            return pd.DataFrame(grids)
-        except Exception as e:
-            print(f"Failed to load grid from graph: {e}")
-            return pd.DataFrame()
+    def layer_columns(self) -> List[pl.Expr]:
+        """Grid layer columns: capacity with synthetic load and stress"""
+        capacity = pl.col('capacity').fill_null(100000)
+        return [
+            capacity.alias('capacity_mw'),
+            (capacity * 0.8).alias('load_mw'), # Synthetic load
+            pl.lit(0.85).alias('stress_index'), # Synthetic stress
+        ]
+    
+    def layer_valid(self) -> pl.Expr:
+        return (
+            (pl.col('capacity_mw') >= 0) &
+            pl.col('load_mw').is_between(0, pl.col('capacity_mw')) &
+            pl.col('stress_index').is_between(0, 1)
+        )
     
     def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
         """Normalize grid data to standard schema"""
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import weakref
+from typing import Dict, Any, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import pandas as pd
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HTTPPool:
+    """Shared keep-alive AsyncClient with per-host limits and retries"""
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10,
+                 per_host_limit: int = 4, retries: int = 3, backoff_s: float = 0.25,
+                 timeout_s: float = 10.0):
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+            ),
+            timeout=timeout_s,
+        )
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _slot(self, url: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent requests to one host"""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.per_host_limit)
+            self._host_slots[host] = slot
+        return slot
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request, retrying transport errors and retryable statuses"""
+        async with self._slot(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                        response.raise_for_status()
+                        return response
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                await asyncio.sleep(self.backoff_s * (2 ** attempt))
+        raise RuntimeError("unreachable")
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """GET with pooling and retries"""
+        return await self.request("GET", url, **kwargs)
+
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+
+# One pool per event loop: AsyncClient and semaphores are bound to the loop
+# they were first used on.
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HTTPPool]" = weakref.WeakKeyDictionary()
+
+
+def get_http_pool() -> HTTPPool:
+    """Get the shared HTTP pool for the running event loop"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = HTTPPool(
+            max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20")),
+            per_host_limit=int(os.getenv("HTTP_POOL_PER_HOST", "4")),
+            retries=int(os.getenv("HTTP_POOL_RETRIES", "3")),
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def close_http_pool():
+    """Close the pool for the running event loop, if any"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
+
+
+async def refresh_all(agents: Iterable[Any], force: bool = True) -> List[pd.DataFrame]:
+    """Refresh several agents concurrently, preserving order"""
+    return list(await asyncio.gather(*(agent.load_data_async(force=force) for agent in agents)))
@@ -1,22 +1,17 @@
 import pandas as pd
-import json
-import os
-from datetime import datetime
-from pathlib import Path
+import polars as pl
+from typing import Dict, List
 from .base import AgentBase
 
 class PortsAgent(AgentBase):
     """Agent for major world ports data"""
     
-    def _get_data_path(self) -> Path:
-        """Get path to world_nodes.json, resolving relative to backend directory"""
-        # Try relative to current working directory first (for CI)
-        rel_path = Path("data/world_nodes.json")
-        if rel_path.exists():
-            return rel_path
-        # Fallback: relative to this file's parent's parent (backend directory)
-        backend_dir = Path(__file__).parent.parent
-        return backend_dir / "data" / "world_nodes.json"
+    # Asset types shown on the ports layer, per planet
+    layer_asset_types: Dict[str, List[str]] = {
+        'earth': ['port'],
+        'mars': ['colony', 'transport', 'resource', 'research'],
+    }
+    output_columns = ['id', 'name', 'lat', 'lon', 'throughput_index', 'region']
     
     def fetch_live(self) -> pd.DataFrame:
         """Fetch live port data"""
@@ -28,28 +23,15 @@ class PortsAgent(AgentBase):
         """Load ports snapshot"""
         return self._load_from_graph()
         
-    def _load_from_graph(self) -> pd.DataFrame:
-        """Load ports from world_nodes.json"""
-        try:
-            data_path = self._get_data_path()
-            with open(data_path, "r") as f:
-                data = json.load(f)
-            
-            ports = [
-                n for n in data.get("nodes", []) 
-                if n.get("type") == "asset" and n.get("asset_type") == "port"
-            ]
-            
-            # Add derived fields expected by frontend
-            for p in ports:
-                p['throughput_index'] = p.get('capacity', 0.8)
-                # Map region_id to region name if needed, or just keep as is
-                p['region'] = p.get('region_id', 'Unknown')  # Map region_id to name if needed
-            
-            return pd.DataFrame(ports)
-        except Exception as e:
-            print(f"Failed to load ports from graph: {e}")
-            return pd.DataFrame()
+    def layer_columns(self) -> List[pl.Expr]:
+        """Ports layer columns: wrapped longitude and throughput index"""
+        return [
+            ((pl.col('lon') + 180) % 360 - 180).alias('lon'),
+            pl.col('capacity').fill_null(0.8).alias('throughput_index'),
+        ]
+    
+    def layer_valid(self) -> pl.Expr:
+        return pl.col('lat').is_between(-90, 90) & pl.col('throughput_index').is_between(0, 1)
     
     def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
         """Normalize ports data to standard schema"""
@@ -0,0 +1,180 @@
+import asyncio
+import random
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+from .base import AgentBase
+from storage import LayerHistory, SharedLayerCache, file_lock_async
+
+
+class _AgentState:
+    """In-memory copy of an agent's latest data plus refresh bookkeeping"""
+
+    def __init__(self, agent: AgentBase):
+        self.agent = agent
+        self.data: Optional[pd.DataFrame] = None
+        self.loaded_at: Optional[float] = None
+        self.inflight: Optional[asyncio.Task] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_duration_s: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+
+class RefreshScheduler:
+    """Refreshes agents ahead of their TTL and serves stale data meanwhile.
+
+    Reads never wait on an upstream source once an agent has data: a stale
+    read returns the previous frame and kicks off a background refresh.
+    Concurrent misses for the same agent share one in-flight fetch.
+
+    With a ``shared`` layer cache, workers publish refreshed layers there and
+    adopt a layer another worker refreshed recently instead of fetching it
+    again; a file lock per layer keeps one worker fetching at a time.
+
+    With a ``history`` store, every fetched layer is also appended to it
+    (adopted copies are not, the worker that fetched them already did).
+    """
+
+    def __init__(self, agents: Dict[str, AgentBase], refresh_ahead: float = 0.8,
+                 jitter: float = 0.1, seed: Optional[int] = None,
+                 shared: Optional[SharedLayerCache] = None,
+                 history: Optional[LayerHistory] = None):
+        self.states = {name: _AgentState(agent) for name, agent in agents.items()}
+        self.shared = shared
+        self.history = history
+        self.refresh_ahead = refresh_ahead
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._loops: Dict[str, asyncio.Task] = {}
+
+    def _ttl_s(self, state: _AgentState) -> float:
+        return state.agent.ttl_minutes * 60.0
+
+    def _age_s(self, state: _AgentState) -> Optional[float]:
+        if state.loaded_at is None:
+            return None
+        return time.monotonic() - state.loaded_at
+
+    def is_stale(self, name: str) -> bool:
+        """Whether the agent's data is missing or older than its TTL"""
+        state = self.states[name]
+        age = self._age_s(state)
+        return age is None or age >= self._ttl_s(state)
+
+    async def _fetch(self, name: str, state: _AgentState) -> pd.DataFrame:
+        """Load a layer from its agent and record it in the history store"""
+        data = await state.agent.load_data_async(force=True)
+        if self.history is not None and state.agent.record_history:
+            try:
+                await asyncio.to_thread(self.history.append, name, data)
+            except Exception as e:
+                print(f"Layer history append failed for {name}: {e}")
+        return data
+
+    async def _load(self, name: str, state: _AgentState) -> Tuple[pd.DataFrame, float]:
+        """Fetch a layer, or adopt a fresh copy from the shared cache. Returns (data, age_s)."""
+        if self.shared is None:
+            return await self._fetch(name, state), 0.0
+        async with file_lock_async(self.shared.lock_path(name)):
+            fresh_s = self._ttl_s(state) * self.refresh_ahead
+            hit = await asyncio.to_thread(self.shared.get, name, fresh_s)
+            if hit is not None:
+                state.agent.adopt(hit[0])
+                return hit
+            data = await self._fetch(name, state)
+            try:
+                await asyncio.to_thread(self.shared.put, name, data)
+            except Exception as e:
+                print(f"Shared layer cache write failed for {name}: {e}")
+            return data, 0.0
+
+    async def _run_refresh(self, name: str, state: _AgentState) -> pd.DataFrame:
+        started = time.perf_counter()
+        try:
+            data, age_s = await self._load(name, state)
+            state.data = data
+            state.loaded_at = time.monotonic() - age_s
+            state.refresh_count += 1
+            state.last_error = None
+            return data
+        except Exception as e:
+            state.failure_count += 1
+            state.last_error = str(e)
+            raise
+        finally:
+            state.last_duration_s = time.perf_counter() - started
+            state.inflight = None
+
+    def refresh(self, name: str) -> "asyncio.Task[pd.DataFrame]":
+        """Start a refresh, or join the one already in flight (single-flight)"""
+        state = self.states[name]
+        if state.inflight is None:
+            task = asyncio.get_running_loop().create_task(self._run_refresh(name, state))
+            # Background refresh failures are recorded in stats, not raised
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            state.inflight = task
+        return state.inflight
+
+    async def get(self, name: str) -> pd.DataFrame:
+        """Get agent data, serving stale data while a refresh runs"""
+        state = self.states[name]
+        if state.data is None:
+            # Cold miss: every caller awaits the same fetch
+            return await asyncio.shield(self.refresh(name))
+        if self.is_stale(name):
+            self.refresh(name)
+        return state.data
+
+    def _next_delay_s(self, state: _AgentState) -> float:
+        """Time until the next proactive refresh, with jitter"""
+        base = self._ttl_s(state) * self.refresh_ahead
+        age = self._age_s(state) or 0.0
+        spread = base * self.jitter
+        return max(0.0, base - age + self._rng.uniform(-spread, spread))
+
+    async def _refresh_loop(self, name: str):
+        state = self.states[name]
+        while True:
+            if state.data is not None:
+                await asyncio.sleep(self._next_delay_s(state))
+            try:
+                await asyncio.shield(self.refresh(name))
+            except Exception as e:
+                print(f"Background refresh of {name} failed: {e}")
+                # Back off before retrying a failing source
+                await asyncio.sleep(self._ttl_s(state) * self.jitter)
+
+    def start(self):
+        """Start one background refresh loop per agent"""
+        loop = asyncio.get_running_loop()
+        for name in self.states:
+            if name not in self._loops:
+                self._loops[name] = loop.create_task(self._refresh_loop(name))
+
+    async def stop(self):
+        """Cancel background refresh loops"""
+        tasks = list(self._loops.values())
+        self._loops = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-agent staleness and refresh timings"""
+        result = {}
+        for name, state in self.states.items():
+            age = self._age_s(state)
+            result[name] = {
+                'age_s': age,
+                'ttl_s': self._ttl_s(state),
+                'stale': self.is_stale(name),
+                'refreshing': state.inflight is not None,
+                'refresh_count': state.refresh_count,
+                'failure_count': state.failure_count,
+                'last_refresh_duration_s': state.last_duration_s,
+                'last_error': state.last_error,
+            }
+        return result
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from agents import AlertStore
+
+BASE = datetime(2026, 1, 1)
+
+
+def make_alert(i, **overrides):
+    alert = {
+        'id': f'a{i}',
+        'ts': BASE + timedelta(minutes=i),
+        'title': f'Alert {i}',
+        'summary': '',
+        'severity': ['low', 'medium', 'high'][i % 3],
+        'tags': ['energy'] if i % 2 else ['shipping'],
+        'region_ids': [f'r{i % 4}'],
+        'asset_ids': [f'asset{i % 5}'],
+    }
+    alert.update(overrides)
+    return alert
+
+
+def test_index_filters_match_brute_force():
+    store = AlertStore(capacity=1000)
+    alerts = [make_alert(i) for i in range(200)]
+    store.ingest(alerts)
+
+    page, _, total = store.query(tags=['energy'], severity=['high', 'low'], limit=1000)
+    expected = {a['id'] for a in alerts if 'energy' in a['tags'] and a['severity'] in ('high', 'low')}
+    assert {a['id'] for a in page} == expected and total == len(expected)
+
+    page, _, _ = store.query(region_ids=['r1'], asset_ids=['asset3'],
+                             start=BASE + timedelta(minutes=50), end=BASE + timedelta(minutes=150),
+                             limit=1000)
+    expected = {a['id'] for a in alerts[50:151] if a['region_ids'] == ['r1'] and a['asset_ids'] == ['asset3']}
+    assert {a['id'] for a in page} == expected
+
+
+def test_ring_buffer_evicts_oldest_and_replaces_ids():
+    store = AlertStore(capacity=3)
+    store.ingest(make_alert(i) for i in range(5))
+    page, _, _ = store.query()
+    assert [a['id'] for a in page] == ['a4', 'a3', 'a2']
+    assert store.query(tags=['shipping'])[0] == [make_alert(4), make_alert(2)]
+
+    # Unchanged re-sends are no-ops; a changed alert moves to the head
+    store.ingest([make_alert(3)])
+    assert [a['id'] for a in store.query()[0]] == ['a4', 'a3', 'a2']
+    store.ingest([make_alert(3, severity='critical')])
+    assert [a['id'] for a in store.query()[0]] == ['a3', 'a4']
+    assert [a['id'] for a in store.query(severity=['critical'])[0]] == ['a3']
+    assert store.query(severity=['low'])[0] == []
+
+
+def test_cursor_pagination_stable_under_appends():
+    store = AlertStore(capacity=1000)
+    store.ingest(make_alert(i) for i in range(25))
+    seen, cursor = [], None
+    while True:
+        page, cursor, _ = store.query(cursor=cursor, limit=10)
+        seen.extend(a['id'] for a in page)
+        # New alerts arriving mid-scan do not shift later pages
+        store.ingest([make_alert(100 + len(seen))])
+        if cursor is None:
+            break
+    assert seen == [f'a{i}' for i in range(24, -1, -1)]
+
+
+def test_ingest_does_not_block_reads():
+    store = AlertStore(capacity=20000)
+    batches = [[make_alert(i * 500 + j) for j in range(500)] for i in range(40)]
+
+    def writer():
+        for batch in batches:
+            store.ingest(batch)
+
+    thread = threading.Thread(target=writer)
+    started = time.perf_counter()
+    thread.start()
+    reads = 0
+    while thread.is_alive():
+        store.query(tags=['energy'], limit=50)
+        reads += 1
+    thread.join()
+    elapsed = time.perf_counter() - started
+
+    assert len(store) == 20000
+    assert 20000 / elapsed > 2000  # alerts per second, with concurrent reads
+    assert reads > 0
+
+
+def test_alerts_endpoint_pagination():
+    from main import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/alerts", params={"limit": 2})
+            second = await client.get("/alerts", params={"limit": 2, "cursor": first.headers["x-next-cursor"]})
+            energy = await client.get("/alerts", params={"tags": "energy"})
+            everything = await client.get("/alerts")
+            return first, second, energy, everything
+
+    first, second, energy, everything = asyncio.run(run())
+    assert first.status_code == 200 and len(first.json()) == 2
+    assert not {a['id'] for a in first.json()} & {a['id'] for a in second.json()}
+    assert all('energy' in a['tags'] for a in energy.json())
+    assert int(energy.headers["x-total-count"]) == len(energy.json())
+    # Without limit or cursor the endpoint is unpaginated
+    assert len(everything.json()) == int(everything.headers["x-total-count"])
+    assert "x-next-cursor" not in everything.headers
@@ -0,0 +1,96 @@
+import pytest
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents import WeatherAgent, PortsAgent, GridAgent, HTTPPool, get_http_pool, close_http_pool, refresh_all
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Local Open-Meteo stand-in; fails the first `fail_first` requests"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.peers.add(self.client_address)
+        if server.requests <= server.fail_first:
+            body = b"{}"
+            self.send_response(503)
+        else:
+            body = json.dumps([{"current": {"temperature_2m": 21.5}}] * 64).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = 0
+    server.fail_first = 0
+    server.peers = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+
+
+def test_weather_fetch_live_async_uses_pool(stub_server):
+    agent = WeatherAgent()
+    agent.api_url = _url(stub_server)
+
+    async def run():
+        frames = [await agent.fetch_live_async() for _ in range(3)]
+        await close_http_pool()
+        return frames
+
+    frames = asyncio.run(run())
+    assert all((df['temp_c'] == 21.5).all() for df in frames)
+    # Keep-alive: sequential requests share one connection
+    assert stub_server.requests == 3
+    assert len(stub_server.peers) == 1
+
+
+def test_pool_retries_with_backoff(stub_server):
+    stub_server.fail_first = 2
+
+    async def run():
+        pool = HTTPPool(retries=3, backoff_s=0.001)
+        try:
+            return await pool.get(_url(stub_server))
+        finally:
+            await pool.aclose()
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert stub_server.requests == 3
+
+
+def test_refresh_all_runs_agents_concurrently(stub_server):
+    weather = WeatherAgent()
+    weather.api_url = _url(stub_server)
+    weather.use_offline = False
+    weather._store_live = weather.normalize  # keep the test free of cache writes
+    agents = [weather, PortsAgent(), GridAgent()]
+
+    async def run():
+        assert get_http_pool() is get_http_pool()
+        frames = await refresh_all(agents)
+        await close_http_pool()
+        return frames
+
+    weather_df, ports_df, grid_df = asyncio.run(run())
+    assert (weather_df['temp_c'] == 21.5).all()
+    assert not ports_df.empty
+    assert not grid_df.empty
@@ -0,0 +1,65 @@
+import asyncio
+
+import httpx
+import polars as pl
+
+from agents import PortsAgent, GridAgent
+
+
+def test_mars_layers_not_empty():
+    ports = PortsAgent().query(planet='mars')
+    grid = GridAgent().query(planet='mars')
+    assert ports.height > 0 and grid.height > 0
+    assert ports['lon'].is_between(-180, 180).all()
+    assert set(ports.columns) == set(PortsAgent.output_columns)
+
+
+def test_earth_pipeline_matches_load_data():
+    agent = PortsAgent()
+    df = agent.load_data()
+    assert sorted(df['id']) == sorted(agent.query()['id'].to_list())
+
+
+def test_filters_pushed_down_to_scan():
+    plan = PortsAgent().pipeline(planet='mars', columns=['id']).explain()
+    # planet predicate and projection are applied at the scan, not after it
+    scan = plan.splitlines()[-1]
+    assert 'planet' in scan and 'SELECTION' in scan and 'PROJECT' in scan
+
+
+def test_persisted_world_is_scanned_from_its_ipc_file(tmp_path):
+    from world import WorldRepository
+    agent = PortsAgent(world=WorldRepository(table_dir=str(tmp_path)))
+    plan = agent.pipeline(planet='mars', columns=['id']).explain()
+    assert 'Ipc SCAN' in plan and 'SELECTION' in plan
+    assert sorted(agent.query(planet='mars')['id'].to_list()) == sorted(PortsAgent().query(planet='mars')['id'].to_list())
+
+
+def test_agents_without_derived_columns_get_the_default_layer():
+    from agents import WeatherAgent
+    df = WeatherAgent().query(planet='earth', asset_types=['port'])
+    assert df.height > 0 and df.columns == ['id', 'name', 'lat', 'lon', 'region']
+
+
+def test_region_and_asset_type_filters():
+    agent = GridAgent()
+    eu = agent.query(region='eu')
+    assert eu.height > 0 and (eu['region'] == 'eu').all()
+    assert agent.query(planet='mars', asset_types=['power']).height < agent.query(planet='mars').height
+
+
+def test_layer_endpoints_accept_filters():
+    from main import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            mars = await client.get("/mars/layers/ports")
+            filtered = await client.get("/layers/grid", params={"region": "eu"})
+            bad = await client.get("/layers/ports", params={"asset_type": ","})
+            return mars, filtered, bad
+
+    mars, filtered, bad = asyncio.run(run())
+    assert mars.status_code == 200 and len(mars.json()) > 0
+    assert {row['region'] for row in filtered.json()} == {'eu'}
+    assert bad.status_code == 400
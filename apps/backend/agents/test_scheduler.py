@@ -0,0 +1,71 @@
+import pytest
+import asyncio
+import pandas as pd
+from agents import RefreshScheduler
+
+
+class SlowAgent:
+    """Minimal agent stand-in that counts live fetches"""
+
+    def __init__(self, ttl_minutes: float = 30):
+        self.ttl_minutes = ttl_minutes
+        self.calls = 0
+        self.release = None
+
+    async def load_data_async(self, force: bool = False) -> pd.DataFrame:
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return pd.DataFrame({'version': [self.calls]})
+
+
+def test_concurrent_misses_share_one_fetch():
+    agent = SlowAgent()
+    scheduler = RefreshScheduler({'slow': agent})
+
+    async def run():
+        agent.release = asyncio.Event()
+        pending = [asyncio.create_task(scheduler.get('slow')) for _ in range(20)]
+        await asyncio.sleep(0)
+        agent.release.set()
+        return await asyncio.gather(*pending)
+
+    frames = asyncio.run(run())
+    assert agent.calls == 1
+    assert all(df['version'].iloc[0] == 1 for df in frames)
+    assert scheduler.stats()['slow']['refresh_count'] == 1
+
+
+def test_stale_reads_are_served_while_refreshing():
+    agent = SlowAgent(ttl_minutes=0)
+    scheduler = RefreshScheduler({'slow': agent})
+
+    async def run():
+        first = await scheduler.get('slow')
+        agent.release = asyncio.Event()
+        # Data is immediately stale (ttl 0): reads return it and trigger one refresh
+        stale_reads = [await scheduler.get('slow') for _ in range(5)]
+        assert scheduler.stats()['slow']['refreshing']
+        agent.release.set()
+        await asyncio.sleep(0.01)
+        return first, stale_reads, await scheduler.get('slow')
+
+    first, stale_reads, fresh = asyncio.run(run())
+    assert all(df is first for df in stale_reads)
+    assert agent.calls == 3  # initial load, one background refresh, one for the last stale read
+    assert fresh['version'].iloc[0] == 2
+
+
+def test_background_loop_refreshes_before_ttl():
+    agent = SlowAgent(ttl_minutes=0.001)  # 60ms TTL
+    scheduler = RefreshScheduler({'slow': agent}, refresh_ahead=0.5, seed=1)
+
+    async def run():
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    stats = scheduler.stats()['slow']
+    assert stats['refresh_count'] >= 3
+    assert stats['last_refresh_duration_s'] is not None
@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import numpy as np
+import pandas as pd
+from agents.weather_raster import RasterRangeError, WeatherRaster
+
+
+def _points(hours=4, step=10.0):
+    """Weather points on a coarse lat/lon lattice, one frame per hour"""
+    start = datetime(2026, 1, 1)
+    lats, lons = np.meshgrid(np.arange(-85, 90, step), np.arange(-175, 180, step), indexing='ij')
+    frames = [pd.DataFrame({
+        'lat': lats.ravel(), 'lon': lons.ravel(),
+        'temp_c': np.round(15 + np.sin(np.radians(lats.ravel())) * 20 + h, 1),
+        'ts': start + timedelta(hours=h),
+    }) for h in range(hours)]
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.fixture
+def raster(tmp_path):
+    return WeatherRaster.build(tmp_path / "raster", _points(), base_res=2.0)
+
+
+def test_raster_levels_are_memory_mapped(raster, tmp_path):
+    reopened = WeatherRaster.open(tmp_path / "raster")
+    assert isinstance(reopened.levels[0], np.memmap)
+    assert reopened.levels[0].shape == (90, 180, 4)
+    # Each level halves the spatial resolution
+    assert reopened.levels[1].shape == (45, 90, 4)
+
+
+def test_raster_matches_the_points_it_was_built_from(raster):
+    points = _points()
+    hour = points[points['ts'] == raster.times[2]]
+    df = raster.query(t=2)
+    assert df['ts'].iloc[0] == raster.times[2]
+    # Every point's cell holds that point's value; empty cells are filled
+    cells = df.set_index(['lat', 'lon'])['temp_c']
+    for lat, lon, temp in hour[['lat', 'lon', 'temp_c']].itertuples(index=False):
+        assert cells[(np.floor(lat / 2) * 2 + 1, np.floor(lon / 2) * 2 + 1)] == pytest.approx(temp)
+    assert df['temp_c'].notna().all()
+
+
+def test_bbox_query_stays_inside_viewport(raster):
+    df = raster.query(bbox=(0, 40, 20, 60))
+    assert not df.empty
+    assert df['lat'].between(40, 60).all()
+    assert df['lon'].between(0, 20).all()
+
+
+def test_coarser_resolution_returns_fewer_points(raster):
+    fine = raster.query(bbox=(-60, -30, 60, 30), res=2)
+    coarse = raster.query(bbox=(-60, -30, 60, 30), res=8)
+    assert len(coarse) < len(fine) / 8
+    assert raster.choose_level(8) == 1  # coarsest available level
+
+
+def test_bbox_across_antimeridian(raster):
+    df = raster.query(bbox=(170, -10, -170, 10))
+    assert ((df['lon'] >= 170) | (df['lon'] <= -170)).all()
+    assert (df['lon'] > 0).any() and (df['lon'] < 0).any()
+
+
+def test_out_of_range_queries_are_rejected(raster):
+    with pytest.raises(RasterRangeError):
+        raster.query(t=4)
+    with pytest.raises(RasterRangeError):
+        raster.query(res=0.0001, max_cells=10_000)
+    assert len(raster.query(bbox=(0, 0, 10, 10), res=0.0001, max_cells=10_000)) == 25
+
+
+def test_attach_or_build_rebuilds_for_new_points(tmp_path):
+    root = tmp_path / "rasters"
+    first = WeatherRaster.attach_or_build(root, _points(hours=1), base_res=2.0)
+    assert WeatherRaster.attach_or_build(root, _points(hours=1), base_res=2.0).root == first.root
+
+    changed = _points(hours=1)
+    changed['temp_c'] += 5
+    second = WeatherRaster.attach_or_build(root, changed, base_res=2.0)
+    assert second.root != first.root
+    assert second.query(t=0)['temp_c'].mean() == pytest.approx(first.query(t=0)['temp_c'].mean() + 5, abs=0.1)
+
+
+def test_concurrent_builds_publish_one_raster(tmp_path):
+    root, points, rasters = tmp_path / "rasters", _points(hours=2), []
+    threads = [threading.Thread(target=lambda: rasters.append(WeatherRaster.attach_or_build(root, points, 2.0)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({r.root for r in rasters}) == 1
+    assert [p.name for p in root.iterdir() if p.is_dir()] == [rasters[0].root.name]
+
+
+def test_agent_builds_one_raster_per_frame_under_concurrency(tmp_path, monkeypatch):
+    from agents import WeatherAgent
+    agent = WeatherAgent(cache_dir=str(tmp_path))
+    builds, points = [], _points(hours=1)
+    attach_or_build = WeatherRaster.attach_or_build
+
+    def counting(root, data, base_res):
+        builds.append(data)
+        return attach_or_build(root, data, 2.0)
+
+    monkeypatch.setattr(WeatherRaster, 'attach_or_build', counting)
+    rasters = []
+    threads = [threading.Thread(target=lambda: rasters.append(agent.get_raster(points))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1 and len({id(r) for r in rasters}) == 1
@@ -1,76 +1,96 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any
-import json
-from pathlib import Path
+import os
+import threading
+from typing import Dict, Any, Optional, Tuple
 from .base import AgentBase
+from storage import get_snapshot_registry
+from .weather_raster import WeatherRaster, Bbox
 
 class WeatherAgent(AgentBase):
     """Agent for weather/temperature data"""
     
+    api_url = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (frame, raster built from it), replaced together under the lock
+        self._raster: Optional[Tuple[pd.DataFrame, WeatherRaster]] = None
+        self._raster_lock = threading.Lock()
+    
+    def _request_params(self) -> Optional[Dict[str, Any]]:
+        """Build Open-Meteo query params for every world node"""
+        nodes = self.world.nodes()
+        if nodes.empty:
+            return None
+        
+        # Open-Meteo accepts comma-separated lists
+        return {
+            "latitude": nodes['lat'].tolist(),
+            "longitude": nodes['lon'].tolist(),
+            "current": "temperature_2m",
+            "timezone": "auto"
+        }
+    
+    def _parse_response(self, data: Any) -> pd.DataFrame:
+        """Parse an Open-Meteo response into weather points"""
+        nodes = self.world.nodes()
+        lats = nodes['lat'].tolist()
+        lons = nodes['lon'].tolist()
+        ids = nodes['id'].tolist()
+        
+        # Open-Meteo returns a list of results if multiple coords provided
+        results = []
+        
+        # Handle single vs multiple results structure
+        response_list = data if isinstance(data, list) else [data]
+        
+        for i, item in enumerate(response_list):
+            if i < len(ids):
+                current = item.get("current", {})
+                results.append({
+                    "node_id": ids[i],
+                    "lat": lats[i],
+                    "lon": lons[i],
+                    "temp_c": current.get("temperature_2m", 0.0),
+                    "ts": datetime.now()
+                })
+        
+        return pd.DataFrame(results)
+    
     def fetch_live(self) -> pd.DataFrame:
         """Fetch live weather data from Open-Meteo API"""
         import httpx
         
-        # Get node locations from the world graph
-        # Note: In a real app we'd inject the graph or read the JSON. 
-        # For now, we'll read the JSON directly to know where to query.
         try:
-            # Try relative to current working directory first (for CI)
-            data_path = Path("data/world_nodes.json")
-            if not data_path.exists():
-                # Fallback: relative to this file's parent's parent (backend directory)
-                backend_dir = Path(__file__).parent.parent
-                data_path = backend_dir / "data" / "world_nodes.json"
-            
-            with open(data_path, "r") as f:
-                world_data = json.load(f)
-            
-            nodes = world_data.get("nodes", [])
-            lats = [n["lat"] for n in nodes]
-            lons = [n["lon"] for n in nodes]
-            ids = [n["id"] for n in nodes]
-            
-            if not nodes:
+            params = self._request_params()
+            if params is None:
                 return pd.DataFrame()
-                
-            # Open-Meteo accepts comma-separated lists
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": lats,
-                "longitude": lons,
-                "current": "temperature_2m",
-                "timezone": "auto"
-            }
             
-            response = httpx.get(url, params=params, timeout=10.0)
+            response = httpx.get(self.api_url, params=params, timeout=10.0)
             response.raise_for_status()
-            data = response.json()
-            
-            # Parse response
-            # Open-Meteo returns a list of results if multiple coords provided
-            results = []
+            return self._parse_response(response.json())
             
-            # Handle single vs multiple results structure
-            response_list = data if isinstance(data, list) else [data]
-            
-            for i, item in enumerate(response_list):
-                if i < len(nodes):
-                    current = item.get("current", {})
-                    results.append({
-                        "node_id": ids[i],
-                        "lat": lats[i],
-                        "lon": lons[i],
-                        "temp_c": current.get("temperature_2m", 0.0),
-                        "ts": datetime.now()
-                    })
+        except Exception as e:
+            print(f"Weather API failed: {e}")
+            # Fallback to synthetic if API fails
+            return self._generate_synthetic()
+    
+    async def fetch_live_async(self) -> pd.DataFrame:
+        """Fetch live weather data over the shared pooled client"""
+        from .http_pool import get_http_pool
+        
+        try:
+            params = self._request_params()
+            if params is None:
+                return pd.DataFrame()
             
-            return pd.DataFrame(results)
+            response = await get_http_pool().get(self.api_url, params=params)
+            return self._parse_response(response.json())
             
         except Exception as e:
             print(f"Weather API failed: {e}")
-            # Fallback to synthetic if API fails
             return self._generate_synthetic()
 
     def _generate_synthetic(self) -> pd.DataFrame:
@@ -78,23 +98,37 @@ class WeatherAgent(AgentBase):
         np.random.seed(42)
         lats = np.linspace(-90, 90, 20)
         lons = np.linspace(-180, 180, 40)
-        data = []
-        for lat in lats:
-            for lon in lons:
-                temp_c = 15 + np.sin(np.radians(lat)) * 20 + np.random.normal(0, 3)
-                data.append({
-                    'lat': lat,
-                    'lon': lon,
-                    'temp_c': round(temp_c, 1),
-                    'ts': datetime.now()
-                })
-        return pd.DataFrame(data)
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        temp_c = 15 + np.sin(np.radians(lat_grid)) * 20 + np.random.normal(0, 3, lat_grid.shape)
+        return pd.DataFrame({
+            'lat': lat_grid.ravel(),
+            'lon': lon_grid.ravel(),
+            'temp_c': np.round(temp_c.ravel(), 1),
+            'ts': datetime.now()
+        })
+    
+    def get_raster(self, data: pd.DataFrame) -> WeatherRaster:
+        """Gridded raster of a normalized weather frame, rebuilt when the frame changes"""
+        with self._raster_lock:
+            if self._raster is None or self._raster[0] is not data:
+                raster = WeatherRaster.attach_or_build(
+                    self.cache_dir / "weather_raster", data,
+                    base_res=float(os.getenv("WEATHER_RASTER_RES", "0.5")),
+                )
+                self._raster = (data, raster)
+            return self._raster[1]
+    
+    def query_raster(self, data: pd.DataFrame, bbox: Optional[Bbox] = None,
+                     res: Optional[float] = None, t: int = 0) -> pd.DataFrame:
+        """Weather points for a viewport at a level of detail, gridded from ``data``"""
+        max_cells = int(os.getenv("WEATHER_RASTER_MAX_CELLS", "100000"))
+        return self.get_raster(data).query(bbox=bbox, res=res, t=t, max_cells=max_cells)
     
     def load_snapshot(self) -> pd.DataFrame:
         """Load weather snapshot from file"""
-        snapshot_path = Path("data/snapshots/weather_sample.parquet")
-        if snapshot_path.exists():
-            return pd.read_parquet(snapshot_path)
+        snapshot = get_snapshot_registry().load("weather_sample.parquet", pd.read_parquet)
+        if snapshot is not None:
+            return snapshot.copy()
         
         # Generate sample data if snapshot doesn't exist
         return self.fetch_live()
@@ -0,0 +1,224 @@
+import hashlib
+import json
+import math
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from storage import FileLock, atomic_write
+
+Bbox = Tuple[float, float, float, float]  # (min_lon, min_lat, max_lon, max_lat)
+
+# Builds kept per raster root besides the current one (other workers may still map them)
+KEEP_BUILDS = 2
+
+
+class RasterRangeError(ValueError):
+    """A raster query outside the raster's time range or cell budget"""
+
+
+def grid_points(points: pd.DataFrame, base_res: float) -> Tuple[np.ndarray, List[datetime]]:
+    """Bin weather points (lat, lon, temp_c, ts) into a lat x lon x time grid.
+
+    Cells holding points take their mean; empty cells take the mean of the
+    smallest enclosing block that has data (pull-push fill), so the grid
+    agrees with the point layer wherever it has data.
+    """
+    ts = pd.DatetimeIndex(pd.to_datetime(points['ts']))
+    times = ts.unique().sort_values()
+    nlat = int(round(180 / base_res))
+    nlon = int(round(360 / base_res))
+    lat_i = np.clip(((points['lat'].to_numpy() + 90) // base_res).astype(np.int64), 0, nlat - 1)
+    lon_i = np.clip(((points['lon'].to_numpy() + 180) // base_res).astype(np.int64), 0, nlon - 1)
+    t_i = times.searchsorted(ts)
+
+    cells = (lat_i * nlon + lon_i) * len(times) + t_i
+    size = nlat * nlon * len(times)
+    sums = np.bincount(cells, weights=points['temp_c'].to_numpy(dtype=np.float64), minlength=size)
+    counts = np.bincount(cells, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grid = (sums / counts).reshape(nlat, nlon, len(times))
+    return _fill(grid).astype(np.float32), list(times.to_pydatetime())
+
+
+def _fill(grid: np.ndarray) -> np.ndarray:
+    """Fill NaN cells from the 2x2-coarser grid, recursively"""
+    empty = np.isnan(grid)
+    if not empty.any():
+        return grid
+    nlat, nlon = grid.shape[:2]
+    if nlat % 2 or nlon % 2 or nlat < 2:
+        return np.where(empty, np.nanmean(grid, axis=(0, 1)), grid)
+    blocks = grid.reshape(nlat // 2, 2, nlon // 2, 2, -1)
+    counts = (~np.isnan(blocks)).sum(axis=(1, 3))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coarse = np.nansum(blocks, axis=(1, 3)) / counts
+    coarse = np.repeat(np.repeat(_fill(coarse), 2, axis=0), 2, axis=1)
+    return np.where(empty, coarse, grid)
+
+
+def raster_key(points: pd.DataFrame, base_res: float) -> str:
+    """Content key of a raster build: the points and the base resolution"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(points, index=False).to_numpy().tobytes())
+    return f"{base_res:g}-{digest.hexdigest()[:16]}"
+
+
+class WeatherRaster:
+    """Gridded temperature raster stored as a pyramid of memory-mapped .npy levels.
+
+    Level 0 holds the base resolution; each further level halves both
+    spatial dimensions by block-averaging. Queries pick the coarsest level
+    that still satisfies the requested resolution and slice only the
+    viewport, so only the touched pages are read from disk.
+    """
+
+    def __init__(self, root: Path, base_res: float, times: List[datetime],
+                 levels: List[np.ndarray]):
+        self.root = Path(root)
+        self.base_res = base_res
+        self.times = times
+        self.levels = levels
+
+    @property
+    def hours(self) -> int:
+        return self.levels[0].shape[2]
+
+    def level_res(self, level: int) -> float:
+        """Cell size in degrees for a pyramid level"""
+        return self.base_res * (2 ** level)
+
+    @classmethod
+    def build(cls, root: Path, points: pd.DataFrame, base_res: float = 0.5) -> "WeatherRaster":
+        """Grid normalized weather points and persist the pyramid under root"""
+        if points.empty:
+            raise ValueError("No weather points to build a raster from")
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        level, times = grid_points(points, base_res)
+
+        count = 0
+        while True:
+            np.save(root / f"level_{count}.npy", level)
+            count += 1
+            nlat, nlon = level.shape[:2]
+            if nlat % 2 or nlon % 2 or nlat < 4:
+                break
+            level = level.reshape(nlat // 2, 2, nlon // 2, 2, -1).mean(axis=(1, 3), dtype=np.float32)
+
+        # Metadata is written last so a half-built pyramid is never opened
+        meta = json.dumps({
+            'base_res': base_res,
+            'levels': count,
+            'times': [ts.isoformat() for ts in times],
+        })
+        atomic_write(root / "meta.json", lambda tmp: tmp.write_text(meta))
+        return cls.open(root)
+
+    @classmethod
+    def open(cls, root: Path) -> "WeatherRaster":
+        """Open a persisted raster with memory-mapped levels"""
+        root = Path(root)
+        meta = json.loads((root / "meta.json").read_text())
+        levels = [
+            np.load(root / f"level_{i}.npy", mmap_mode='r')
+            for i in range(meta['levels'])
+        ]
+        times = [datetime.fromisoformat(ts) for ts in meta['times']]
+        return cls(root, meta['base_res'], times, levels)
+
+    @classmethod
+    def attach_or_build(cls, root: Path, points: pd.DataFrame, base_res: float = 0.5) -> "WeatherRaster":
+        """Open the raster for these points under root, building it once if missing.
+
+        Same scheme as the compiled world graph: one process builds under a
+        file lock into a fresh directory renamed into place, the others wait
+        and attach. Older builds beyond KEEP_BUILDS are removed.
+        """
+        root = Path(root)
+        target = root / raster_key(points, base_res)
+        if (target / "meta.json").exists():
+            return cls.open(target)
+        with FileLock(root / "build.lock"):
+            if not (target / "meta.json").exists():
+                tmp = root / f".build-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                try:
+                    cls.build(tmp, points, base_res)
+                    os.replace(tmp, target)
+                finally:
+                    if tmp.exists():
+                        shutil.rmtree(tmp, ignore_errors=True)
+                builds = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.')
+                                 and p != target), key=lambda p: p.stat().st_mtime, reverse=True)
+                for old in builds[KEEP_BUILDS:]:
+                    shutil.rmtree(old, ignore_errors=True)
+        return cls.open(target)
+
+    def choose_level(self, res: Optional[float]) -> int:
+        """Coarsest level whose cell size does not exceed the requested resolution"""
+        if res is None:
+            return 0
+        level = int(math.floor(math.log2(max(res, self.base_res) / self.base_res)))
+        return min(level, len(self.levels) - 1)
+
+    def _lon_ranges(self, min_lon: float, max_lon: float, cell: float,
+                    nlon: int) -> List[Tuple[int, int]]:
+        """Column index ranges for a lon span, splitting across the antimeridian"""
+        def to_idx(lo: float, hi: float) -> Tuple[int, int]:
+            i0 = max(0, int(math.floor((lo + 180) / cell)))
+            i1 = min(nlon, int(math.ceil((hi + 180) / cell)))
+            return i0, i1
+        if min_lon <= max_lon:
+            return [to_idx(min_lon, max_lon)]
+        return [to_idx(min_lon, 180), to_idx(-180, max_lon)]
+
+    def query(self, bbox: Optional[Bbox] = None, res: Optional[float] = None,
+              t: int = 0, max_cells: Optional[int] = None) -> pd.DataFrame:
+        """Slice the raster to a viewport at roughly the requested resolution.
+
+        Raises RasterRangeError when ``t`` is outside the raster or the
+        slice would exceed ``max_cells``.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox or (-180.0, -90.0, 180.0, 90.0)
+        level = self.choose_level(res)
+        grid = self.levels[level]
+        cell = self.level_res(level)
+        nlat, nlon = grid.shape[:2]
+        if not 0 <= t < grid.shape[2]:
+            raise RasterRangeError(f"t must be between 0 and {grid.shape[2] - 1}")
+
+        # Stride within the level when the request is coarser than the level
+        stride = max(1, int(round(res / cell))) if res else 1
+
+        lat0 = max(0, int(math.floor((min_lat + 90) / cell)))
+        lat1 = min(nlat, int(math.ceil((max_lat + 90) / cell)))
+        lat_idx = np.arange(lat0, lat1, stride)
+
+        lon_ranges = self._lon_ranges(min_lon, max_lon, cell, nlon)
+        lon_idx = np.concatenate([np.arange(i0, i1, stride) for i0, i1 in lon_ranges])
+        if max_cells is not None and len(lat_idx) * len(lon_idx) > max_cells:
+            raise RasterRangeError(
+                f"Request covers {len(lat_idx) * len(lon_idx)} cells (max {max_cells}); "
+                f"narrow the bbox or use a coarser res"
+            )
+
+        # Slice each contiguous lon span so mmap reads stay within the viewport
+        temps = np.hstack([
+            np.asarray(grid[lat0:lat1:stride, i0:i1:stride, t])
+            for i0, i1 in lon_ranges
+        ])
+        lats = -90 + cell / 2 + lat_idx * cell
+        lons = -180 + cell / 2 + lon_idx * cell
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+
+        return pd.DataFrame({
+            'lat': lat_grid.ravel(),
+            'lon': lon_grid.ravel(),
+            'temp_c': np.round(temps.ravel().astype(np.float64), 1),
+            'ts': self.times[t],
+        })
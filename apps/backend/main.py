@@ -1,22 +1,35 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 import os
 import random
+import threading
 import numpy as np
+import orjson
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+import polars as pl
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 # Set global RNG seeds for deterministic behavior
 os.environ["PYTHONHASHSEED"] = "0"
 random.seed(1337)
 np.random.seed(1337)
 
-# Import our modules
-from agents import WeatherAgent, PortsAgent, GridAgent, AlertsAgent
-from sim import RippleEngine
-from nl import NLEngine
-from schemas import Shock, SimulationResult, NLQuery, NLResponse
+# Import our modules (agents, sim and nl are imported on first use, see Services)
+from schemas import Shock, SimulationResult, NLBatchQuery, NLQuery, NLResponse
+from world.spatial import SpatialIndex
+from storage import get_layer_history, get_shared_layer_cache
+from metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from profiling import ProfileStore, ProfilingConfig, ProfilingMiddleware
+from payloads import (
+    GLOBE_MEDIA_TYPE, QUANT_UNIT_U8, accepts_globe, encode_graph, encode_impact_frames, encode_points,
+    negotiate_tabular, stream_frame, stream_table, stream_simulation,
+    nl_response_payload, simulation_payload,
+)
 
 # Load environment variables
 # Load environment variables from root
@@ -24,11 +37,135 @@ root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 dotenv_path = os.path.join(root_dir, '.env')
 load_dotenv(dotenv_path)
 
+class Services:
+    """Agents and engines, built on first use instead of at import.
+
+    The lifespan warms them (in the background by default, see WARMUP), so
+    the worker accepts connections before the world graph is loaded; a
+    request that arrives first simply builds what it needs.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built: Dict[str, Any] = {}
+
+    def _get(self, name: str, build):
+        value = self._built.get(name)
+        if value is None:
+            with self._lock:
+                value = self._built.get(name)
+                if value is None:
+                    value = build()
+                    self._built[name] = value
+        return value
+
+    def is_built(self, name: str) -> bool:
+        return name in self._built
+
+    @property
+    def weather_agent(self):
+        from agents import WeatherAgent
+        return self._get('weather_agent', WeatherAgent)
+
+    @property
+    def ports_agent(self):
+        from agents import PortsAgent
+        return self._get('ports_agent', PortsAgent)
+
+    @property
+    def grid_agent(self):
+        from agents import GridAgent
+        return self._get('grid_agent', GridAgent)
+
+    @property
+    def alerts_agent(self):
+        from agents import AlertsAgent
+        return self._get('alerts_agent', AlertsAgent)
+
+    @property
+    def layer_scheduler(self):
+        from agents import RefreshScheduler
+        return self._get('layer_scheduler', lambda: RefreshScheduler({
+            'weather': self.weather_agent,
+            'ports': self.ports_agent,
+            'grid': self.grid_agent,
+            'alerts': self.alerts_agent,
+        }, shared=get_shared_layer_cache(), history=get_layer_history()))
+
+    @property
+    def ripple_engine(self):
+        from sim import RippleEngine
+        return self._get('ripple_engine', RippleEngine)
+
+    @property
+    def nl_engine(self):
+        from nl import NLEngine
+        return self._get('nl_engine', lambda: NLEngine(self.ripple_engine))
+
+    def warm(self):
+        """Build every service up front"""
+        self.layer_scheduler
+        self.nl_engine
+
+services = Services()
+
+async def _watch_world(interval_s: float):
+    """Rebuild the graph when the world file changes, patching standing scenarios"""
+    while True:
+        await asyncio.sleep(interval_s)
+        if not services.is_built('ripple_engine'):
+            continue
+        try:
+            # Compiled in a worker thread; runs in flight keep the graph they started on
+            await asyncio.to_thread(services.ripple_engine.refresh_world)
+        except Exception as e:
+            print(f"World refresh failed: {e}")
+
+background_tasks: List[asyncio.Task] = []
+
+def _start_background_refresh():
+    """Layer refresh loops plus the world file watch (WORLD_REFRESH_S)"""
+    services.layer_scheduler.start()
+    interval_s = float(os.getenv("WORLD_REFRESH_S", "30"))
+    background_tasks.append(asyncio.get_running_loop().create_task(_watch_world(interval_s)))
+
+async def _start_services():
+    """Warm services off the event loop, then start background refresh"""
+    await asyncio.to_thread(services.warm)
+    if os.getenv("BACKGROUND_REFRESH", "true").lower() == "true":
+        _start_background_refresh()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    # WARMUP: background (default) serves immediately, blocking waits for warm services, off builds on demand
+    warmup = os.getenv("WARMUP", "background").lower()
+    startup = None
+    if warmup == "blocking":
+        await _start_services()
+    elif warmup != "off":
+        startup = asyncio.create_task(_start_services())
+    elif os.getenv("BACKGROUND_REFRESH", "true").lower() == "true":
+        _start_background_refresh()
+    yield
+    if startup is not None and not startup.done():
+        startup.cancel()
+        await asyncio.gather(startup, return_exceptions=True)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    if services.is_built('layer_scheduler'):
+        await services.layer_scheduler.stop()
+    # Release pooled upstream connections
+    from agents import close_http_pool
+    await close_http_pool()
+
 app = FastAPI(
     title="Neural Terra API",
     description="Real-time digital twin of Earth simulation engine",
     version="0.1.0",
-    default_response_class=ORJSONResponse
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -39,20 +176,43 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-# Initialize agents and engines
-weather_agent = WeatherAgent()
-ports_agent = PortsAgent()
-grid_agent = GridAgent()
-alerts_agent = AlertsAgent()
-ripple_engine = RippleEngine()
-nl_engine = NLEngine(ripple_engine)
+# Opt-in per-request profiles (PROFILING_ENABLED), listed under /profiles
+profiling = ProfilingConfig.from_env()
+profiles = ProfileStore(keep=profiling.keep)
+app.add_middleware(ProfilingMiddleware, config=profiling, store=profiles)
+# Outermost, so the latency covers every other middleware
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/healthz")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "neural-terra-backend"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def require_profiling(x_profile: Optional[str] = Header(None)):
+    """Profiles are only served when profiling is on, and to token holders when a token is set"""
+    if not profiling.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if profiling.token and not profiling.allows(x_profile):
+        raise HTTPException(status_code=403, detail="Profiling token required")
+
+@app.get("/profiles", include_in_schema=False, dependencies=[Depends(require_profiling)])
+async def list_profiles():
+    """Recent request profiles, newest first"""
+    return profiles.list()
+
+@app.get("/profiles/{profile_id}", include_in_schema=False, dependencies=[Depends(require_profiling)])
+async def get_profile(profile_id: str):
+    """Phase times, sampled stacks and peak allocation of one profiled request"""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    return profile.to_dict()
+
 @app.get("/")
 async def root():
     """Root endpoint with API info"""
@@ -62,103 +222,420 @@ async def root():
         "docs": "/docs"
     }
 
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse a 'min_lon,min_lat,max_lon,max_lat' viewport string"""
+    if bbox is None:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise HTTPException(status_code=400, detail="bbox out of range")
+    return min_lon, min_lat, max_lon, max_lat
+
+def parse_point(near: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parse a 'lat,lon' point string"""
+    if near is None:
+        return None
+    try:
+        lat, lon = (float(v) for v in near.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="near must be lat,lon")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise HTTPException(status_code=400, detail="near out of range")
+    return lat, lon
+
+class SpatialFilter:
+    """Shared viewport / proximity query parameters"""
+    def __init__(
+        self,
+        bbox: Optional[str] = Query(None, description="Viewport as min_lon,min_lat,max_lon,max_lat"),
+        near: Optional[str] = Query(None, description="Reference point as lat,lon"),
+        k: Optional[int] = Query(None, ge=1, description="Number of nearest nodes to return"),
+        radius_km: Optional[float] = Query(None, gt=0, description="Great-circle radius around near"),
+    ):
+        self.bbox = parse_bbox(bbox)
+        self.near = parse_point(near)
+        self.k = k
+        self.radius_km = radius_km
+        if self.near is not None and k is None and radius_km is None:
+            raise HTTPException(status_code=400, detail="near requires k or radius_km")
+
+    @property
+    def active(self) -> bool:
+        return self.bbox is not None or self.near is not None
+
+    def node_ids(self, planet: str = 'earth') -> Optional[List[str]]:
+        """World node ids matching the filter, or None when no filter is set"""
+        return services.ripple_engine.select_nodes(
+            planet, bbox=self.bbox, near=self.near, k=self.k, radius_km=self.radius_km
+        )
+
+    def apply(self, data, planet: str = 'earth'):
+        """Filter a layer frame (pandas or polars) keyed by world node id, keeping proximity order"""
+        ids = self.node_ids(planet)
+        if ids is None or len(data) == 0:
+            return data
+        if self.k is not None:
+            # k counts layer rows, not graph nodes: widen until k rows match
+            layer_ids = set(data['id'].to_list())
+            total = len(services.ripple_engine.spatial.get(planet, ()))
+            fetch = self.k
+            while sum(node_id in layer_ids for node_id in ids) < self.k and fetch < total:
+                fetch *= 2
+                ids = services.ripple_engine.select_nodes(
+                    planet, bbox=self.bbox, near=self.near, k=fetch, radius_km=self.radius_km
+                )
+            ids = [node_id for node_id in ids if node_id in layer_ids][:self.k]
+        if isinstance(data, pl.DataFrame):
+            order = pl.DataFrame({'id': ids, '_rank': range(len(ids))}, schema={'id': pl.Utf8, '_rank': pl.Int64})
+            return data.join(order, on='id', how='inner').sort('_rank').drop('_rank')
+        order = {node_id: i for i, node_id in enumerate(ids)}
+        rank = data['id'].map(order)
+        return data[rank.notna()].iloc[rank.dropna().argsort().to_numpy()]
+
+    def apply_points(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Proximity filter for point frames without world ids (e.g. weather)"""
+        if self.near is None or data.empty:
+            return data
+        index = SpatialIndex(np.arange(len(data)), data['lat'].to_numpy(), data['lon'].to_numpy())
+        lat, lon = self.near
+        if self.k is not None:
+            pos = index.nearest(lat, lon, self.k, max_radius_km=self.radius_km)
+        else:
+            pos = index.within(lat, lon, self.radius_km)
+        return data.iloc[pos]
+
+def globe_response(payload: bytes) -> Response:
+    """Binary globe payload response"""
+    return Response(content=payload, media_type=GLOBE_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+def layer_response(data, accept: Optional[str], kind: str,
+                   globe_attrs: Optional[Dict[str, str]] = None, id_col: str = 'id'):
+    """Return layer data (pandas or polars) as globe binary, Arrow IPC / Parquet, or JSON records"""
+    is_polars = isinstance(data, pl.DataFrame)
+    if globe_attrs is not None and accepts_globe(accept):
+        return globe_response(encode_points(data, globe_attrs, id_col=id_col, kind=kind))
+    media_type = negotiate_tabular(accept)
+    if media_type is not None:
+        content = stream_table(data, media_type) if is_polars else stream_frame(data, media_type)
+        return StreamingResponse(content, media_type=media_type, headers={"Vary": "Accept"})
+    return data.to_dicts() if is_polars else data.to_dict('records')
+
+def parse_list(value: Optional[str], name: str) -> Optional[List[str]]:
+    """Parse a comma-separated query filter"""
+    if value is None:
+        return None
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    if not items:
+        raise HTTPException(status_code=400, detail=f"{name} must list at least one value")
+    return items
+
+class LayerQuery:
+    """Planet / region / asset-type filters pushed down into agent pipelines"""
+    def __init__(
+        self,
+        planet: Optional[str] = Query(None, description="Planet to query (earth, mars)"),
+        region: Optional[str] = Query(None, description="Region id to restrict to"),
+        asset_type: Optional[str] = Query(None, description="Comma-separated asset types"),
+    ):
+        self.planet = planet
+        self.region = region
+        self.asset_types = parse_list(asset_type, 'asset_type')
+
+    @property
+    def active(self) -> bool:
+        return self.planet is not None or self.region is not None or self.asset_types is not None
+
+    def run(self, agent):
+        """Collect the agent's lazy pipeline with these filters"""
+        return agent.query(planet=self.planet or 'earth', region=self.region, asset_types=self.asset_types)
+
+class ResultShape:
+    """Which impact series a simulation response carries (see sim.shaping.SeriesShape)"""
+    def __init__(
+        self,
+        nodes: Optional[str] = Query(None, description="Comma-separated node ids to return"),
+        planet: Optional[str] = Query(None, description="Only return nodes on this planet"),
+        top_k: Optional[int] = Query(None, ge=1, description="Only return the k most impacted nodes"),
+        nonzero: bool = Query(False, description="Drop series that stay at zero"),
+        points: Optional[int] = Query(None, ge=2, description="Downsample each series to this many points"),
+        downsample: str = Query('max', description="Downsampling method: max (bucket peaks) or lttb"),
+    ):
+        from sim.shaping import SeriesShape
+        try:
+            self.shape = SeriesShape(
+                node_ids=parse_list(nodes, 'nodes'), planet=planet, top_k=top_k,
+                drop_zero=nonzero, points=points, downsample=downsample,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def simulation_response(result: SimulationResult, accept: Optional[str]):
+    """Return a simulation result as JSON, delta-coded globe frames or an impact table"""
+    media_type = negotiate_tabular(accept)
+    if media_type is not None:
+        # Tabular body holds the impact table; scalar fields travel as headers
+        return StreamingResponse(
+            stream_simulation(result, media_type),
+            media_type=media_type,
+            headers={
+                "Vary": "Accept",
+                "X-Scenario-Id": result.scenario_id,
+                "X-Simulation-Meta": orjson.dumps({
+                    'shock': result.shock.model_dump(mode='json'),
+                    'kpis': result.kpis,
+                    'duration_hours': result.duration_hours,
+                    'timesteps': result.timesteps,
+                }).decode(),
+            },
+        )
+    if accepts_globe(accept):
+        return globe_response(encode_impact_frames(
+            result.impact_series,
+            scenario_id=result.scenario_id,
+            shock=result.shock.model_dump(mode='json'),
+            kpis=result.kpis,
+            duration_hours=result.duration_hours,
+            timesteps=result.timesteps,
+        ))
+    # Written straight from the NumPy series; the declared response model only documents it
+    return ORJSONResponse(simulation_payload(result))
+
 @app.get("/layers/weather")
-async def get_weather_layer():
+async def get_weather_layer(
+    res: Optional[float] = Query(None, gt=0, description="Target resolution in degrees"),
+    t: int = Query(0, ge=0, description="Time index into the layer's timestamps"),
+    spatial: SpatialFilter = Depends(),
+    accept: Optional[str] = Header(None),
+):
     """Get current weather layer data"""
+    from agents.weather_raster import RasterRangeError
     try:
-        data = weather_agent.load_data()
-        return data.to_dict('records')
+        data = await services.layer_scheduler.get('weather')
+        if spatial.bbox is not None or res is not None:
+            # Gridded from the current layer (rebuilt when it refreshes): payload follows the viewport
+            data = await asyncio.to_thread(services.weather_agent.query_raster, data,
+                                           bbox=spatial.bbox, res=res, t=t)
+        data = spatial.apply_points(data)
+        return layer_response(data, accept, 'weather', {'temp_c': 'float16'}, id_col='node_id')
+    except RasterRangeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Weather data error: {str(e)}")
 
 @app.get("/layers/ports")
-async def get_ports_layer():
+async def get_ports_layer(
+    spatial: SpatialFilter = Depends(),
+    layer: LayerQuery = Depends(),
+    accept: Optional[str] = Header(None),
+):
     """Get current ports layer data"""
     try:
-        data = ports_agent.load_data()
-        return data.to_dict('records')
+        data = layer.run(services.ports_agent) if layer.active else await services.layer_scheduler.get('ports')
+        data = spatial.apply(data, layer.planet or 'earth')
+        return layer_response(data, accept, 'ports', {'throughput_index': QUANT_UNIT_U8})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ports data error: {str(e)}")
 
 @app.get("/layers/grid")
-async def get_grid_layer():
+async def get_grid_layer(
+    spatial: SpatialFilter = Depends(),
+    layer: LayerQuery = Depends(),
+    accept: Optional[str] = Header(None),
+):
     """Get current grid layer data"""
     try:
-        data = grid_agent.load_data()
-        return data.to_dict('records')
+        data = layer.run(services.grid_agent) if layer.active else await services.layer_scheduler.get('grid')
+        data = spatial.apply(data, layer.planet or 'earth')
+        return layer_response(data, accept, 'grid', {'stress_index': QUANT_UNIT_U8})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Grid data error: {str(e)}")
 
+@app.post("/layers/refresh")
+async def refresh_layers():
+    """Refresh all data layers concurrently"""
+    try:
+        names = list(services.layer_scheduler.states)
+        frames = await asyncio.gather(*(services.layer_scheduler.refresh(name) for name in names))
+        return {name: len(frame) for name, frame in zip(names, frames)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Layer refresh error: {str(e)}")
+
+@app.get("/layers/status")
+async def get_layers_status():
+    """Get staleness and refresh timings for each data layer"""
+    return services.layer_scheduler.stats()
+
+@app.get("/layers/{name}/history")
+async def get_layer_history_series(
+    name: str,
+    start: Optional[datetime] = Query(None, alias="from", description="Start of the range (default: 24h before to)"),
+    end: Optional[datetime] = Query(None, alias="to", description="End of the range (default: now)"),
+    step: Optional[str] = Query(None, description="Bucket size such as 15m, 1h, 1d; omit for raw refreshes"),
+    agg: str = Query('mean', description="Bucket aggregate for numeric columns: mean, min, max, last"),
+    ids: Optional[str] = Query(None, description="Comma-separated entity ids"),
+    region: Optional[str] = Query(None, description="Region to restrict to"),
+    accept: Optional[str] = Header(None),
+):
+    """Get a layer's recorded refreshes over a time range, optionally downsampled"""
+    history = services.layer_scheduler.history
+    if history is None:
+        raise HTTPException(status_code=404, detail="Layer history is disabled")
+    state = services.layer_scheduler.states.get(name)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown layer: {name}")
+    if not state.agent.record_history:
+        raise HTTPException(status_code=404, detail=f"Layer {name} does not record history")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(hours=24)
+    id_list = parse_list(ids, 'ids')
+    try:
+        data = await asyncio.to_thread(
+            history.query, name, start, end, step=step, agg=agg, ids=id_list, region=region
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Layer history error: {str(e)}")
+    return layer_response(data, accept, name)
+
 @app.get("/alerts")
-async def get_alerts():
-    """Get current alerts data"""
+async def get_alerts(
+    tags: Optional[str] = Query(None, description="Comma-separated tags (any)"),
+    region_ids: Optional[str] = Query(None, description="Comma-separated region ids (any)"),
+    asset_ids: Optional[str] = Query(None, description="Comma-separated asset ids (any)"),
+    severity: Optional[str] = Query(None, description="Comma-separated severities (any)"),
+    start: Optional[datetime] = Query(None, alias="from", description="Earliest alert timestamp"),
+    end: Optional[datetime] = Query(None, alias="to", description="Latest alert timestamp"),
+    cursor: Optional[int] = Query(None, ge=0, description="X-Next-Cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; all matches when neither limit nor cursor is given"),
+    accept: Optional[str] = Header(None),
+):
+    """Get current alerts, newest first, with filters and cursor pagination"""
+    if limit is None and cursor is not None:
+        limit = 100
+    filters = {
+        'tags': parse_list(tags, 'tags'),
+        'region_ids': parse_list(region_ids, 'region_ids'),
+        'asset_ids': parse_list(asset_ids, 'asset_ids'),
+        'severity': parse_list(severity, 'severity'),
+    }
     try:
-        data = alerts_agent.load_data()
-        return data.to_dict('records')
+        # Keeps the store fed; stale reads trigger a background refresh
+        await services.layer_scheduler.get('alerts')
+        alerts, next_cursor, total = services.alerts_agent.page(
+            **filters, start=start, end=end, cursor=cursor, limit=limit
+        )
+        headers = {"X-Total-Count": str(total)}
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = str(next_cursor)
+        media_type = negotiate_tabular(accept)
+        if media_type is not None:
+            headers["Vary"] = "Accept"
+            content = stream_frame(services.alerts_agent.store.frame(alerts), media_type)
+            return StreamingResponse(content, media_type=media_type, headers=headers)
+        return ORJSONResponse(alerts, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Alerts data error: {str(e)}")
 
 @app.get("/graph")
-async def get_graph():
+async def get_graph(spatial: SpatialFilter = Depends(), accept: Optional[str] = Header(None)):
     """Get simulation graph structure"""
     try:
-        return ripple_engine.get_graph_data()
+        graph_data = services.ripple_engine.get_graph_data(node_ids=spatial.node_ids('earth'))
+        if accepts_globe(accept):
+            return globe_response(encode_graph(graph_data))
+        return graph_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph data error: {str(e)}")
 
 @app.post("/simulate")
-async def simulate_scenario(shock: Shock) -> SimulationResult:
+async def simulate_scenario(
+    shock: Shock,
+    standing: bool = Query(False, description="Keep the result patched as the world file changes (bounded by STANDING_MAX and STANDING_TTL_S)"),
+    shape: ResultShape = Depends(),
+    accept: Optional[str] = Header(None),
+) -> SimulationResult:
     """Run a simulation scenario"""
     try:
-        result = ripple_engine.simulate_shock(shock)
-        return result
+        result = services.ripple_engine.simulate_shock(shock, standing=standing, shape=shape.shape)
+        return simulation_response(result, accept)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Simulation error: {str(e)}")
 
+@app.get("/scenarios/{scenario_id}")
+async def get_scenario(
+    scenario_id: str,
+    shape: ResultShape = Depends(),
+    accept: Optional[str] = Header(None),
+) -> SimulationResult:
+    """Load a saved scenario"""
+    try:
+        result = await asyncio.to_thread(services.ripple_engine.load_scenario, scenario_id, shape.shape)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Scenario load error: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown scenario: {scenario_id}")
+    return simulation_response(result, accept)
+
+@app.delete("/scenarios/{scenario_id}")
+async def delete_scenario(scenario_id: str):
+    """Delete a saved scenario and stop patching it if it is standing"""
+    if not await asyncio.to_thread(services.ripple_engine.delete_scenario, scenario_id):
+        raise HTTPException(status_code=404, detail=f"Unknown scenario: {scenario_id}")
+    return {"deleted": scenario_id}
+
 @app.post("/nl/interpret")
 async def interpret_nl_query(query: NLQuery):
     """Interpret natural language query"""
     try:
-        interpretation = nl_engine.interpret(query)
+        # Blocks for up to the LLM deadline; keep it off the event loop
+        interpretation = await asyncio.to_thread(services.nl_engine.interpret, query)
         return interpretation
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NL interpretation error: {str(e)}")
 
 @app.post("/nl/run")
-async def run_nl_query(query: NLQuery) -> NLResponse:
+async def run_nl_query(query: NLQuery, shape: ResultShape = Depends()) -> NLResponse:
     """Run natural language query and return results"""
     try:
-        response = nl_engine.run_query(query)
-        return response
+        response = await asyncio.to_thread(services.nl_engine.run_query, query, shape.shape)
+        return ORJSONResponse(nl_response_payload(response))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NL query error: {str(e)}")
 
+@app.post("/nl/run/batch")
+async def run_nl_batch(batch: NLBatchQuery, shape: ResultShape = Depends()) -> List[NLResponse]:
+    """Run several natural language queries, simulating each distinct shock once"""
+    try:
+        responses = await asyncio.to_thread(services.nl_engine.run_batch, batch.queries, shape.shape)
+        return ORJSONResponse([nl_response_payload(response) for response in responses])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"NL batch error: {str(e)}")
+
+@app.get("/nl/status")
+async def get_nl_status():
+    """Get which interpretation path answered, with latencies, breaker and cache state"""
+    return services.nl_engine.stats()
+
 # Mars Mode endpoints
 @app.get("/mars/layers/grid")
-async def get_mars_grid_layer():
+async def get_mars_grid_layer(accept: Optional[str] = Header(None)):
     """Get Mars grid layer data"""
     try:
-        # Load all grid data and filter for Mars
-        # Note: In a real app, we'd pass planet to the agent
-        data = grid_agent.load_data()
-        if not data.empty and 'planet' in data.columns:
-            mars_data = data[data['planet'] == 'mars']
-            return mars_data.to_dict('records')
-        
-        # Fallback if planet column missing (shouldn't happen with new code)
-        return []
+        data = services.grid_agent.query(planet='mars')
+        return layer_response(data, accept, 'grid', {'stress_index': QUANT_UNIT_U8})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mars grid data error: {str(e)}")
 
 @app.get("/mars/layers/ports")
-async def get_mars_ports_layer():
+async def get_mars_ports_layer(accept: Optional[str] = Header(None)):
     """Get Mars ports layer data"""
     try:
-        data = ports_agent.load_data()
-        if not data.empty and 'planet' in data.columns:
-            mars_data = data[data['planet'] == 'mars']
-            return mars_data.to_dict('records')
-        return []
+        data = services.ports_agent.query(planet='mars')
+        return layer_response(data, accept, 'ports', {'throughput_index': QUANT_UNIT_U8})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mars ports data error: {str(e)}")
 
@@ -173,20 +650,24 @@ async def get_mars_alerts():
         raise HTTPException(status_code=500, detail=f"Mars alerts data error: {str(e)}")
 
 @app.get("/mars/graph")
-async def get_mars_graph():
+async def get_mars_graph(spatial: SpatialFilter = Depends(), accept: Optional[str] = Header(None)):
     """Get Mars simulation graph structure"""
     try:
-        return ripple_engine.get_graph_data(planet='mars')
+        graph_data = services.ripple_engine.get_graph_data(planet='mars', node_ids=spatial.node_ids('mars'))
+        if accepts_globe(accept):
+            return globe_response(encode_graph(graph_data))
+        return graph_data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mars graph data error: {str(e)}")
 
 @app.post("/mars/simulate")
-async def simulate_mars_scenario(shock: Shock) -> SimulationResult:
+async def simulate_mars_scenario(shock: Shock, shape: ResultShape = Depends(),
+                                 accept: Optional[str] = Header(None)) -> SimulationResult:
     """Run a Mars simulation scenario"""
     try:
         # Use the same ripple engine but with Mars-specific parameters
-        result = ripple_engine.simulate_shock(shock)
-        return result
+        result = services.ripple_engine.simulate_shock(shock, shape=shape.shape)
+        return simulation_response(result, accept)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mars simulation error: {str(e)}")
 
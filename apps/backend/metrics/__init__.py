@@ -0,0 +1,14 @@
+from .registry import (
+    CONTENT_TYPE,
+    LATENCY_BUCKETS,
+    REGISTRY,
+    SIZE_BUCKETS,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+from .asgi import MetricsMiddleware
+
+__all__ = ['CONTENT_TYPE', 'LATENCY_BUCKETS', 'REGISTRY', 'SIZE_BUCKETS', 'Counter', 'Gauge',
+           'Histogram', 'Registry', 'MetricsMiddleware']
@@ -0,0 +1,41 @@
+import time
+
+from .registry import Histogram
+
+REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template',
+    labels=('method', 'route', 'status'),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing each HTTP request.
+
+    Labelled by the matched route template (``/layers/{name}/history``),
+    not the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            REQUEST_SECONDS.labels(
+                scope['method'], getattr(route, 'path', 'unmatched'), status
+            ).observe(time.perf_counter() - started)
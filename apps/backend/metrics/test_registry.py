@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import Counter, Gauge, Histogram, MetricsMiddleware, Registry
+from metrics.asgi import REQUEST_SECONDS
+
+
+def test_renders_prometheus_text_format():
+    registry = Registry()
+    loads = Counter('loads_total', 'Loads', labels=('agent',), registry=registry)
+    nodes = Gauge('nodes', 'Nodes', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', labels=('path',), buckets=(0.1, 1.0), registry=registry)
+
+    loads.labels('Ports"Agent').inc()
+    loads.labels('Ports"Agent').inc(2)
+    nodes.set(36)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels('regex').observe(value)
+
+    lines = registry.render().splitlines()
+    assert '# TYPE loads_total counter' in lines
+    assert 'loads_total{agent="Ports\\"Agent"} 3' in lines
+    assert 'nodes 36' in lines
+    assert 'latency_seconds_bucket{path="regex",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{path="regex",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{path="regex",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{path="regex"} 3.65' in lines
+    assert 'latency_seconds_count{path="regex"} 4' in lines
+
+
+def test_observe_overhead_is_microseconds():
+    histogram = Histogram('overhead_seconds', 'Overhead', labels=('phase',), registry=None)
+    child = histogram.labels('kpis')
+    started = time.perf_counter()
+    for _ in range(20_000):
+        child.observe(0.003)
+        histogram.labels('kpis').observe(0.003)
+    per_observe_us = (time.perf_counter() - started) / 40_000 * 1e6
+    assert per_observe_us < 10
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for item_id in ("a", "b", "c"):
+                assert (await client.get(f"/items/{item_id}")).status_code == 200
+            assert (await client.get("/missing")).status_code == 404
+
+    asyncio.run(run())
+    rendered = REQUEST_SECONDS.samples()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 3' in rendered
+    assert any('route="unmatched",status="404"' in line for line in rendered)
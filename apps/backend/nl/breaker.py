@@ -0,0 +1,58 @@
+import threading
+import time
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """Stops calling a dependency after repeated failures.
+
+    Closed: calls go through. After ``threshold`` consecutive failures
+    (errors or missed deadlines) it opens and ``allow`` refuses calls for
+    ``cooldown_s``. Then a single trial call is let through (half-open); its
+    success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown_s: float = 30.0):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.failures = 0
+        self.opened_at: float = 0.0
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.threshold:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown_s:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold:
+                if self.failures == self.threshold:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'state': self.state, 'consecutive_failures': self.failures, 'trips': self.trips}
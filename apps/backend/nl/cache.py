@@ -0,0 +1,157 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+from schemas import NLInterpretation
+
+NUMBER_RE = re.compile(r'\d+(?:,\d{3})*(?:\.\d+)?')
+PERCENT_WORDS_RE = re.compile(r'\s*(?:per\s*cent|percent|pct)\b')
+SPACE_RE = re.compile(r'\s+')
+
+
+def _number(match: re.Match) -> str:
+    value = float(match.group(0).replace(',', ''))
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a query for cache keys.
+
+    Case, whitespace, trailing punctuation and number formatting are
+    ignored: "Simulate 40.0 percent slowdown in  Suez Canal for 7 days."
+    and "simulate 40% slowdown in suez canal for 7 days" share a key.
+    """
+    text = SPACE_RE.sub(' ', text.lower()).strip().rstrip('.!?')
+    text = NUMBER_RE.sub(_number, text)
+    text = PERCENT_WORDS_RE.sub('%', text)
+    return re.sub(r'\s+%', '%', text)
+
+
+class InterpretationCache:
+    """LRU + TTL cache of LLM interpretations keyed by (graph version, normalized query).
+
+    With a ``path``, entries are appended to a JSON-lines log and replayed
+    on startup, so warm entries survive restarts; the log is rewritten once
+    it grows past twice the capacity.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 3600.0, path: Optional[Path] = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.path = Path(path) if path is not None else None
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, NLInterpretation]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lines = 0
+        self.hits = 0
+        self.misses = 0
+        if self.path is not None:
+            self._replay()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(text: str, version: Optional[str]) -> Tuple[str, str]:
+        return (version or '', normalize_query(text))
+
+    def get(self, text: str, version: Optional[str]) -> Optional[NLInterpretation]:
+        """A fresh copy of the cached interpretation, or None"""
+        key = self.key(text, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            interpretation = entry[1]
+        result = interpretation.model_copy(deep=True)
+        if result.scenario_spec is not None:
+            # The shock starts when it is asked for, not when it was first interpreted
+            result.scenario_spec.start_ts = datetime.now()
+        return result
+
+    def put(self, text: str, version: Optional[str], interpretation: NLInterpretation):
+        key = self.key(text, version)
+        stored_at = time.time()
+        with self._lock:
+            self._store(key, stored_at, interpretation.model_copy(deep=True))
+            if self.path is not None:
+                self._append(key, stored_at, interpretation)
+
+    def _store(self, key: Tuple[str, str], stored_at: float, interpretation: NLInterpretation):
+        self._entries[key] = (stored_at, interpretation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Persistence
+
+    @staticmethod
+    def _line(key: Tuple[str, str], stored_at: float, interpretation: NLInterpretation) -> str:
+        return json.dumps({
+            'version': key[0], 'query': key[1], 'stored_at': stored_at,
+            'interpretation': interpretation.model_dump(mode='json'),
+        })
+
+    def _append(self, key: Tuple[str, str], stored_at: float, interpretation: NLInterpretation):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(self._line(key, stored_at, interpretation) + '\n')
+            self._log_lines += 1
+            if self._log_lines > 2 * self.max_entries:
+                self._rewrite()
+        except OSError as e:
+            print(f"NL cache write failed: {e}")
+
+    def _rewrite(self):
+        """Compact the log down to the live entries"""
+        from storage import atomic_write
+        lines = [self._line(key, stored_at, value) for key, (stored_at, value) in self._entries.items()]
+        payload = ''.join(line + '\n' for line in lines)
+        atomic_write(self.path, lambda tmp: tmp.write_text(payload))
+        self._log_lines = len(lines)
+
+    def _replay(self):
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        now = time.time()
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if now - record['stored_at'] >= self.ttl_s:
+                    continue
+                interpretation = NLInterpretation.model_validate(record['interpretation'])
+            except (ValueError, KeyError) as e:
+                print(f"Skipping unreadable NL cache entry: {e}")
+                continue
+            self._store((record['version'], record['query']), record['stored_at'], interpretation)
+        self._log_lines = len(lines)
+
+
+def get_interpretation_cache() -> InterpretationCache:
+    """Cache configured via NL_CACHE_SIZE, NL_CACHE_TTL_S and NL_CACHE_PATH (optional)"""
+    path = os.getenv("NL_CACHE_PATH")
+    return InterpretationCache(
+        max_entries=int(os.getenv("NL_CACHE_SIZE", "1024")),
+        ttl_s=float(os.getenv("NL_CACHE_TTL_S", "3600")),
+        path=Path(path) if path else None,
+    )
@@ -1,75 +1,252 @@
-import re
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
-from schemas import Shock, NLQuery, NLInterpretation, NLResponse, SimulationResult
-from sim import RippleEngine
-
 import re
 import os
 import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
-import google.generativeai as genai
 from schemas import Shock, NLQuery, NLInterpretation, NLResponse, SimulationResult
+from metrics import Histogram
+from profiling import Phase
 from sim import RippleEngine
+from sim.shaping import SeriesShape
+from .breaker import CircuitBreaker
+from .cache import InterpretationCache, get_interpretation_cache, normalize_query
+from .matcher import AliasMatcher, build_alias_index, tokenize
+from .retrieval import NodeRetriever, node_documents
+
+# Compiled once; each list is tried in order and the first match wins
+PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+FRACTION_RES = [
+    re.compile(r'(\d+(?:\.\d+)?)\s*percent\b'),
+    re.compile(r'(\d+(?:\.\d+)?)\s*per\s*cent\b'),
+    re.compile(r'(\d+(?:\.\d+)?)\s*of\b'),
+]
+DURATION_RES = [
+    (re.compile(r'(\d+)\s*(?:hours?|hrs?|h)\b'), 1),
+    (re.compile(r'(\d+)\s*(?:days?|d)\b'), 24),
+    (re.compile(r'(\d+)\s*(?:weeks?|w)\b'), 24 * 7),
+]
+# Mentioning these next to a region targets that region's main grid
+GRID_WORDS = {'grid', 'grids', 'power'}
+
+INTERPRET_SECONDS = Histogram('nl_interpret_seconds', 'NL interpretation latency by the path that answered',
+                              labels=('path',))
+
+# Retrieved nodes scoring below this share of the best match stay out of the prompt
+PROMPT_MIN_RATIO = 0.3
+
+# Static part of the LLM prompt, formatted once per graph version
+PROMPT_HEADER = """
+You are an AI assistant for a planetary simulation engine.
+Your task is to interpret a user's natural language query and convert it into a structured simulation scenario (Shock).
+
+Regions:
+{regions}
+
+Extract the following fields:
+1. target_ids: List of node IDs that are the targets of the shock. Map the user's intent to the closest candidate or region IDs.
+2. magnitude: A float between 0.0 and 1.0 representing the intensity of the shock (1.0 = total failure/shutdown, 0.1 = minor disruption).
+3. duration_hours: Integer representing duration in hours.
+4. description: A brief summary of the action.
+
+Return ONLY a JSON object with these fields. Do not include markdown formatting.
+Example JSON:
+{{
+    "target_ids": ["suez_canal"],
+    "magnitude": 0.5,
+    "duration_hours": 48,
+    "description": "Simulate 50% slowdown of Suez Canal for 48 hours"
+}}
+"""
+PROMPT_QUERY = """
+Candidate Nodes:
+{candidates}
+
+User Query: "{query}"
+"""
+
+class _GraphIndex:
+    """Everything the engine derives from one graph version, published as a unit"""
+    def __init__(self, version: Optional[str], nodes: List[Any], synonyms: Dict[str, str]):
+        self.version = version
+        self.matcher = AliasMatcher(build_alias_index(
+            ((node.id, node.name, getattr(node, 'asset_type', '')) for node in nodes),
+            synonyms,
+        ))
+        self.retriever = NodeRetriever(node_documents(nodes, synonyms))
+        self.node_lines = {node.id: NLEngine._node_line(node) for node in nodes}
+        self.prompt_header = PROMPT_HEADER.format(
+            regions="\n".join(self.node_lines[node.id] for node in nodes
+                               if not hasattr(node, 'asset_type')))
+        # First grid of each region, and the region of each grid
+        self.region_grid: Dict[str, str] = {}
+        self.grid_region: Dict[str, str] = {}
+        for node in nodes:
+            if getattr(node, 'asset_type', '') == 'grid':
+                self.region_grid.setdefault(node.region_id, node.id)
+                self.grid_region[node.id] = node.region_id
 
 class NLEngine:
     """Natural language processing engine for scenario interpretation"""
     
-    def __init__(self, ripple_engine: RippleEngine):
+    def __init__(self, ripple_engine: RippleEngine, synonyms: Optional[Dict[str, str]] = None,
+                 cache: Optional[InterpretationCache] = None):
         self.ripple_engine = ripple_engine
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self._model = None
+        # LLM interpretations by (graph version, normalized query)
+        self.cache = cache if cache is not None else get_interpretation_cache()
         
-        # Keep aliases for fallback
+        # Synonyms on top of the aliases generated from the world graph
         self.asset_aliases = self._build_asset_aliases()
         self.region_aliases = self._build_region_aliases()
+        self.synonyms = {**self.asset_aliases, **self.region_aliases, **self._load_synonyms(), **(synonyms or {})}
+        self._index: Optional[_GraphIndex] = None
+        self._index_lock = threading.Lock()
+        # Nodes retrieved per query for the LLM prompt
+        self.prompt_top_k = int(os.getenv("NL_PROMPT_TOP_K", "12"))
+
+        # Hedging: the LLM gets latency_budget_s when the regex answer is confident
+        # enough to serve instead, and llm_timeout_s otherwise
+        self.latency_budget_s = float(os.getenv("NL_LATENCY_BUDGET_S", "2.0"))
+        self.llm_timeout_s = float(os.getenv("NL_LLM_TIMEOUT_S", "10.0"))
+        self.regex_confidence = float(os.getenv("NL_REGEX_CONFIDENCE", "0.8"))
+        self.breaker = CircuitBreaker(
+            threshold=int(os.getenv("NL_BREAKER_THRESHOLD", "3")),
+            cooldown_s=float(os.getenv("NL_BREAKER_COOLDOWN_S", "30")),
+        )
+        self._llm_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("NL_LLM_CONCURRENCY", "4")), thread_name_prefix="nl-llm"
+        )
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._metrics_lock = threading.Lock()
     
+    @property
+    def model(self):
+        """Gemini model, imported and configured on first use"""
+        if self._model is None:
+            # google.generativeai is slow to import; only pay for it when the LLM path runs
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel('gemini-1.5-flash')
+        return self._model
+
     def interpret(self, query: NLQuery) -> NLInterpretation:
         """Interpret natural language query into structured scenario"""
-        if self.api_key:
-            try:
-                return self._interpret_llm(query)
-            except Exception as e:
-                print(f"LLM interpretation failed: {e}. Falling back to regex.")
-                return self._interpret_regex(query)
-        else:
-            return self._interpret_regex(query)
+        phase = Phase('nl.interpret')
+        source, interpretation = self._collect(query, *self._submit(query))
+        self._record(source, phase.finish(source))
+        return interpretation
+
+    def interpret_batch(self, queries: List[NLQuery]) -> List[NLInterpretation]:
+        """Interpret many queries at once, in order.
+
+        Queries with the same normalized text are interpreted once, and all
+        LLM calls are in flight together, so the batch waits for at most one
+        deadline rather than one per query.
+        """
+        keys = [normalize_query(query.text) for query in queries]
+        distinct = {}
+        for key, query in zip(keys, queries):
+            distinct.setdefault(key, query)
+        answers, pending = {}, {}
+        with Phase('nl.interpret_batch'):
+            # Each query is timed from its own submission, not from the start of the batch
+            for key, query in distinct.items():
+                source, answers[key], future, started = self._submit(query)
+                if future is None:
+                    self._record(source, time.monotonic() - started)
+                else:
+                    pending[key] = (future, started)
+            for key, (future, started) in pending.items():
+                source, answers[key] = self._collect(distinct[key], None, None, future, started)
+                self._record(source, time.monotonic() - started)
+        return [answers[key] for key in keys]
+
+    def _submit(self, query: NLQuery) -> Tuple[Optional[str], Optional[NLInterpretation], Optional[Future], float]:
+        """Answer from the cache or the regex parser, or start the LLM call.
+
+        Returns (path, interpretation, None, started) when answered, and
+        (None, None, LLM future, started) otherwise.
+        """
+        started = time.monotonic()
+        if not self.api_key:
+            return 'regex', self._interpret_regex(query), None, started
+
+        version = self.ripple_engine.world_version
+        cached = self.cache.get(query.text, version)
+        if cached is not None:
+            return 'cache', cached, None, started
+        if not self.breaker.allow():
+            return 'regex_breaker_open', self._interpret_regex(query), None, started
+
+        return None, None, self._llm_pool.submit(self._interpret_llm_cached, query, version), started
+
+    def _collect(self, query: NLQuery, source: Optional[str], interpretation: Optional[NLInterpretation],
+                 future: Optional[Future], started: float) -> Tuple[str, NLInterpretation]:
+        """(answering path, interpretation)
+
+        The LLM call runs on a worker thread while the regex parser runs
+        here. A late or failing LLM answers with the regex result, and
+        repeated misses open the circuit breaker so later queries skip the
+        LLM until it cools down. Late LLM answers still land in the cache.
+        """
+        if future is None:
+            return source, interpretation
+
+        regex = self._interpret_regex(query)
+        deadline = self.latency_budget_s if regex.confidence >= self.regex_confidence else self.llm_timeout_s
+        try:
+            interpretation = future.result(timeout=max(0.0, deadline - (time.monotonic() - started)))
+        except FutureTimeout:
+            self.breaker.record_failure()
+            print(f"LLM interpretation missed its {deadline:.1f}s deadline. Falling back to regex.")
+            return 'regex_deadline', regex
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"LLM interpretation failed: {e}. Falling back to regex.")
+            return 'regex_error', regex
+        self.breaker.record_success()
+        return 'llm', interpretation
+
+    def _interpret_llm_cached(self, query: NLQuery, version: Optional[str]) -> NLInterpretation:
+        """Cache every successful LLM answer, including ones that miss the deadline"""
+        interpretation = self._interpret_llm(query)
+        self.cache.put(query.text, version, interpretation)
+        return interpretation
+
+    def _record(self, source: str, elapsed_s: float):
+        INTERPRET_SECONDS.labels(source).observe(elapsed_s)
+        with self._metrics_lock:
+            entry = self._metrics.setdefault(source, {'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            entry['count'] += 1
+            entry['total_s'] += elapsed_s
+            entry['max_s'] = max(entry['max_s'], elapsed_s)
+
+    def stats(self) -> Dict[str, Any]:
+        """Which path answered, with latencies, plus breaker and cache state"""
+        with self._metrics_lock:
+            answered_by = {
+                source: {
+                    'count': entry['count'],
+                    'mean_s': entry['total_s'] / entry['count'],
+                    'max_s': entry['max_s'],
+                }
+                for source, entry in self._metrics.items()
+            }
+        return {
+            'answered_by': answered_by,
+            'breaker': self.breaker.stats(),
+            'cache': {'size': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses},
+            'latency_budget_s': self.latency_budget_s,
+            'llm_timeout_s': self.llm_timeout_s,
+        }
 
     def _interpret_llm(self, query: NLQuery) -> NLInterpretation:
         """Interpret query using Gemini"""
-        # Get available nodes for context
-        graph_data = self.ripple_engine.get_graph_data(planet='earth') # Default to earth context
-        nodes = [f"{n['name']} (id: {n['id']})" for n in graph_data['nodes']]
-        nodes_list = "\n".join(nodes)
-        
-        prompt = f"""
-        You are an AI assistant for a planetary simulation engine.
-        Your task is to interpret a user's natural language query and convert it into a structured simulation scenario (Shock).
-        
-        Available Nodes in the Simulation:
-        {nodes_list}
-        
-        User Query: "{query.text}"
-        
-        Extract the following fields:
-        1. target_ids: List of node IDs that are the targets of the shock. Map the user's intent to the closest available node IDs.
-        2. magnitude: A float between 0.0 and 1.0 representing the intensity of the shock (1.0 = total failure/shutdown, 0.1 = minor disruption).
-        3. duration_hours: Integer representing duration in hours.
-        4. description: A brief summary of the action.
-        
-        Return ONLY a JSON object with these fields. Do not include markdown formatting.
-        Example JSON:
-        {{
-            "target_ids": ["suez_canal"],
-            "magnitude": 0.5,
-            "duration_hours": 48,
-            "description": "Simulate 50% slowdown of Suez Canal for 48 hours"
-        }}
-        """
-        
+        prompt = self._build_prompt(query.text)
         response = self.model.generate_content(prompt)
         text = response.text.strip()
         # Clean markdown if present
@@ -161,56 +338,88 @@ class NLEngine:
             'australia': 'oc',
         }
 
-    def _extract_targets(self, text: str) -> List[str]:
+    def _load_synonyms(self) -> Dict[str, str]:
+        """Extra synonyms from the JSON file at NL_SYNONYMS_PATH, if set"""
+        path = os.getenv("NL_SYNONYMS_PATH")
+        if not path:
+            return {}
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Failed to load NL synonyms from {path}: {e}")
+            return {}
+
+    @property
+    def matcher(self) -> AliasMatcher:
+        """Alias automaton for the current graph, rebuilt when the world version changes"""
+        return self._graph_index().matcher
+
+    @property
+    def retriever(self) -> NodeRetriever:
+        """BM25 candidate index for the current graph"""
+        return self._graph_index().retriever
+
+    def _graph_index(self) -> _GraphIndex:
+        """Index for the current world version; rebuilt by one thread, then swapped in whole"""
+        version = self.ripple_engine.world_version
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self._index_lock:
+            index = self._index
+            if index is None or index.version != version:
+                index = _GraphIndex(version, list(self.ripple_engine.nodes.values()), self.synonyms)
+                self._index = index
+            return index
+
+    @staticmethod
+    def _node_line(node) -> str:
+        kind = getattr(node, 'asset_type', 'region')
+        return f"{node.name} (id: {node.id}, {kind}, planet: {getattr(node, 'planet', 'earth')})"
+
+    def _candidates(self, text: str, index: Optional[_GraphIndex] = None) -> List[str]:
+        """Nodes worth showing the model: exact alias hits, then the BM25 top-k"""
+        index = index or self._graph_index()
+        candidates = dict.fromkeys(self._extract_targets(text.lower(), index))
+        for node_id in index.retriever.top_k(text, self.prompt_top_k, PROMPT_MIN_RATIO):
+            candidates.setdefault(node_id, None)
+        return list(candidates)
+
+    def _build_prompt(self, text: str) -> str:
+        """Precomputed header for the graph version plus candidates and the query"""
+        index = self._graph_index()
+        candidates = self._candidates(text, index)
+        return index.prompt_header + PROMPT_QUERY.format(
+            candidates="\n".join(index.node_lines[node_id] for node_id in candidates) or "(none)",
+            query=text,
+        )
+
+    def _extract_targets(self, text: str, index: Optional[_GraphIndex] = None) -> List[str]:
         """Extract target assets/regions from text"""
-        targets = []
-        
-        # Check for asset mentions
-        for alias, asset_id in self.asset_aliases.items():
-            if alias in text:
-                targets.append(asset_id)
-        
-        # Check for region mentions
-        for alias, region_id in self.region_aliases.items():
-            if alias in text:
-                targets.append(region_id)
-        
-        # Check for specific patterns
-        if 'port' in text:
-            if 'panama' in text:
-                targets.append('panama_canal')
-            elif 'suez' in text:
-                targets.append('suez_canal')
-            elif 'los angeles' in text or 'la' in text:
-                targets.append('los_angeles')
-        
-        if 'grid' in text or 'power' in text:
-            if 'us' in text or 'america' in text:
-                targets.append('us_east')
-            elif 'europe' in text:
-                targets.append('eu_central')
-            elif 'china' in text:
-                targets.append('china_east')
-        
-        return list(set(targets))  # Remove duplicates
+        index = index or self._graph_index()
+        targets = index.matcher.match(text)
+        
+        # "power outage in Europe": add the region's grid unless one was named
+        if GRID_WORDS.intersection(tokenize(text)):
+            named = {index.grid_region[t] for t in targets if t in index.grid_region}
+            for target in list(targets):
+                grid = index.region_grid.get(target)
+                if grid is not None and target not in named and grid not in targets:
+                    targets.append(grid)
+        
+        return targets
     
     def _extract_magnitude(self, text: str) -> Optional[float]:
         """Extract magnitude percentage from text"""
         # Look for percentage patterns
-        percent_pattern = r'(\d+(?:\.\d+)?)\s*%'
-        match = re.search(percent_pattern, text)
+        match = PERCENT_RE.search(text)
         if match:
             return float(match.group(1)) / 100.0
         
         # Look for fraction patterns
-        fraction_patterns = [
-            r'(\d+(?:\.\d+)?)\s*percent',
-            r'(\d+(?:\.\d+)?)\s*per\s*cent',
-            r'(\d+(?:\.\d+)?)\s*of',
-        ]
-        
-        for pattern in fraction_patterns:
-            match = re.search(pattern, text)
+        for pattern in FRACTION_RES:
+            match = pattern.search(text)
             if match:
                 return float(match.group(1)) / 100.0
         
@@ -226,39 +435,11 @@ class NLEngine:
     
     def _extract_duration(self, text: str) -> Optional[int]:
         """Extract duration from text"""
-        # Look for hour patterns
-        hour_patterns = [
-            r'(\d+)\s*hours?',
-            r'(\d+)\s*hrs?',
-            r'(\d+)\s*h',
-        ]
-        
-        for pattern in hour_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return int(match.group(1))
-        
-        # Look for day patterns
-        day_patterns = [
-            r'(\d+)\s*days?',
-            r'(\d+)\s*d',
-        ]
-        
-        for pattern in day_patterns:
-            match = re.search(pattern, text)
+        # Hours, then days, then weeks
+        for pattern, hours in DURATION_RES:
+            match = pattern.search(text)
             if match:
-                return int(match.group(1)) * 24
-        
-        # Look for week patterns
-        week_patterns = [
-            r'(\d+)\s*weeks?',
-            r'(\d+)\s*w',
-        ]
-        
-        for pattern in week_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return int(match.group(1)) * 24 * 7
+                return int(match.group(1)) * hours
         
         # Default durations for common scenarios
         if 'brief' in text or 'short' in text:
@@ -281,7 +462,7 @@ class NLEngine:
         else:
             return 'disruption'
     
-    def run_query(self, query: NLQuery) -> NLResponse:
+    def run_query(self, query: NLQuery, shape: Optional[SeriesShape] = None) -> NLResponse:
         """Run natural language query and return results"""
         interpretation = self.interpret(query)
         
@@ -290,7 +471,7 @@ class NLEngine:
         
         if interpretation.scenario_spec:
             try:
-                simulation_result = self.ripple_engine.simulate_shock(interpretation.scenario_spec)
+                simulation_result = self.ripple_engine.simulate_shock(interpretation.scenario_spec, shape=shape)
             except Exception as e:
                 error = f"Simulation failed: {str(e)}"
         
@@ -299,3 +480,43 @@ class NLEngine:
             simulation_result=simulation_result,
             error=error
         )
+
+    def run_batch(self, queries: List[NLQuery], shape: Optional[SeriesShape] = None) -> List[NLResponse]:
+        """Run many queries, simulating each distinct shock once, in order.
+
+        Interpretations are stamped with the time they were made, so start
+        time is left out of the key: queries whose shocks differ only in
+        start time share one simulation and saved scenario, and each response
+        carries its own shock.
+        """
+        interpretations = self.interpret_batch(queries)
+
+        # Target order and repeats do not change a shock
+        def shock_key(shock: Shock) -> Tuple:
+            return (tuple(sorted(set(shock.target_ids))), shock.magnitude, shock.duration_hours)
+
+        shocks: Dict[Tuple, Shock] = {}
+        for interpretation in interpretations:
+            if interpretation.scenario_spec:
+                shocks.setdefault(shock_key(interpretation.scenario_spec), interpretation.scenario_spec)
+
+        results: Dict[Tuple, SimulationResult] = {}
+        error = None
+        if shocks:
+            try:
+                results = dict(zip(shocks, self.ripple_engine.simulate_shocks(list(shocks.values()), shape)))
+            except Exception as e:
+                error = f"Simulation failed: {str(e)}"
+
+        responses = []
+        for interpretation in interpretations:
+            spec = interpretation.scenario_spec
+            result = results.get(shock_key(spec)) if spec else None
+            if result is not None and result.shock != spec:
+                result = result.model_copy(update={'shock': spec})
+            responses.append(NLResponse(
+                interpretation=interpretation,
+                simulation_result=result,
+                error=error if spec else None
+            ))
+        return responses
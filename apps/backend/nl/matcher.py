@@ -0,0 +1,131 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words dropped from port/canal names to form the short alias ("Port of Rotterdam" -> "rotterdam")
+PORT_AFFIXES = {'port', 'of', 'canal'}
+# Bare ids shorter than this are only matched through names or synonyms ("as", "eu", ...)
+MIN_ID_ALIAS_LEN = 4
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; punctuation and case never split or join words"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class AliasMatcher:
+    """Word-level Aho-Corasick automaton over alias phrases.
+
+    Phrases are token sequences, so matches always start and end on word
+    boundaries ("la" never fires inside "scale"). One pass over the query
+    tokens finds every alias occurrence regardless of how many aliases
+    exist; overlaps resolve leftmost-longest ("panama canal" beats "panama").
+    """
+
+    def __init__(self, aliases: Dict[str, Sequence[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (phrase length, target ids) for phrases ending at a state
+        self._out: List[Optional[Tuple[int, Tuple[str, ...]]]] = [None]
+        # Next state on the failure chain that ends a phrase
+        self._dict: List[int] = [0]
+        self.size = 0
+        for phrase, ids in aliases.items():
+            self._add(tokenize(phrase), tuple(ids))
+        self._link()
+
+    def _add(self, tokens: List[str], ids: Tuple[str, ...]):
+        if not tokens or not ids:
+            return
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+                self._dict.append(0)
+            state = nxt
+        if self._out[state] is None:
+            self.size += 1
+        self._out[state] = (len(tokens), ids)
+
+    def _link(self):
+        """Breadth-first failure and dictionary links"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for token, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                failed = self._fail[child]
+                self._dict[child] = failed if self._out[failed] is not None else self._dict[failed]
+                queue.append(child)
+
+    def _occurrences(self, tokens: Sequence[str]) -> Iterable[Tuple[int, int, Tuple[str, ...]]]:
+        """Every (start, end, ids) alias occurrence, end exclusive"""
+        state = 0
+        for end, token in enumerate(tokens, 1):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            match = state if self._out[state] is not None else self._dict[state]
+            while match:
+                length, ids = self._out[match]
+                yield end - length, end, ids
+                match = self._dict[match]
+
+    def find(self, text: str) -> List[Tuple[int, int, Tuple[str, ...]]]:
+        """Non-overlapping leftmost-longest matches as (start, end, ids) token spans"""
+        found = sorted(self._occurrences(tokenize(text)), key=lambda m: (m[0], m[0] - m[1]))
+        matches, covered = [], 0
+        for start, end, ids in found:
+            if start >= covered:
+                matches.append((start, end, ids))
+                covered = end
+        return matches
+
+    def match(self, text: str) -> List[str]:
+        """Target ids mentioned in text, in order of appearance"""
+        seen: Dict[str, None] = {}
+        for _, _, ids in self.find(text):
+            for node_id in ids:
+                seen.setdefault(node_id, None)
+        return list(seen)
+
+
+def node_aliases(node_id: str, name: str, asset_type: str = '') -> List[str]:
+    """Alias phrases generated from a node's id and display name"""
+    aliases = [name]
+    id_phrase = node_id.replace('_', ' ')
+    if len(node_id) >= MIN_ID_ALIAS_LEN or ' ' in id_phrase:
+        aliases.append(id_phrase)
+    if asset_type == 'port':
+        short = [token for token in tokenize(name) if token not in PORT_AFFIXES]
+        if short:
+            aliases.append(' '.join(short))
+    return aliases
+
+
+def build_alias_index(nodes: Iterable[Tuple[str, str, str]],
+                      synonyms: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
+    """Phrase -> node ids from (id, name, asset_type) rows plus configured synonyms.
+
+    Synonyms win over generated aliases for the same phrase; generated
+    phrases shared by several nodes map to all of them.
+    """
+    index: Dict[str, List[str]] = {}
+    for node_id, name, asset_type in nodes:
+        for alias in node_aliases(node_id, name, asset_type):
+            phrase = ' '.join(tokenize(alias))
+            ids = index.setdefault(phrase, [])
+            if node_id not in ids:
+                ids.append(node_id)
+    for alias, node_id in (synonyms or {}).items():
+        index[' '.join(tokenize(alias))] = [node_id]
+    return index
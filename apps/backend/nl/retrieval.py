@@ -0,0 +1,96 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .matcher import tokenize
+
+# Character n-grams let misspellings and partial names still retrieve a node ("rotterdm")
+NGRAM = 3
+
+
+def index_terms(text: str) -> List[str]:
+    """Word tokens plus padded character trigrams of each word, in separate namespaces"""
+    terms = []
+    for token in tokenize(text):
+        terms.append(f"w:{token}")
+        padded = f" {token} "
+        terms.extend(f"g:{padded[i:i + NGRAM]}" for i in range(len(padded) - NGRAM + 1))
+    return terms
+
+
+class NodeRetriever:
+    """BM25 index over one text document per node.
+
+    Term weights are computed once at build time, so a query costs one
+    postings lookup and a vector add per distinct query term, plus a
+    partial sort of the scores.
+    """
+
+    def __init__(self, docs: Iterable[Tuple[str, str]], k1: float = 1.2, b: float = 0.75):
+        self.ids: List[str] = []
+        counts: List[Counter] = []
+        for node_id, text in docs:
+            self.ids.append(node_id)
+            counts.append(Counter(index_terms(text)))
+
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float64)
+        avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for doc, terms in enumerate(counts):
+            norm = k1 * (1 - b + b * lengths[doc] / avg_length)
+            for term, tf in terms.items():
+                docs_, weights = postings.setdefault(term, ([], []))
+                docs_.append(doc)
+                weights.append(tf * (k1 + 1) / (tf + norm))
+
+        n = len(self.ids)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, (docs_, weights) in postings.items():
+            idf = math.log(1 + (n - len(docs_) + 0.5) / (len(docs_) + 0.5))
+            self._postings[term] = (np.array(docs_, dtype=np.int64),
+                                    np.array(weights, dtype=np.float64) * idf)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, text: str) -> np.ndarray:
+        """BM25 score of every node for the query"""
+        scores = np.zeros(len(self.ids), dtype=np.float64)
+        for term in set(index_terms(text)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                np.add.at(scores, posting[0], posting[1])
+        return scores
+
+    def top_k(self, text: str, k: int, min_ratio: float = 0.0) -> List[str]:
+        """Ids of the k best-scoring nodes, best first.
+
+        Nodes scoring below ``min_ratio`` of the best score are dropped, which
+        trims matches that only share a trigram or two with the query.
+        """
+        scores = self.scores(text)
+        best = scores.max() if len(scores) else 0.0
+        hits = np.flatnonzero((scores > 0) & (scores >= best * min_ratio))
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        # Stable on ties: graph order
+        hits = hits[np.lexsort((hits, -scores[hits]))]
+        return [self.ids[i] for i in hits.tolist()]
+
+
+def node_documents(nodes: Sequence, synonyms: Dict[str, str]) -> List[Tuple[str, str]]:
+    """(id, text) per node: name, id, asset type, region name, planet and synonyms"""
+    region_names = {node.id: node.name for node in nodes if not hasattr(node, 'asset_type')}
+    extra: Dict[str, List[str]] = {}
+    for alias, node_id in synonyms.items():
+        extra.setdefault(node_id, []).append(alias)
+    docs = []
+    for node in nodes:
+        region_id = getattr(node, 'region_id', '')
+        parts = [node.name, node.id.replace('_', ' '), getattr(node, 'asset_type', 'region'),
+                 region_names.get(region_id, region_id), getattr(node, 'planet', '')]
+        parts.extend(extra.get(node.id, []))
+        docs.append((node.id, ' '.join(parts)))
+    return docs
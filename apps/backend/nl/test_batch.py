@@ -0,0 +1,39 @@
+from nl import NLEngine
+from nl.cache import InterpretationCache
+from schemas import NLQuery
+from sim import RippleEngine
+
+
+def test_batch_answers_in_order_and_simulates_each_shock_once(monkeypatch):
+    engine = NLEngine(RippleEngine(), cache=InterpretationCache())
+    batches = []
+    simulate_shocks = engine.ripple_engine.simulate_shocks
+
+    def recording(shocks, shape=None):
+        batches.append(shocks)
+        return simulate_shocks(shocks, shape)
+
+    monkeypatch.setattr(engine.ripple_engine, 'simulate_shocks', recording)
+    texts = [
+        "Simulate 40% slowdown in Suez Canal for 7 days",
+        "Show the current status of all layers",
+        "simulate 40 percent slowdown in suez canal for 7 days",
+        "Rotterdam partial closure for 24 hours",
+        "Suez canal 40% slowdown for 168 hours",
+    ]
+    responses = engine.run_batch([NLQuery(text=text) for text in texts])
+
+    # Same shock from any text: one simulation; each response keeps its own start time
+    assert len(batches) == 1 and len(batches[0]) == 2
+    assert [r.interpretation.scenario_spec is not None for r in responses] == [True, False, True, True, True]
+    assert responses[1].simulation_result is None
+    assert responses[0].simulation_result is responses[2].simulation_result
+    first, last = responses[0].simulation_result, responses[4].simulation_result
+    assert last.scenario_id == first.scenario_id
+    assert last.shock == responses[4].interpretation.scenario_spec
+    assert first.shock == responses[0].interpretation.scenario_spec
+    assert {k: list(v) for k, v in last.impact_series.items()} == {k: list(v) for k, v in first.impact_series.items()}
+    assert responses[3].simulation_result.shock.target_ids == ['rotterdam']
+    single = engine.run_query(NLQuery(text=texts[3]))
+    batched, alone = responses[3].simulation_result.impact_series, single.simulation_result.impact_series
+    assert {k: list(v) for k, v in batched.items()} == {k: list(v) for k, v in alone.items()}
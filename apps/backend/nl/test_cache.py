@@ -0,0 +1,108 @@
+import json
+import time
+
+from nl import NLEngine
+from nl.cache import InterpretationCache, normalize_query
+from schemas import NLInterpretation, NLQuery, Shock
+from sim import RippleEngine
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for the Gemini model; counts round trips"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt: str) -> FakeResponse:
+        self.calls += 1
+        return FakeResponse(json.dumps({
+            'target_ids': ['suez_canal'], 'magnitude': 0.4, 'duration_hours': 168,
+            'description': 'Simulate 40% slowdown of Suez Canal for 168 hours',
+        }))
+
+
+def make_engine(cache: InterpretationCache) -> NLEngine:
+    engine = NLEngine(RippleEngine(), cache=cache)
+    engine.api_key = 'test'
+    engine._model = FakeModel()
+    return engine
+
+
+def interpretation(target: str) -> NLInterpretation:
+    return NLInterpretation(
+        scenario_spec=Shock(target_ids=[target], magnitude=0.5, duration_hours=24),
+        queries=[target], confidence=0.95,
+    )
+
+
+def test_normalization_ignores_case_spacing_and_number_format():
+    canonical = normalize_query("simulate 40% slowdown in suez canal for 7 days")
+    for variant in [
+        "Simulate 40% slowdown in Suez Canal for 7 days",
+        "  simulate   40.0% slowdown in suez canal for 7 days.",
+        "SIMULATE 40 percent slowdown in suez canal for 7 days!",
+        "simulate 40 % slowdown\tin suez canal for 07 days",
+    ]:
+        assert normalize_query(variant) == canonical
+    assert normalize_query("simulate 45% slowdown in suez canal for 7 days") != canonical
+    assert normalize_query("1,000 hours") == normalize_query("1000 hours")
+
+
+def test_repeated_queries_skip_the_model():
+    engine = make_engine(InterpretationCache())
+    first = engine.interpret(NLQuery(text="Simulate 40% slowdown in Suez Canal for 7 days"))
+    assert engine._model.calls == 1
+
+    started = time.perf_counter()
+    for _ in range(200):
+        again = engine.interpret(NLQuery(text="simulate 40 percent slowdown in suez canal for 7 days"))
+    per_hit_us = (time.perf_counter() - started) / 200 * 1e6
+    print(f"NL cache hit {per_hit_us:.1f} us")
+
+    assert engine._model.calls == 1
+    assert again.scenario_spec.target_ids == first.scenario_spec.target_ids
+    assert again.scenario_spec.start_ts >= first.scenario_spec.start_ts
+    assert per_hit_us < 1000
+
+    # A new graph version invalidates every entry
+    engine.ripple_engine.world_version = 'other'
+    engine.interpret(NLQuery(text="Simulate 40% slowdown in Suez Canal for 7 days"))
+    assert engine._model.calls == 2
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = InterpretationCache(max_entries=2, ttl_s=60)
+    cache.put("a", "v1", interpretation("suez_canal"))
+    cache.put("b", "v1", interpretation("panama_canal"))
+    assert cache.get("a", "v1") is not None
+    cache.put("c", "v1", interpretation("rotterdam"))
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.get("a", "v1") is None
+    assert len(cache) == 1
+
+
+def test_persists_across_restarts(tmp_path):
+    path = tmp_path / "nl_cache.jsonl"
+    engine = make_engine(InterpretationCache(path=path))
+    engine.interpret(NLQuery(text="Simulate 40% slowdown in Suez Canal for 7 days"))
+
+    restarted = make_engine(InterpretationCache(path=path))
+    result = restarted.interpret(NLQuery(text="simulate 40% slowdown in suez canal for 7 days"))
+    assert restarted._model.calls == 0
+    assert result.scenario_spec.target_ids == ['suez_canal']
+
+    # The log is compacted once it outgrows the cache
+    small = InterpretationCache(max_entries=2, path=tmp_path / "small.jsonl")
+    for i in range(10):
+        small.put(f"query {i}", "v1", interpretation("suez_canal"))
+    assert len((tmp_path / "small.jsonl").read_text().splitlines()) <= 5
+    assert InterpretationCache(max_entries=2, path=tmp_path / "small.jsonl").get("query 9", "v1") is not None
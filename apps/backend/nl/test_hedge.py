@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from nl import NLEngine
+from nl.breaker import CircuitBreaker
+from nl.cache import InterpretationCache
+from schemas import NLQuery
+from sim import RippleEngine
+
+QUERY = NLQuery(text="Simulate 40% slowdown in Suez Canal for 7 days")
+
+
+class FakeModelServer(ThreadingHTTPServer):
+    """Local stand-in for the model API: answers after ``delay_s``, or fails"""
+
+    delay_s = 0.0
+    fail = False
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeModelHandler)
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(self.server.delay_s)
+        if self.server.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'text': json.dumps({
+            'target_ids': ['panama_canal'], 'magnitude': 0.9, 'duration_hours': 12,
+        })}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpModel:
+    """Model client for the fake server, shaped like the Gemini model"""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def generate_content(self, prompt: str):
+        response = httpx.post(self.url, json={'prompt': prompt}, timeout=5)
+        response.raise_for_status()
+        return type('Response', (), {'text': response.json()['text']})()
+
+
+@pytest.fixture
+def server():
+    server = FakeModelServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def engine(server):
+    engine = NLEngine(RippleEngine(), cache=InterpretationCache())
+    engine.api_key = 'test'
+    engine._model = HttpModel(f"http://127.0.0.1:{server.server_address[1]}/generate")
+    engine.latency_budget_s = 0.2
+    engine.llm_timeout_s = 1.0
+    engine.breaker = CircuitBreaker(threshold=2, cooldown_s=0.3)
+    return engine
+
+
+def test_fast_llm_answers(engine):
+    interpretation = engine.interpret(QUERY)
+    assert interpretation.scenario_spec.target_ids == ['panama_canal']
+    assert engine.interpret(QUERY).scenario_spec.target_ids == ['panama_canal']
+    assert engine.stats()['answered_by']['llm']['count'] == 1
+    assert engine.stats()['answered_by']['cache']['count'] == 1
+
+
+def test_slow_llm_falls_back_to_regex_within_budget(engine, server):
+    server.delay_s = 0.6
+    started = time.perf_counter()
+    interpretation = engine.interpret(QUERY)
+    elapsed = time.perf_counter() - started
+
+    assert interpretation.scenario_spec.target_ids == ['suez_canal']
+    assert elapsed < 0.5
+    assert engine.stats()['answered_by']['regex_deadline']['count'] == 1
+
+    # The late answer still lands in the cache
+    time.sleep(0.6)
+    assert engine.interpret(QUERY).scenario_spec.target_ids == ['panama_canal']
+
+
+def test_low_confidence_regex_waits_for_the_llm(engine, server):
+    server.delay_s = 0.4
+    interpretation = engine.interpret(NLQuery(text="Something odd near the canal"))
+    assert interpretation.scenario_spec.target_ids == ['panama_canal']
+
+
+def test_breaker_opens_after_repeated_failures_and_recovers(engine, server):
+    server.fail = True
+    engine.interpret(QUERY)
+    engine.interpret(NLQuery(text="Close the Panama Canal completely for 48 hours"))
+    assert engine.breaker.state == 'open'
+
+    started = time.perf_counter()
+    interpretation = engine.interpret(NLQuery(text="Rotterdam partial closure for 24 hours"))
+    assert time.perf_counter() - started < 0.05
+    assert interpretation.scenario_spec.target_ids == ['rotterdam']
+
+    stats = engine.stats()
+    assert stats['answered_by']['regex_error']['count'] == 2
+    assert stats['answered_by']['regex_breaker_open']['count'] == 1
+    assert stats['breaker']['trips'] == 1
+
+    # After the cooldown one trial call goes through and closes the breaker
+    server.fail = False
+    time.sleep(0.35)
+    assert engine.breaker.state == 'half_open'
+    engine.interpret(NLQuery(text="Singapore port 60% congestion for 5 days"))
+    assert engine.breaker.state == 'closed'
@@ -0,0 +1,100 @@
+import json
+import time
+from pathlib import Path
+
+from nl import NLEngine
+from nl.matcher import AliasMatcher, build_alias_index
+from sim import RippleEngine
+
+CORPUS = json.loads((Path(__file__).parent / "query_corpus.json").read_text())
+
+
+def test_matches_on_word_boundaries_leftmost_longest():
+    matcher = AliasMatcher({
+        'la': ['los_angeles'],
+        'panama': ['panama'],
+        'panama canal': ['panama_canal'],
+        'canal zone': ['zone'],
+        'us': ['na'],
+    })
+    assert matcher.match("Scale up the status report") == []
+    assert matcher.match("LA, then the Panama Canal zone") == ['los_angeles', 'panama_canal']
+    assert matcher.match("panama-canal and the canal zone") == ['panama_canal', 'zone']
+    assert matcher.match("US") == ['na']
+
+
+def test_aliases_follow_the_world_graph(tmp_path):
+    from world import WorldRepository
+    world_data = json.loads(Path(__file__).parent.parent.joinpath("data/world_nodes.json").read_text())
+    world_data['nodes'].append({
+        'id': 'valencia', 'name': 'Port of Valencia', 'type': 'asset', 'asset_type': 'port',
+        'region_id': 'eu', 'lat': 39.45, 'lon': -0.32, 'capacity': 0.6,
+    })
+    path = tmp_path / "world_nodes.json"
+    path.write_text(json.dumps(world_data))
+
+    engine = NLEngine(RippleEngine(world=WorldRepository(path)), synonyms={'vlc': 'valencia'})
+    assert engine._extract_targets("valencia strike") == ['valencia']
+    assert engine._extract_targets("port of valencia and vlc") == ['valencia']
+
+
+def test_index_is_built_once_and_published_whole(monkeypatch):
+    import threading
+    import nl.engine
+    engine = NLEngine(RippleEngine())
+    builds = []
+    build = nl.engine._GraphIndex.__init__
+
+    def counting(self, *args):
+        builds.append(1)
+        time.sleep(0.05)
+        build(self, *args)
+
+    monkeypatch.setattr(nl.engine._GraphIndex, '__init__', counting)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append((engine.matcher, engine.retriever)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len(set(seen)) == 1 and seen[0] == (engine._index.matcher, engine._index.retriever)
+
+
+def test_corpus_accuracy_and_throughput():
+    engine = NLEngine(RippleEngine())
+    correct = {'targets': 0, 'magnitude': 0, 'duration_hours': 0}
+    for query in CORPUS:
+        text = query['text'].lower()
+        correct['targets'] += sorted(engine._extract_targets(text)) == sorted(query['targets'])
+        correct['magnitude'] += engine._extract_magnitude(text) == query['magnitude']
+        correct['duration_hours'] += engine._extract_duration(text) == query['duration_hours']
+    accuracy = {field: count / len(CORPUS) for field, count in correct.items()}
+
+    started = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        for query in CORPUS:
+            engine._extract_targets(query['text'].lower())
+    per_query_us = (time.perf_counter() - started) / (rounds * len(CORPUS)) * 1e6
+    print(f"NL corpus accuracy {accuracy}, target extraction {per_query_us:.1f} us/query")
+
+    assert accuracy['targets'] >= 0.95
+    assert accuracy['magnitude'] >= 0.95
+    assert accuracy['duration_hours'] >= 0.95
+
+
+def test_match_cost_does_not_grow_with_alias_count():
+    query = "simulate a 40% slowdown at the port of node 7 for three days " * 4
+
+    def per_query_s(n):
+        rows = [(f"node_{i}", f"Port of Node {i}", 'port') for i in range(n)]
+        matcher = AliasMatcher(build_alias_index(rows))
+        started = time.perf_counter()
+        for _ in range(200):
+            matcher.match(query)
+        return (time.perf_counter() - started) / 200
+
+    small, large = per_query_s(10), per_query_s(50_000)
+    assert large < small * 5
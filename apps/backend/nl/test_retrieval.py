@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from nl import NLEngine
+from nl.cache import InterpretationCache
+from nl.retrieval import NodeRetriever
+from schemas import NLQuery
+from sim import RippleEngine
+
+CORPUS = json.loads((Path(__file__).parent / "query_corpus.json").read_text())
+
+
+class PromptRecorder:
+    """Fake model that keeps every prompt it is sent"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt: str):
+        self.prompts.append(prompt)
+        return type('Response', (), {'text': json.dumps({
+            'target_ids': ['rotterdam'], 'magnitude': 0.5, 'duration_hours': 24,
+        })})()
+
+
+def test_bm25_ranks_names_and_tolerates_typos():
+    retriever = NodeRetriever([
+        ('rotterdam', 'Port of Rotterdam port Europe'),
+        ('hamburg', 'Port of Hamburg port Europe'),
+        ('eu_central', 'European Grid grid Europe'),
+    ])
+    assert retriever.top_k("rotterdam strike", 2)[0] == 'rotterdam'
+    assert retriever.top_k("rotterdm strike", 2)[0] == 'rotterdam'
+    assert retriever.top_k("european power grid", 1) == ['eu_central']
+    assert retriever.top_k("xyz", 3) == []
+
+
+def test_corpus_targets_are_always_candidates():
+    engine = NLEngine(RippleEngine(), cache=InterpretationCache())
+    for query in CORPUS:
+        candidates = engine._candidates(query['text'])
+        assert set(query['targets']) <= set(candidates), query['text']
+        assert len(candidates) <= engine.prompt_top_k + len(query['targets'])
+
+
+def test_prompt_size_does_not_grow_with_the_graph(tmp_path):
+    from world import WorldRepository
+    world_data = json.loads(Path(__file__).parent.parent.joinpath("data/world_nodes.json").read_text())
+    base = NLEngine(RippleEngine(), cache=InterpretationCache())._build_prompt("Rotterdam strike for 2 days")
+
+    world_data['nodes'].extend({
+        'id': f'depot_{i}', 'name': f'Depot {i}', 'type': 'asset', 'asset_type': 'warehouse',
+        'region_id': 'eu', 'lat': 50.0, 'lon': 4.0, 'capacity': 0.5,
+    } for i in range(3000))
+    path = tmp_path / "world_nodes.json"
+    path.write_text(json.dumps(world_data))
+
+    engine = NLEngine(RippleEngine(world=WorldRepository(path)), cache=InterpretationCache())
+    engine.api_key = 'test'
+    engine._model = PromptRecorder()
+    engine.interpret(NLQuery(text="Rotterdam strike for 2 days"))
+    prompt = engine._model.prompts[0]
+
+    assert "id: rotterdam" in prompt
+    assert "Mars Equatorial (id: mars_eq" in prompt
+    assert len(prompt) < len(base) * 2
@@ -0,0 +1,32 @@
+from .globe import (
+    GLOBE_MEDIA_TYPE,
+    QUANT_UNIT_U8,
+    GlobePayload,
+    accepts_globe,
+    decode_globe,
+    encode_graph,
+    encode_impact_frames,
+    encode_points,
+)
+from .arrow import (
+    ARROW_STREAM_MEDIA_TYPE,
+    PARQUET_MEDIA_TYPE,
+    encode_frame,
+    encode_simulation,
+    encode_table,
+    frame_to_polars,
+    negotiate_tabular,
+    polars_to_frame,
+    simulation_table,
+    stream_frame,
+    stream_simulation,
+    stream_table,
+)
+from .results import nl_response_payload, simulation_payload
+
+__all__ = ['GLOBE_MEDIA_TYPE', 'QUANT_UNIT_U8', 'GlobePayload', 'accepts_globe', 'decode_globe',
+           'encode_graph', 'encode_impact_frames', 'encode_points',
+           'ARROW_STREAM_MEDIA_TYPE', 'PARQUET_MEDIA_TYPE', 'encode_frame', 'encode_simulation', 'encode_table',
+           'frame_to_polars', 'negotiate_tabular', 'polars_to_frame', 'simulation_table',
+           'stream_frame', 'stream_simulation', 'stream_table',
+           'nl_response_payload', 'simulation_payload']
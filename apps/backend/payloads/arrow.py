@@ -0,0 +1,129 @@
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from schemas import SimulationResult
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+# Rows per record batch (Arrow) or row group (Parquet) when streaming a table
+STREAM_ROWS = 65_536
+
+
+def negotiate_tabular(accept: Optional[str]) -> Optional[str]:
+    """Pick a columnar media type from an Accept header, if one is requested"""
+    if not accept:
+        return None
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return ARROW_STREAM_MEDIA_TYPE
+    if PARQUET_MEDIA_TYPE in accept:
+        return PARQUET_MEDIA_TYPE
+    return None
+
+
+def frame_to_polars(data: pd.DataFrame) -> pl.DataFrame:
+    """Convert an agent DataFrame to polars through Arrow, without going through records"""
+    return pl.from_pandas(data)
+
+
+def polars_to_frame(frame: pl.DataFrame) -> pd.DataFrame:
+    """Convert a polars frame to pandas without requiring pyarrow"""
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        # List columns (e.g. alert tags) stay Python lists, as in the agents' own frames
+        columns[name] = series.to_list() if series.dtype == pl.List else series.to_numpy()
+    return pd.DataFrame(columns)
+
+
+class _Sink:
+    """Write-only file object that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_table(frame: pl.DataFrame, media_type: str, rows: int = STREAM_ROWS) -> Iterator[bytes]:
+    """Serialize a polars frame as an Arrow IPC stream or Parquet file, one batch at a time.
+
+    Each chunk holds one record batch (or row group), so a response can be
+    sent while the rest of the table is still being written.
+    """
+    # Imported on first use; pyarrow is heavy and only tabular responses need it
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = frame.to_arrow()
+    sink = _Sink()
+    if media_type == PARQUET_MEDIA_TYPE:
+        writer = pq.ParquetWriter(sink, table.schema)
+    else:
+        writer = pa.ipc.new_stream(sink, table.schema)
+    with writer:
+        for batch in table.to_batches(max_chunksize=rows):
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+def stream_frame(data: pd.DataFrame, media_type: str) -> Iterator[bytes]:
+    """Stream an agent DataFrame in the negotiated columnar format"""
+    return stream_table(frame_to_polars(data), media_type)
+
+
+def encode_table(frame: pl.DataFrame, media_type: str) -> bytes:
+    """Serialize a polars frame as an Arrow IPC stream or Parquet file"""
+    return b''.join(stream_table(frame, media_type))
+
+
+def encode_frame(data: pd.DataFrame, media_type: str) -> bytes:
+    """Serialize an agent DataFrame in the negotiated columnar format"""
+    return encode_table(frame_to_polars(data), media_type)
+
+
+def simulation_table(result: SimulationResult) -> pl.DataFrame:
+    """Wide impact table: one row per timestep, one float column per node"""
+    ids = list(result.impact_series)
+    steps = len(next(iter(result.impact_series.values()), []))
+    matrix = np.array([result.impact_series[i] for i in ids], dtype=np.float64).reshape(len(ids), steps)
+    # Downsampled results carry the hour of each point
+    t = np.arange(steps) if result.timesteps is None else np.asarray(result.timesteps)
+    columns = [pl.Series('t', t.astype(np.int32))]
+    columns.extend(pl.Series(node_id, matrix[row]) for row, node_id in enumerate(ids))
+    return pl.DataFrame(columns)
+
+
+def stream_simulation(result: SimulationResult, media_type: str) -> Iterator[bytes]:
+    """Stream a simulation result's impact table"""
+    return stream_table(simulation_table(result), media_type)
+
+
+def encode_simulation(result: SimulationResult, media_type: str) -> bytes:
+    """Serialize a simulation result's impact table"""
+    return encode_table(simulation_table(result), media_type)
@@ -0,0 +1,166 @@
+"""Compact binary encoding for globe data.
+
+Layout (little-endian)::
+
+    b"NTG1" | u32 header_len | header JSON (utf-8) | padding to 8 | body
+
+The JSON header carries the id dictionary and a field table; each field
+is a typed array in the body at an 8-byte aligned offset, so clients can
+wrap it with a typed-array view without copying. Quantized fields carry
+``scale``/``offset`` so ``value = raw * scale + offset``. Frame fields with
+``"delta": "mod256"`` store the first frame as-is and every following
+frame as the uint8 difference from the previous one (wrapping mod 256);
+decoding is a running sum per node.
+"""
+import json
+import struct
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from world.spatial import normalize_lon
+
+GLOBE_MEDIA_TYPE = "application/vnd.neuralterra.globe"
+MAGIC = b"NTG1"
+COORD_SCALE = 1e-7  # int32 degrees * 1e7 ~ 1 cm resolution
+# encode_points attribute mode: values in [0, 1] quantized to uint8 (scale 1/255)
+QUANT_UNIT_U8 = 'unit_u8'
+
+
+def accepts_globe(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for the binary globe encoding"""
+    return bool(accept) and GLOBE_MEDIA_TYPE in accept
+
+
+def quantize_unit(values: Sequence[float]) -> np.ndarray:
+    """Map values in [0, 1] to uint8"""
+    arr = np.clip(np.asarray(values, dtype=np.float64), 0.0, 1.0)
+    return np.rint(arr * 255).astype(np.uint8)
+
+
+def quantize_coords(values: Sequence[float], wrap: bool = False) -> np.ndarray:
+    """Degrees to int32 fixed point; ``wrap`` folds longitudes into [-180, 180)"""
+    arr = normalize_lon(values) if wrap else np.asarray(values, dtype=np.float64)
+    return np.rint(arr / COORD_SCALE).astype(np.int32)
+
+
+def delta_encode_frames(frames: np.ndarray) -> np.ndarray:
+    """Delta-encode a uint8 (timesteps x nodes) array along time, mod 256"""
+    out = frames.copy()
+    out[1:] = frames[1:] - frames[:-1]  # uint8 arithmetic wraps
+    return out
+
+
+def delta_decode_frames(deltas: np.ndarray) -> np.ndarray:
+    """Inverse of delta_encode_frames"""
+    return np.cumsum(deltas, axis=0, dtype=np.uint8)
+
+
+class GlobePayload:
+    """Builder for one binary globe message"""
+
+    def __init__(self, kind: str, ids: Optional[List[str]] = None, **meta: Any):
+        self.kind = kind
+        self.ids = ids
+        self.meta = meta
+        self.fields: List[Tuple[Dict[str, Any], np.ndarray]] = []
+
+    def add(self, name: str, values: np.ndarray, scale: Optional[float] = None,
+            offset: float = 0.0, **extra: Any) -> "GlobePayload":
+        """Add a typed array field"""
+        values = np.ascontiguousarray(values)
+        spec = {'name': name, 'dtype': values.dtype.name, 'shape': list(values.shape)}
+        if scale is not None:
+            spec['scale'] = scale
+            spec['offset'] = offset
+        spec.update(extra)
+        self.fields.append((spec, values))
+        return self
+
+    def encode(self) -> bytes:
+        """Serialize header and body"""
+        body = bytearray()
+        specs = []
+        for spec, values in self.fields:
+            body.extend(b"\0" * (-len(body) % 8))
+            spec = dict(spec, byte_offset=len(body), byte_length=values.nbytes)
+            body.extend(values.astype(values.dtype.newbyteorder('<'), copy=False).tobytes())
+            specs.append(spec)
+
+        header = {'kind': self.kind, 'fields': specs, **self.meta}
+        if self.ids is not None:
+            header['ids'] = self.ids
+        header_bytes = json.dumps(header, separators=(',', ':')).encode()
+        prefix = MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+        prefix += b"\0" * (-len(prefix) % 8)
+        return prefix + bytes(body)
+
+
+def decode_globe(payload: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Decode a globe message into its header and dequantized-ready arrays"""
+    if payload[:4] != MAGIC:
+        raise ValueError("Not a globe payload")
+    (header_len,) = struct.unpack_from('<I', payload, 4)
+    header = json.loads(payload[8:8 + header_len])
+    body_start = 8 + header_len + (-(8 + header_len) % 8)
+    arrays = {}
+    for spec in header['fields']:
+        start = body_start + spec['byte_offset']
+        raw = np.frombuffer(payload, dtype=np.dtype(spec['dtype']).newbyteorder('<'),
+                            count=int(np.prod(spec['shape'])), offset=start)
+        arrays[spec['name']] = raw.reshape(spec['shape'])
+    return header, arrays
+
+
+def encode_points(records: Any, attrs: Dict[str, str], id_col: Optional[str] = 'id',
+                  kind: str = 'points') -> bytes:
+    """Encode a layer DataFrame: ids, int32 lat/lon and quantized attributes.
+
+    ``attrs`` maps a column to ``QUANT_UNIT_U8`` (values in [0, 1] as
+    uint8), ``'float16'`` or ``'float32'``.
+    """
+    ids = [str(v) for v in records[id_col].to_list()] if id_col and id_col in records else None
+    payload = GlobePayload(kind, ids=ids, count=len(records))
+    if 'lat' in records and 'lon' in records:
+        payload.add('lat', quantize_coords(records['lat']), scale=COORD_SCALE)
+        payload.add('lon', quantize_coords(records['lon'], wrap=True), scale=COORD_SCALE)
+    for col, mode in attrs.items():
+        if col not in records:
+            continue
+        if mode == QUANT_UNIT_U8:
+            payload.add(col, quantize_unit(records[col]), scale=1 / 255)
+        else:
+            payload.add(col, np.asarray(records[col], dtype=mode))
+    return payload.encode()
+
+
+def encode_graph(graph_data: Dict[str, Any]) -> bytes:
+    """Encode get_graph_data output: node positions plus edges as id indexes"""
+    nodes = graph_data['nodes']
+    ids = [n['id'] for n in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    edges = [e for e in graph_data['edges'] if e['source'] in index and e['target'] in index]
+
+    payload = GlobePayload('graph', ids=ids, count=len(nodes),
+                           names=[n.get('name', '') for n in nodes],
+                           types=[n['type'] for n in nodes],
+                           asset_types=[n['asset_type'] for n in nodes])
+    payload.add('lat', quantize_coords([n['lat'] for n in nodes]), scale=COORD_SCALE)
+    payload.add('lon', quantize_coords([n['lon'] for n in nodes], wrap=True), scale=COORD_SCALE)
+    payload.add('capacity', np.asarray([n['capacity'] for n in nodes], dtype=np.float32))
+    payload.add('edge_source', np.asarray([index[e['source']] for e in edges], dtype=np.uint32))
+    payload.add('edge_target', np.asarray([index[e['target']] for e in edges], dtype=np.uint32))
+    payload.add('edge_weight', quantize_unit([e['weight'] for e in edges]), scale=1 / 255)
+    return payload.encode()
+
+
+def encode_impact_frames(impact_series: Dict[str, List[float]], **meta: Any) -> bytes:
+    """Encode impact_series as delta-coded uint8 frames (timesteps x nodes)"""
+    ids = list(impact_series)
+    if ids:
+        frames = quantize_unit(np.array([impact_series[i] for i in ids], dtype=np.float64).T)
+    else:
+        frames = np.zeros((0, 0), dtype=np.uint8)
+    payload = GlobePayload('impact_frames', ids=ids, **meta)
+    payload.add('impact', delta_encode_frames(frames), scale=1 / 255, delta='mod256')
+    return payload.encode()
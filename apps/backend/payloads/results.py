@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from schemas import NLResponse, SimulationResult
+
+
+def simulation_payload(result: SimulationResult) -> Dict[str, Any]:
+    """Result fields for ORJSONResponse, impact series left as NumPy rows.
+
+    Serializes to the same JSON as ``result.model_dump(mode='json')``
+    without walking every float through pydantic.
+    """
+    return {
+        'scenario_id': result.scenario_id,
+        'shock': result.shock.model_dump(mode='json'),
+        'impact_series': result.impact_series,
+        'kpis': result.kpis,
+        'duration_hours': result.duration_hours,
+        'timesteps': result.timesteps,
+    }
+
+
+def nl_response_payload(response: NLResponse) -> Dict[str, Any]:
+    """NLResponse fields for orjson, with the simulation on the fast path"""
+    return {
+        'interpretation': response.interpretation.model_dump(mode='json'),
+        'simulation_result': (simulation_payload(response.simulation_result)
+                              if response.simulation_result is not None else None),
+        'error': response.error,
+    }
+
@@ -0,0 +1,54 @@
+import pytest
+import io
+import pandas as pd
+import polars as pl
+from datetime import datetime
+from agents import AlertsAgent, PortsAgent
+from schemas import Shock, SimulationResult
+from payloads import (
+    ARROW_STREAM_MEDIA_TYPE, PARQUET_MEDIA_TYPE, encode_frame, encode_simulation, frame_to_polars,
+    negotiate_tabular, stream_table,
+)
+
+
+def test_negotiate_tabular():
+    assert negotiate_tabular(ARROW_STREAM_MEDIA_TYPE) == ARROW_STREAM_MEDIA_TYPE
+    assert negotiate_tabular(f"{PARQUET_MEDIA_TYPE}, */*;q=0.1") == PARQUET_MEDIA_TYPE
+    assert negotiate_tabular("application/json") is None
+
+
+@pytest.mark.parametrize("agent_cls", [PortsAgent, AlertsAgent])
+def test_agent_frames_roundtrip_arrow_stream(agent_cls):
+    data = agent_cls().load_data()
+    frame = pl.read_ipc_stream(io.BytesIO(encode_frame(data, ARROW_STREAM_MEDIA_TYPE)))
+    assert frame.columns == list(data.columns)
+    assert frame.height == len(data)
+
+
+def test_simulation_impact_table_parquet():
+    result = SimulationResult(
+        scenario_id='s1',
+        shock=Shock(target_ids=['a'], magnitude=0.5, duration_hours=2, start_ts=datetime.now()),
+        impact_series={'a': [0.5, 0.5, 0.5], 'b': [0.0, 0.1, 0.2]},
+        duration_hours=2,
+    )
+    frame = pl.read_parquet(io.BytesIO(encode_simulation(result, PARQUET_MEDIA_TYPE)))
+    assert frame.columns == ['t', 'a', 'b']
+    assert frame['b'].to_list() == [0.0, 0.1, 0.2]
+
+
+def test_string_columns_convert_to_arrow_strings():
+    frame = frame_to_polars(pd.DataFrame({'id': ['a', 'b', None], 'x': [1.0, 2.0, 3.0]}))
+    assert frame.schema == {'id': pl.String, 'x': pl.Float64}
+    assert frame['id'].to_list() == ['a', 'b', None]
+
+
+@pytest.mark.parametrize("media_type, read", [
+    (ARROW_STREAM_MEDIA_TYPE, pl.read_ipc_stream),
+    (PARQUET_MEDIA_TYPE, pl.read_parquet),
+])
+def test_tables_stream_one_batch_at_a_time(media_type, read):
+    frame = pl.DataFrame({'id': [f"n{i}" for i in range(1000)], 'v': [float(i) for i in range(1000)]})
+    chunks = list(stream_table(frame, media_type, rows=100))
+    assert len(chunks) >= 10
+    assert read(io.BytesIO(b''.join(chunks))).equals(frame)
@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+import pandas as pd
+from payloads import QUANT_UNIT_U8, accepts_globe, decode_globe, encode_impact_frames, encode_points, encode_graph
+from payloads.globe import delta_decode_frames
+
+
+def test_accept_negotiation():
+    assert accepts_globe("application/vnd.neuralterra.globe, application/json;q=0.5")
+    assert not accepts_globe("application/json")
+    assert not accepts_globe(None)
+
+
+def test_points_roundtrip_quantized():
+    df = pd.DataFrame({
+        'id': ['a', 'b'],
+        'lat': [30.5852, -33.8688],
+        'lon': [32.2650, 310.0],
+        'throughput_index': [0.9, 0.25],
+    })
+    header, arrays = decode_globe(encode_points(df, {'throughput_index': QUANT_UNIT_U8}))
+    assert header['ids'] == ['a', 'b']
+    assert arrays['lat'].dtype == np.int32
+    assert np.allclose(arrays['lat'] * 1e-7, df['lat'], atol=1e-6)
+    # Longitudes are folded into [-180, 180)
+    assert np.allclose(arrays['lon'] * 1e-7, [32.2650, -50.0], atol=1e-6)
+    assert np.allclose(arrays['throughput_index'] / 255, df['throughput_index'], atol=1 / 255)
+
+
+def test_impact_frames_delta_roundtrip_and_size():
+    rng = np.random.default_rng(0)
+    series = {f"node_{i}": np.clip(np.cumsum(rng.uniform(0, 0.01, 169)), 0, 1).tolist() for i in range(50)}
+    payload = encode_impact_frames(series, scenario_id='s1')
+    header, arrays = decode_globe(payload)
+    assert header['scenario_id'] == 's1'
+    frames = delta_decode_frames(arrays['impact']) / 255
+    expected = np.array([series[i] for i in header['ids']]).T
+    assert np.abs(frames - expected).max() <= 0.5 / 255 + 1e-9
+
+    json_size = len(pd.Series(series).to_json())
+    assert json_size / len(payload) > 5
+
+
+def test_graph_edges_reference_id_dictionary():
+    graph = {
+        'nodes': [
+            {'id': 'a', 'name': 'A', 'type': 'asset', 'asset_type': 'port', 'lat': 0, 'lon': 0, 'capacity': 0.5},
+            {'id': 'b', 'name': 'B', 'type': 'region', 'asset_type': '', 'lat': 1, 'lon': 1, 'capacity': 1.0},
+        ],
+        'edges': [{'source': 'a', 'target': 'b', 'weight': 0.8}],
+    }
+    header, arrays = decode_globe(encode_graph(graph))
+    assert header['names'] == ['A', 'B']
+    assert header['ids'][arrays['edge_source'][0]] == 'a'
+    assert header['ids'][arrays['edge_target'][0]] == 'b'
@@ -0,0 +1,27 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from nl import NLEngine
+from nl.cache import InterpretationCache
+from payloads import nl_response_payload, simulation_payload
+from schemas import NLQuery, Shock, SimulationResult
+from sim import RippleEngine
+from sim.shaping import SeriesShape
+
+
+def test_fast_path_json_matches_validated_model():
+    engine = RippleEngine()
+    shock = Shock(target_ids=['suez_canal'], magnitude=0.6, duration_hours=48)
+    for shape in (None, SeriesShape(top_k=4, points=12)):
+        result = engine.simulate_shock(shock, shape=shape)
+        validated = SimulationResult.model_validate(result.model_dump())
+        body = ORJSONResponse(simulation_payload(result)).body
+        assert orjson.loads(body) == orjson.loads(validated.model_dump_json())
+
+
+def test_nl_response_fast_path():
+    engine = NLEngine(RippleEngine(), cache=InterpretationCache())
+    response = engine.run_query(NLQuery(text="Rotterdam partial closure for 24 hours"))
+    body = orjson.loads(ORJSONResponse(nl_response_payload(response)).body)
+    assert body == orjson.loads(response.model_dump_json())
+    assert len(body['simulation_result']['impact_series']['rotterdam']) == 25
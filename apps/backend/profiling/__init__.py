@@ -0,0 +1,5 @@
+from .profiler import Phase, Profile, ProfileStore, Profiling, current_profile
+from .asgi import ProfilingConfig, ProfilingMiddleware
+
+__all__ = ['Phase', 'Profile', 'ProfileStore', 'Profiling', 'current_profile',
+           'ProfilingConfig', 'ProfilingMiddleware']
@@ -0,0 +1,87 @@
+import os
+from typing import Optional
+from urllib.parse import parse_qs
+
+from .profiler import Profile, ProfileStore, Profiling
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_ID_HEADER = b'x-profile-id'
+
+
+class ProfilingConfig:
+    """Opt-in request profiling, configured via PROFILING_ENABLED, PROFILING_TOKEN,
+    PROFILING_KEEP and PROFILING_INTERVAL_MS.
+
+    A request opts in with an ``X-Profile`` header or ``profile`` query
+    parameter; when a token is set, its value must match it.
+    """
+
+    def __init__(self, enabled: bool = False, token: Optional[str] = None,
+                 keep: int = 20, interval_s: float = 0.005):
+        self.enabled = enabled
+        self.token = token
+        self.keep = keep
+        self.interval_s = interval_s
+
+    @classmethod
+    def from_env(cls) -> 'ProfilingConfig':
+        return cls(
+            enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+            token=os.getenv("PROFILING_TOKEN") or None,
+            keep=int(os.getenv("PROFILING_KEEP", "20")),
+            interval_s=float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000,
+        )
+
+    def allows(self, value: Optional[str]) -> bool:
+        """Whether an opt-in value (header or query) switches profiling on"""
+        if not self.enabled or not value:
+            return False
+        if self.token:
+            return value == self.token
+        return value.lower() in ('1', 'true', 'yes')
+
+
+def _opt_in(scope) -> Optional[str]:
+    for name, value in scope.get('headers', ()):
+        if name == PROFILE_HEADER:
+            return value.decode('latin-1')
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    values = query.get('profile')
+    return values[0] if values else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling the requests that opt in.
+
+    The profile is stored in ``store`` and its id returned in the
+    ``X-Profile-Id`` response header. Requests arriving while another
+    profile runs are served unprofiled.
+    """
+
+    def __init__(self, app, config: ProfilingConfig, store: ProfileStore):
+        self.app = app
+        self.config = config
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.config.allows(_opt_in(scope)):
+            await self.app(scope, receive, send)
+            return
+        profile = Profile(scope['method'], scope['path'], self.config.interval_s)
+        active = None
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start' and active is not None:
+                profile.status = message['status']
+                headers = list(message.get('headers', ()))
+                headers.append((PROFILE_ID_HEADER, profile.id.encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        try:
+            with Profiling(profile) as active:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if active is not None:
+                profile.route = getattr(scope.get('route'), 'path', None)
+                self.store.add(profile)
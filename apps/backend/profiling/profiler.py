@@ -0,0 +1,259 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+_current: ContextVar[Optional['Profile']] = ContextVar('profile', default=None)
+
+# Deeper frames are cut from sampled stacks
+MAX_STACK_DEPTH = 64
+# Stacks and functions kept per profile, by sample count
+TOP_STACKS = 50
+
+
+def current_profile() -> Optional['Profile']:
+    """Profile of the request running in this context, if it opted in"""
+    return _current.get()
+
+
+class Phase:
+    """Time a named phase: always into ``histogram`` (if given), and into the
+    current profile (wall, CPU, stack samples) when the request is profiled.
+
+    Use as a context manager, or call ``finish`` when the phase has several
+    exits with different outcomes.
+    """
+
+    __slots__ = ('name', 'histogram', 'profile', 'started', 'cpu_started')
+
+    def __init__(self, name: str, histogram=None):
+        self.name = name
+        self.histogram = histogram
+        self.profile = _current.get()
+        self.started = time.perf_counter()
+        self.cpu_started = 0.0
+        if self.profile is not None:
+            self.cpu_started = time.thread_time()
+            self.profile.enter_thread()
+
+    def finish(self, outcome: Optional[str] = None) -> float:
+        """Stop timing; ``outcome`` is appended to the profiled phase name"""
+        elapsed = time.perf_counter() - self.started
+        if self.histogram is not None:
+            self.histogram.observe(elapsed)
+        if self.profile is not None:
+            name = f"{self.name}:{outcome}" if outcome else self.name
+            self.profile.add_phase(name, elapsed, time.thread_time() - self.cpu_started)
+            self.profile.exit_thread()
+        return elapsed
+
+    def __enter__(self) -> 'Phase':
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+
+
+class Profile:
+    """One profiled request: per-phase times, stack samples and peak allocation"""
+
+    def __init__(self, method: str, path: str, interval_s: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.interval_s = interval_s
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_s = 0.0
+        self.peak_bytes: Optional[int] = None
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._threads: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def enter_thread(self):
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def active_threads(self) -> List[int]:
+        """Threads currently inside a phase of this request"""
+        with self._lock:
+            return list(self._threads)
+
+    def add_phase(self, name: str, wall_s: float, cpu_s: float):
+        with self._lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            phase['calls'] += 1
+            phase['wall_s'] += wall_s
+            phase['cpu_s'] += cpu_s
+
+    def add_sample(self, stack: str):
+        with self._lock:
+            self.stacks[stack] += 1
+            self.samples += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'path': self.path,
+            'route': self.route,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'wall_s': self.wall_s,
+            'cpu_s': sum(phase['cpu_s'] for phase in self.phases.values()),
+            'peak_bytes': self.peak_bytes,
+            'samples': self.samples,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Full profile; stacks are root-first and ``;``-joined (collapsed flame graph format)"""
+        with self._lock:
+            stacks = self.stacks.most_common(TOP_STACKS)
+            phases = {name: dict(phase) for name, phase in self.phases.items()}
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            **self.summary(),
+            'interval_ms': self.interval_s * 1000,
+            'phases': phases,
+            'stacks': [{'stack': stack, 'samples': count} for stack, count in stacks],
+            'functions': [{'function': name, 'samples': count} for name, count in leaves.most_common(TOP_STACKS)],
+        }
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Background thread sampling the stacks of a profile's active threads"""
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profile-{profile.id}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.profile.interval_s):
+            threads = self.profile.active_threads()
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.profile.add_sample(_collapse(frame))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class Profiling:
+    """Run a profile around a block: context, stack sampler and tracemalloc peak.
+
+    tracemalloc is process-wide, so one profile runs at a time: entering
+    returns None (and the block runs unprofiled) while another is in
+    progress. The lock is held only between a successful ``__enter__`` and
+    ``__exit__``; a failed start releases it before re-raising.
+    """
+
+    _busy = threading.Lock()
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self._sampler = StackSampler(profile)
+        self._held = False
+        self._started_tracing = False
+        self._sampling = False
+        self._token = None
+        self._started = 0.0
+
+    def __enter__(self) -> Optional[Profile]:
+        if not Profiling._busy.acquire(blocking=False):
+            return None
+        self._held = True
+        try:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._token = _current.set(self.profile)
+            self._sampler.start()
+            self._sampling = True
+        except BaseException:
+            self._release()
+            raise
+        self._started = time.perf_counter()
+        return self.profile
+
+    def __exit__(self, *exc):
+        if not self._held:
+            return
+        self.profile.wall_s = time.perf_counter() - self._started
+        self.profile.peak_bytes = tracemalloc.get_traced_memory()[1]
+        self._release()
+
+    def _release(self):
+        """Undo whatever __enter__ set up, then free the profiler"""
+        try:
+            if self._sampling:
+                self._sampler.stop()
+            if self._token is not None:
+                _current.reset(self._token)
+            if self._started_tracing:
+                tracemalloc.stop()
+        finally:
+            self._sampling = self._started_tracing = self._held = False
+            self._token = None
+            Profiling._busy.release()
+
+
+class ProfileStore:
+    """Most recent profiles, oldest evicted first"""
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self._profiles: 'OrderedDict[str, Profile]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries, newest first"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.summary() for profile in reversed(profiles)]
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from metrics import Histogram
+from profiling import Phase, Profile, ProfileStore, Profiling, ProfilingConfig, ProfilingMiddleware, current_profile
+from profiling.profiler import StackSampler
+
+
+def spin(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_phase_outside_a_profile_only_feeds_the_histogram():
+    histogram = Histogram('phase_test_seconds', 'Phase test', registry=None)
+    with Phase('work', histogram.labels()):
+        pass
+    assert current_profile() is None
+    assert sum(histogram.labels().counts) == 1
+
+
+def test_profile_records_phases_samples_and_peak_allocation():
+    profile = Profile('POST', '/simulate', interval_s=0.001)
+    with Profiling(profile) as active:
+        assert active is profile and current_profile() is profile
+        with Phase('compute'):
+            spin(0.05)
+        phase = Phase('agent.PortsAgent')
+        blob = bytearray(8_000_000)
+        phase.finish('cache')
+        del blob
+    assert current_profile() is None
+
+    data = profile.to_dict()
+    assert data['phases']['compute']['calls'] == 1
+    assert data['phases']['compute']['cpu_s'] > 0.03
+    assert 'agent.PortsAgent:cache' in data['phases']
+    assert data['peak_bytes'] >= 8_000_000
+    assert data['samples'] > 0
+    assert data['functions'][0]['function'] == 'test_profiler.py:spin'
+    assert data['stacks'][0]['stack'].endswith('test_profiler.py:spin')
+
+
+def test_one_profile_at_a_time_and_failed_start_releases_the_lock(monkeypatch):
+    outer = Profile('GET', '/a', interval_s=0.01)
+    with Profiling(outer):
+        with Profiling(Profile('GET', '/b', interval_s=0.01)) as inner:
+            assert inner is None and current_profile() is outer
+        assert current_profile() is outer
+
+    def broken_start(self):
+        raise RuntimeError("can't start thread")
+
+    monkeypatch.setattr(StackSampler, 'start', broken_start)
+    with pytest.raises(RuntimeError):
+        with Profiling(Profile('GET', '/c', interval_s=0.01)):
+            pass
+    assert current_profile() is None
+    monkeypatch.undo()
+    with Profiling(Profile('GET', '/d', interval_s=0.01)) as active:
+        assert active is not None
+
+
+def test_store_keeps_most_recent():
+    store = ProfileStore(keep=2)
+    ids = []
+    for path in ('/a', '/b', '/c'):
+        profile = Profile('GET', path, interval_s=0.01)
+        store.add(profile)
+        ids.append(profile.id)
+    assert store.get(ids[0]) is None
+    assert [summary['path'] for summary in store.list()] == ['/c', '/b']
+
+
+def test_middleware_profiles_only_opted_in_requests():
+    store = ProfileStore()
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, config=ProfilingConfig(enabled=True, token='s3cret'), store=store)
+
+    @app.post("/work/{size}")
+    def work(size: int):
+        with Phase('work'):
+            spin(0.02)
+        return {"size": size}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            plain = await client.post("/work/1")
+            wrong = await client.post("/work/1", headers={"X-Profile": "1"})
+            header = await client.post("/work/2", headers={"X-Profile": "s3cret"})
+            query = await client.post("/work/3?profile=s3cret")
+            return plain, wrong, header, query
+
+    plain, wrong, header, query = asyncio.run(run())
+    assert 'x-profile-id' not in plain.headers and 'x-profile-id' not in wrong.headers
+    assert [summary['id'] for summary in store.list()] == [query.headers['x-profile-id'], header.headers['x-profile-id']]
+    profile = store.get(header.headers['x-profile-id']).to_dict()
+    assert profile['route'] == '/work/{size}' and profile['status'] == 200
+    assert profile['phases']['work']['calls'] == 1
+    assert profile['wall_s'] >= profile['phases']['work']['wall_s']
+
+
+def test_disabled_config_ignores_opt_in():
+    config = ProfilingConfig(enabled=False)
+    assert not config.allows('1')
+    assert ProfilingConfig(enabled=True).allows('true')
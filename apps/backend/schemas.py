@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -53,10 +53,20 @@ class SimulationResult(BaseModel):
     impact_series: Dict[str, List[float]] = Field(..., description="Node impact time series")
     kpis: Dict[str, Any] = Field(default_factory=dict, description="Derived KPIs")
     duration_hours: int = Field(..., description="Simulation duration")
+    timesteps: Optional[List[int]] = Field(None, description="Hour of each series point when downsampled")
+
+    @field_serializer('impact_series')
+    def serialize_impact_series(self, impact_series: Dict[str, Any]) -> Dict[str, List[float]]:
+        # Engine-built results hold NumPy rows (see RippleEngine._series)
+        return {node_id: series.tolist() if hasattr(series, 'tolist') else series
+                for node_id, series in impact_series.items()}
 
 class NLQuery(BaseModel):
     text: str = Field(..., description="Natural language query")
 
+class NLBatchQuery(BaseModel):
+    queries: List[NLQuery] = Field(..., min_length=1, max_length=256, description="Queries to run, answered in order")
+
 class NLInterpretation(BaseModel):
     scenario_spec: Optional[Shock] = Field(None, description="Parsed scenario specification")
     queries: List[str] = Field(default_factory=list, description="Derived queries")
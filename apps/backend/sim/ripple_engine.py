@@ -1,11 +1,40 @@
-import networkx as nx
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Any, Iterator, Mapping, Optional, Tuple
 from datetime import datetime, timedelta
 import json
+import os
+import threading
+import time
+import uuid
+import orjson
 from pathlib import Path
 from schemas import Shock, SimulationResult
+from world import CompiledGraph, WorldRepository, attach_or_build, get_world_repository
+from world.spatial import SpatialIndex
+from storage import atomic_write
+from metrics import SIZE_BUCKETS, Gauge, Histogram
+from profiling import Phase
+from .shaping import SeriesShape
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+# Bump when the compiled array layout changes so stale builds are ignored
+GRAPH_FORMAT = "g1"
+# Cap on timesteps x nodes x shocks per batched propagation run (8 bytes each)
+BATCH_CELLS = 20_000_000
+
+PHASE_SECONDS = Histogram('simulation_phase_seconds', 'Time spent in each simulate_shock phase',
+                          labels=('phase',))
+SETUP, PROPAGATION, KPIS, SERIES, PERSISTENCE = (
+    PHASE_SECONDS.labels(phase) for phase in ('setup', 'propagation', 'kpis', 'series', 'persistence')
+)
+TIMESTEPS = Histogram('simulation_timesteps', 'Timesteps per simulated shock', buckets=SIZE_BUCKETS)
+BATCH_SHOCKS = Histogram('simulation_batch_shocks', 'Shocks per batched propagation run', buckets=SIZE_BUCKETS)
+SCENARIO_BYTES = Histogram('scenario_bytes_written', 'Bytes per saved scenario file', buckets=SIZE_BUCKETS)
+GRAPH_NODES = Gauge('graph_nodes', 'Nodes in the loaded world graph')
+GRAPH_EDGES = Gauge('graph_edges', 'Edges in the loaded world graph')
 
 class RegionNode:
     """Represents a geographic region"""
@@ -19,7 +48,7 @@ class RegionNode:
 
 class AssetNode:
     """Represents an infrastructure asset (port, grid, etc.)"""
-    def __init__(self, node_id: str, name: str, asset_type: str, region_id: str, 
+    def __init__(self, node_id: str, name: str, asset_type: str, region_id: str,
                  lat: float = 0, lon: float = 0, capacity: float = 1.0):
         self.id = node_id
         self.name = name
@@ -30,71 +59,220 @@ class AssetNode:
         self.capacity = capacity
         self.base_impact = 0.0
 
+def add_region_node(graph: "nx.DiGraph", region: RegionNode):
+    """Add a region node to a graph being built"""
+    graph.add_node(region.id, node_type="region", data=region)
+
+def add_asset_node(graph: "nx.DiGraph", asset: AssetNode):
+    """Add an asset node to a graph being built"""
+    graph.add_node(asset.id, node_type="asset", data=asset)
+
+    # Connect asset to its region
+    if asset.region_id in graph:
+        graph.add_edge(asset.id, asset.region_id, weight=0.8, delay_hours=0, decay=0.1)
+
+class NodeView(Mapping):
+    """Read-only id -> RegionNode/AssetNode mapping over a compiled graph.
+
+    Node objects are built on access, so attached workers never hold a
+    Python object per node.
+    """
+    def __init__(self, compiled: CompiledGraph):
+        self.compiled = compiled
+
+    def node_at(self, pos: int):
+        c = self.compiled
+        node_id, name = c.id_at(pos), c.names[pos].decode()
+        lat, lon = float(c.lat[pos]), float(c.lon[pos])
+        if c.category('node_type', pos) == 'region':
+            node = RegionNode(node_id, name, name, lat, lon)
+        else:
+            node = AssetNode(node_id, name, c.category('asset_type', pos), c.region_id[pos].decode(),
+                             lat, lon, float(c.capacity[pos]))
+        node.planet = c.category('planet', pos)
+        return node
+
+    def __getitem__(self, node_id: str):
+        pos = self.compiled.position(node_id)
+        if pos is None:
+            raise KeyError(node_id)
+        return self.node_at(pos)
+
+    def __contains__(self, node_id) -> bool:
+        return isinstance(node_id, str) and self.compiled.position(node_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.compiled.id_list())
+
+    def __len__(self) -> int:
+        return len(self.compiled)
+
+class _Plan:
+    """Edge groups for vectorized propagation over a set of nodes.
+
+    Within a timestep nodes update in position order, so a zero-delay input
+    only counts when its source comes first. Nodes are grouped into levels
+    by those same-step inputs: level 0 needs none, level k only reads
+    levels below k, and each level is one vectorized update.
+    """
+    def __init__(self, compiled: CompiledGraph, levels: np.ndarray, nodes: np.ndarray):
+        self.nodes = nodes
+        local = np.full(len(compiled), -1, dtype=np.int64)
+        local[nodes] = np.arange(len(nodes))
+
+        # Incoming edges of the planned nodes, via the in-edge CSR
+        counts = np.diff(compiled.in_ptr)[nodes]
+        edges = compiled.in_edges[np.repeat(compiled.in_ptr[nodes], counts) + _ranges(counts)]
+        src = compiled.edge_src[edges]
+        dst = local[compiled.edge_dst[edges]]
+        delay = compiled.edge_delay[edges]
+        weight = compiled.edge_weight[edges]
+        decay = compiled.edge_decay[edges]
+
+        delayed = delay > 0
+        same_step = (delay == 0) & (src < compiled.edge_dst[edges])
+        self.delayed = (src[delayed], dst[delayed], delay[delayed], weight[delayed], decay[delayed])
+
+        node_levels = levels[nodes]
+        self.level0 = np.flatnonzero(node_levels == 0)
+        self.levels = []
+        edge_levels = node_levels[dst[same_step]]
+        ss = (src[same_step], dst[same_step], weight[same_step], decay[same_step])
+        for level in range(1, int(node_levels.max(initial=0)) + 1):
+            in_level = edge_levels == level
+            self.levels.append((np.flatnonzero(node_levels == level),) + tuple(a[in_level] for a in ss))
+
+def _rows(ids: List[str], frames: np.ndarray) -> Dict[str, np.ndarray]:
+    """id -> float64 series, as rows of one contiguous copy of frames.T.
+
+    Results hold these arrays instead of Python lists: nothing is boxed per
+    float, and responses are serialized straight from the buffers.
+    """
+    return dict(zip(ids, np.ascontiguousarray(frames.T, dtype=np.float64)))
+
+def _ranges(counts: np.ndarray) -> np.ndarray:
+    """Concatenated aranges: [0..c0), [0..c1), ..."""
+    ends = np.cumsum(counts)
+    if not len(ends):
+        return np.empty(0, dtype=np.int64)
+    return np.arange(ends[-1]) - np.repeat(ends - counts, counts)
+
 class RippleEngine:
-    """Core simulation engine for modeling ripple effects"""
-    
-    def __init__(self):
-        self.graph = nx.DiGraph()
-        self.nodes: Dict[str, Any] = {}
+    """Core simulation engine for modeling ripple effects.
+
+    The graph lives in a ``CompiledGraph``. With ``graph_dir`` (or the
+    WORLD_GRAPH_DIR env var) it is compiled once per world version by the
+    first process and memory-mapped read-only by every other worker.
+
+    Each run takes one snapshot of ``self.compiled`` and threads it through
+    setup, propagation and result building, so a graph swapped in by
+    ``refresh_world`` or an edge update never changes under a running
+    simulation. Swaps and the standing scenario registry are guarded by
+    ``_lock``.
+    """
+
+    def __init__(self, world: Optional[WorldRepository] = None,
+                 graph_dir: Optional[str] = None):
+        self.world = world if world is not None else get_world_repository()
+        graph_dir = graph_dir or os.getenv("WORLD_GRAPH_DIR")
+        self.graph_dir = Path(graph_dir) if graph_dir else None
+        self.world_version: Optional[str] = None
+        self.standing: List[SimulationResult] = []
+        self._standing_series: List[np.ndarray] = []
+        self._standing_added: List[float] = []
+        # Standing scenarios hold full frame matrices; bound how many and for how long
+        self.max_standing = int(os.getenv("STANDING_MAX", "32"))
+        self.standing_ttl_s = float(os.getenv("STANDING_TTL_S", "86400"))
+        # Created on first save (atomic_write makes parent directories)
         self.scenarios_dir = Path("scenarios")
-        self.scenarios_dir.mkdir(exist_ok=True)
-        self._build_minimal_world()
-    
-    def _build_minimal_world(self):
-        """Build world graph from data file"""
-        # Try relative to current working directory first (for CI)
-        data_path = Path("data/world_nodes.json")
-        if not data_path.exists():
-            # Fallback: relative to this file's parent's parent (backend directory)
-            backend_dir = Path(__file__).parent.parent
-            data_path = backend_dir / "data" / "world_nodes.json"
-        
-        if not data_path.exists():
-            self._build_fallback_world()
-            return
-
-        with open(data_path, 'r') as f:
-            world_data = json.load(f)
+        # Guards graph swaps and the standing registry; runs only read a snapshot
+        self._lock = threading.RLock()
+        # One world rebuild at a time
+        self._refresh_lock = threading.Lock()
+        # Derived per graph, keyed by the CompiledGraph they were built from
+        self._levels: Optional[Tuple[CompiledGraph, np.ndarray]] = None
+        self._full_plan: Optional[Tuple[CompiledGraph, _Plan]] = None
+        self._install(self._load_world())
+
+    def _load_world(self) -> CompiledGraph:
+        """Attach to (or compile) the graph for the current world file"""
+        with Phase('simulation.load_world'):
+            if self.graph_dir is not None and self.world.exists:
+                # Keyed by content hash, so every worker on the same world file shares one build
+                key = f"{GRAPH_FORMAT}-{self.world.version}"
+                return attach_or_build(self.graph_dir, key, self._compile_world)
+            return self._compile_world()
+
+    def _install(self, compiled: CompiledGraph):
+        """Make ``compiled`` the current graph"""
+        self.compiled = compiled
+        self.world_version = compiled.version
+        GRAPH_NODES.set(len(compiled))
+        GRAPH_EDGES.set(len(compiled.edge_src))
+        self._invalidate()
+
+    def _invalidate(self):
+        """Drop state derived from self.compiled"""
+        self.nodes = NodeView(self.compiled)
+        self.spatial: Dict[str, SpatialIndex] = {
+            planet: self.compiled.spatial_index(planet) for planet in self.compiled.spatial
+        }
+        self._graph: Optional["nx.DiGraph"] = None
+
+    def _compile_world(self) -> CompiledGraph:
+        """Build the world graph from the repository and compile it to arrays"""
+        if not self.world.exists:
+            return CompiledGraph.from_graph(self._build_fallback_world())
+        return CompiledGraph.from_graph(self._build_minimal_world(), version=self.world.version)
+
+    def _build_minimal_world(self) -> "nx.DiGraph":
+        """Build world graph from the shared world repository"""
+        import networkx as nx
+        graph = nx.DiGraph()
+        world_nodes = self.world.nodes()
+        world_edges = self.world.edges()
 
         # Add nodes
-        for node_data in world_data.get('nodes', []):
-            planet = node_data.get('planet', 'earth')
-            
-            if node_data['type'] == 'region':
+        for row in world_nodes.itertuples(index=False):
+            if row.type == 'region':
                 node = RegionNode(
-                    node_id=node_data['id'],
-                    name=node_data['name'],
-                    region=node_data['name'],
-                    lat=node_data['lat'],
-                    lon=node_data['lon']
+                    node_id=row.id,
+                    name=row.name,
+                    region=row.name,
+                    lat=float(row.lat),
+                    lon=float(row.lon)
                 )
-                node.planet = planet # Attach planet to node object
-                self.add_region_node(node)
-            elif node_data['type'] == 'asset':
+                node.planet = row.planet # Attach planet to node object
+                add_region_node(graph, node)
+            elif row.type == 'asset':
                 node = AssetNode(
-                    node_id=node_data['id'],
-                    name=node_data['name'],
-                    asset_type=node_data['asset_type'],
-                    region_id=node_data['region_id'],
-                    lat=node_data['lat'],
-                    lon=node_data['lon'],
-                    capacity=node_data.get('capacity', 1.0)
+                    node_id=row.id,
+                    name=row.name,
+                    asset_type=row.asset_type,
+                    region_id=row.region_id,
+                    lat=float(row.lat),
+                    lon=float(row.lon),
+                    capacity=1.0 if pd.isna(row.capacity) else float(row.capacity)
                 )
-                node.planet = planet
-                self.add_asset_node(node)
+                node.planet = row.planet
+                add_asset_node(graph, node)
 
         # Add edges
-        for edge in world_data.get('edges', []):
-            if edge['source'] in self.nodes and edge['target'] in self.nodes:
-                self.graph.add_edge(
-                    edge['source'], 
-                    edge['target'], 
-                    weight=edge['weight'],
-                    delay_hours=edge['delay_hours'],
-                    decay=edge['decay']
+        for edge in world_edges.itertuples(index=False):
+            if edge.source in graph and edge.target in graph:
+                graph.add_edge(
+                    edge.source,
+                    edge.target,
+                    weight=float(edge.weight),
+                    delay_hours=int(edge.delay_hours),
+                    decay=float(edge.decay)
                 )
-    def _build_fallback_world(self):
+        return graph
+
+    def _build_fallback_world(self) -> "nx.DiGraph":
         """Minimal fallback if data file is missing"""
+        import networkx as nx
+        graph = nx.DiGraph()
         # Add major regions
         regions = [
             RegionNode("na", "North America", "North America", 45.0, -100.0),
@@ -102,178 +280,616 @@ class RippleEngine:
             RegionNode("as", "Asia", "Asia", 35.0, 100.0),
         ]
         for region in regions:
-            self.add_region_node(region)
-            
+            add_region_node(graph, region)
+
         # Add minimal coupling
-        self.graph.add_edge("na", "eu", weight=0.5, delay_hours=24, decay=0.1)
-        self.graph.add_edge("eu", "as", weight=0.5, delay_hours=24, decay=0.1)
-
-    def add_region_node(self, region: RegionNode):
-        """Add a region node to the graph"""
-        self.graph.add_node(region.id, node_type="region", data=region)
-        self.nodes[region.id] = region
-    
-    def add_asset_node(self, asset: AssetNode):
-        """Add an asset node to the graph"""
-        self.graph.add_node(asset.id, node_type="asset", data=asset)
-        self.nodes[asset.id] = asset
-        
-        # Connect asset to its region
-        if asset.region_id in self.nodes:
-            self.graph.add_edge(asset.id, asset.region_id, weight=0.8, delay_hours=0, decay=0.1)
-    
-    def simulate_shock(self, shock: Shock) -> SimulationResult:
-        """Simulate the ripple effects of a shock"""
-        scenario_id = f"scenario_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        
-        # Initialize impact tracking
-        impact_series = {node_id: [0.0] for node_id in self.nodes.keys()}
-        
-        # Apply initial shock
-        for target_id in shock.target_ids:
-            if target_id in self.nodes:
-                impact_series[target_id][0] = shock.magnitude
-        
+        graph.add_edge("na", "eu", weight=0.5, delay_hours=24, decay=0.1)
+        graph.add_edge("eu", "as", weight=0.5, delay_hours=24, decay=0.1)
+        return graph
+
+    @property
+    def graph(self) -> "nx.DiGraph":
+        """networkx view of the compiled graph, materialized on first use"""
+        if self._graph is None:
+            import networkx as nx
+            c = self.compiled
+            graph = nx.DiGraph()
+            for pos in range(len(c)):
+                node = self.nodes.node_at(pos)
+                graph.add_node(node.id, node_type=c.category('node_type', pos), data=node)
+            ids = c.id_list()
+            for e in c.in_edges.tolist():
+                graph.add_edge(ids[c.edge_src[e]], ids[c.edge_dst[e]],
+                               weight=float(c.edge_weight[e]),
+                               delay_hours=int(c.edge_delay[e]),
+                               decay=float(c.edge_decay[e]))
+            self._graph = graph
+        return self._graph
+
+    def refresh_world(self) -> bool:
+        """Rebuild the graph if the world file changed. Returns True if rebuilt.
+
+        The new graph is compiled (or attached) without holding the engine
+        lock, so runs in flight finish on their snapshot; only the swap and
+        the standing scenario patches are done under it. Standing scenarios
+        are patched incrementally when only edges changed and re-run in full
+        when the node set changed.
+        """
+        with self._refresh_lock:
+            self.world.refresh()
+            if self.world.version == self.world_version:
+                return False
+            compiled = self._load_world()
+
+            with self._lock:
+                old = self.compiled
+                self._install(compiled)
+                self._prune_standing()
+                if not self.standing:
+                    return True
+                if old.id_list() != compiled.id_list():
+                    self._resimulate_standing()
+                    return True
+
+                def edge_table(c: CompiledGraph) -> Dict[Tuple[int, int], Tuple]:
+                    return {
+                        (s, d): (w, delay, decay) for s, d, w, delay, decay in zip(
+                            c.edge_src.tolist(), c.edge_dst.tolist(), c.edge_weight.tolist(),
+                            c.edge_delay.tolist(), c.edge_decay.tolist())
+                    }
+                old_edges, new_edges = edge_table(old), edge_table(compiled)
+                changed = []
+                for key in old_edges.keys() | new_edges.keys():
+                    before, after = old_edges.get(key), new_edges.get(key)
+                    if before != after:
+                        delays = [e[1] for e in (before, after) if e is not None]
+                        changed.append((key[0], key[1], delays))
+                self._patch_standing(changed, persist=True)
+        return True
+
+    def select_nodes(self, planet: str = 'earth',
+                     bbox: Optional[Tuple[float, float, float, float]] = None,
+                     near: Optional[Tuple[float, float]] = None,
+                     k: Optional[int] = None,
+                     radius_km: Optional[float] = None) -> Optional[List[str]]:
+        """Node ids matching spatial filters, or None when no filter is given.
+
+        Proximity results are ordered nearest first; a bbox narrows them further.
+        """
+        if bbox is None and near is None:
+            return None
+        c = self.compiled
+        index = c.spatial_index(planet)
+        if index is None:
+            return []
+
+        if near is not None:
+            lat, lon = near
+            if k is not None:
+                positions = index.nearest(lat, lon, k, max_radius_km=radius_km)
+            elif radius_km is not None:
+                positions = index.within(lat, lon, radius_km)
+            else:
+                raise ValueError("near requires k or radius_km")
+            if bbox is not None:
+                in_view = set(index.bbox(*bbox))
+                positions = [pos for pos in positions if pos in in_view]
+            return c.id_list(positions)
+
+        return c.id_list(index.bbox(*bbox))
+
+    # Propagation
+
+    def _node_levels(self, c: CompiledGraph) -> np.ndarray:
+        """Same-step dependency depth of each node of ``c`` (see _Plan)"""
+        cached = self._levels
+        if cached is None or cached[0] is not c:
+            levels = np.zeros(len(c), dtype=np.int64)
+            edges = c.in_edges
+            src, dst = c.edge_src[edges], c.edge_dst[edges]
+            same_step = (c.edge_delay[edges] == 0) & (src < dst)
+            # Edges are grouped by ascending target, and sources come first, so
+            # a source's level is final before any of its targets is visited
+            for s, d in zip(src[same_step].tolist(), dst[same_step].tolist()):
+                if levels[s] + 1 > levels[d]:
+                    levels[d] = levels[s] + 1
+            cached = self._levels = (c, levels)
+        return cached[1]
+
+    def _plan(self, c: CompiledGraph, nodes: Optional[np.ndarray] = None) -> _Plan:
+        if nodes is None:
+            cached = self._full_plan
+            if cached is None or cached[0] is not c:
+                cached = self._full_plan = (c, _Plan(c, self._node_levels(c), np.arange(len(c))))
+            return cached[1]
+        return _Plan(c, self._node_levels(c), nodes)
+
+    def _propagate(self, c: CompiledGraph, frames: np.ndarray, t_start: int, t_end: int,
+                   nodes: Optional[np.ndarray] = None):
+        """Recompute impacts in place for nodes (default: all) of ``c`` over t_start..t_end.
+
+        ``frames`` is a (timesteps + 1) x nodes matrix indexed by node position,
+        or (timesteps + 1) x nodes x shocks to propagate a batch at once.
+        """
+        plan = self._plan(c, nodes)
+        targets = plan.nodes
+        d_src, d_dst, d_delay, d_weight, d_decay = plan.delayed
+        # Edge factors broadcast over a trailing batch axis
+        batch = (slice(None),) + (None,) * (frames.ndim - 2)
+        for t in range(t_start, t_end + 1):
+            # Incoming impacts from neighbors at their delayed timestep
+            incoming = np.zeros((len(targets),) + frames.shape[2:])
+            delayed_impact = frames[np.maximum(0, t - d_delay), d_src]
+            np.add.at(incoming, d_dst, delayed_impact * (d_weight * np.exp(-d_decay * t))[batch])
+
+            # Combine current impact with incoming impact
+            previous = frames[t - 1, targets]
+            frames[t, targets[plan.level0]] = np.minimum(1.0, previous[plan.level0] + incoming[plan.level0])
+            for level_nodes, s_src, s_dst, s_weight, s_decay in plan.levels:
+                np.add.at(incoming, s_dst, frames[t, s_src] * (s_weight * np.exp(-s_decay * t))[batch])
+                frames[t, targets[level_nodes]] = np.minimum(1.0, previous[level_nodes] + incoming[level_nodes])
+
+    def _frames(self, c: CompiledGraph, shock: Shock) -> np.ndarray:
+        """Full propagation of a shock over graph ``c``"""
+        with Phase('simulation.setup', SETUP):
+            # Initialize impact tracking
+            timesteps = shock.duration_hours
+            frames = np.zeros((timesteps + 1, len(c)))
+
+            # Apply initial shock
+            for target_id in shock.target_ids:
+                pos = c.position(target_id)
+                if pos is not None:
+                    frames[0, pos] = shock.magnitude
+
         # Propagate impacts over time
-        timesteps = shock.duration_hours
-        for t in range(1, timesteps + 1):
-            # Update impacts for all nodes
-            for node_id in self.nodes.keys():
-                current_impact = impact_series[node_id][t - 1]
-                
-                # Calculate incoming impacts from neighbors
-                incoming_impact = 0.0
-                for predecessor in self.graph.predecessors(node_id):
-                    edge_data = self.graph[predecessor][node_id]
-                    weight = edge_data.get('weight', 0.0)
-                    delay_hours = edge_data.get('delay_hours', 0)
-                    decay = edge_data.get('decay', 0.1)
-                    
-                    # Get impact from predecessor at appropriate delay
-                    delay_timestep = max(0, t - delay_hours)
-                    if delay_timestep < len(impact_series[predecessor]):
-                        delayed_impact = impact_series[predecessor][delay_timestep]
-                        incoming_impact += delayed_impact * weight * np.exp(-decay * t)
-                
-                # Combine current impact with incoming impact
-                new_impact = min(1.0, current_impact + incoming_impact)
-                impact_series[node_id].append(new_impact)
-        
+        with Phase('simulation.propagation', PROPAGATION):
+            self._propagate(c, frames, 1, timesteps)
+        TIMESTEPS.observe(timesteps)
+        return frames
+
+    def _frames_batch(self, c: CompiledGraph, shocks: List[Shock]) -> List[np.ndarray]:
+        """Propagate several shocks together; one (timesteps + 1) x nodes view per shock.
+
+        Impacts at step t only depend on earlier steps, so shocks share a
+        run over the longest duration and shorter ones are cut to length.
+        """
+        with Phase('simulation.setup', SETUP):
+            timesteps = max(shock.duration_hours for shock in shocks)
+            frames = np.zeros((timesteps + 1, len(c), len(shocks)))
+            for b, shock in enumerate(shocks):
+                for target_id in shock.target_ids:
+                    pos = c.position(target_id)
+                    if pos is not None:
+                        frames[0, pos, b] = shock.magnitude
+        with Phase('simulation.propagation', PROPAGATION):
+            self._propagate(c, frames, 1, timesteps)
+        BATCH_SHOCKS.observe(len(shocks))
+        for shock in shocks:
+            TIMESTEPS.observe(shock.duration_hours)
+        return [frames[:shock.duration_hours + 1, :, b] for b, shock in enumerate(shocks)]
+
+    def _series(self, c: CompiledGraph, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """Impact frames as the per-node series stored on results"""
+        return _rows(c.id_list(), frames)
+
+    def _run(self, shock: Shock) -> Dict[str, List[float]]:
+        """Full run as plain lists (reference output)"""
+        c = self.compiled
+        return dict(zip(c.id_list(), self._frames(c, shock).T.tolist()))
+
+    def simulate_shock(self, shock: Shock, standing: bool = False,
+                       shape: Optional[SeriesShape] = None) -> SimulationResult:
+        """Simulate the ripple effects of a shock.
+
+        ``standing`` keeps the result registered so graph changes patch it in place.
+        ``shape`` trims the returned series; the saved scenario is always complete.
+        """
+        if standing:
+            # Registered against the graph it was run on, so no swap may slip in between
+            with self._lock:
+                c = self.compiled
+                frames = self._frames(c, shock)
+                result = self._result(c, shock, frames)
+                self._prune_standing(room=1)
+                self.standing.append(result)
+                self._standing_series.append(frames)
+                self._standing_added.append(time.monotonic())
+                return self._reshape(c, result, frames, shape)
+
+        c = self.compiled
+        return self._result(c, shock, self._frames(c, shock), shape)
+
+    def simulate_shocks(self, shocks: List[Shock],
+                        shape: Optional[SeriesShape] = None) -> List[SimulationResult]:
+        """Simulate several shocks in batched propagation runs, one result per shock.
+
+        Shocks that differ only in start time share one propagation but get
+        their own result. Shocks are grouped by duration and batched up to
+        BATCH_CELLS matrix cells per run to bound memory on large graphs.
+        """
+        c = self.compiled
+        results: List[Optional[SimulationResult]] = [None] * len(shocks)
+        # Target order and repeats do not change a propagation
+        same_run: Dict[Tuple, List[int]] = {}
+        for i, shock in enumerate(shocks):
+            same_run.setdefault((tuple(sorted(set(shock.target_ids))), shock.magnitude, shock.duration_hours),
+                                []).append(i)
+        runs = list(same_run.values())
+        order = sorted(range(len(runs)), key=lambda r: shocks[runs[r][0]].duration_hours)
+        nodes = max(1, len(c))
+        start = 0
+        while start < len(order):
+            end = start + 1
+            while end < len(order):
+                longest = shocks[runs[order[end]][0]].duration_hours
+                if (longest + 1) * nodes * (end + 1 - start) > BATCH_CELLS:
+                    break
+                end += 1
+            chunk = [runs[r] for r in order[start:end]]
+            for indices, frames in zip(chunk, self._frames_batch(c, [shocks[indices[0]] for indices in chunk])):
+                for i in indices:
+                    results[i] = self._result(c, shocks[i], frames, shape)
+            start = end
+        return results
+
+    def _result(self, c: CompiledGraph, shock: Shock, frames: np.ndarray,
+                shape: Optional[SeriesShape] = None) -> SimulationResult:
+        """Build the (shaped) result for a propagated shock and save the full scenario"""
+        # Random suffix keeps ids unique across workers within the same second
+        scenario_id = f"scenario_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
         # Calculate derived KPIs
-        kpis = self._calculate_kpis(impact_series, shock)
-        
+        with Phase('simulation.kpis', KPIS):
+            kpis = self._kpis(c, frames)
+
         # Create simulation result
-        result = SimulationResult(
+        with Phase('simulation.series', SERIES):
+            impact_series, timesteps = self._shaped_series(c, frames, shape)
+        # Built from trusted arrays: skip validating every float
+        result = SimulationResult.model_construct(
             scenario_id=scenario_id,
             shock=shock,
             impact_series=impact_series,
             kpis=kpis,
-            duration_hours=shock.duration_hours
+            duration_hours=shock.duration_hours,
+            timesteps=timesteps
         )
-        
+
         # Save scenario
-        self._save_scenario(result)
-        
+        with Phase('simulation.persistence', PERSISTENCE):
+            self._save_scenario(result, frames, c.id_list())
         return result
-    
-    def _calculate_kpis(self, impact_series: Dict[str, List[float]], shock: Shock) -> Dict[str, Any]:
-        """Calculate derived KPIs from impact series"""
+
+    def _shaped_series(self, c: CompiledGraph, frames: np.ndarray, shape: Optional[SeriesShape],
+                       ids: Optional[List[str]] = None, positions: Optional[np.ndarray] = None
+                       ) -> Tuple[Dict[str, np.ndarray], Optional[List[int]]]:
+        """Impact series and sampled timesteps, built only for the nodes and points kept.
+
+        ``ids``/``positions`` describe the columns of ``frames`` when they are
+        not the nodes of ``c`` (saved scenarios).
+        """
+        if shape is None or not shape.active:
+            return _rows(c.id_list() if ids is None else ids, frames), None
+        columns = shape.columns(c, frames, positions)
+        timesteps, values = shape.sample(frames[:, columns])
+        kept = c.id_list(columns) if ids is None else [ids[i] for i in columns.tolist()]
+        return _rows(kept, values), (timesteps.tolist() if timesteps is not None else None)
+
+    def _reshape(self, c: CompiledGraph, result: SimulationResult, frames: np.ndarray,
+                 shape: Optional[SeriesShape]) -> SimulationResult:
+        """Shaped copy of a full result (standing results stay complete)"""
+        if shape is None or not shape.active:
+            return result
+        impact_series, timesteps = self._shaped_series(c, frames, shape)
+        return result.model_copy(update={'impact_series': impact_series, 'timesteps': timesteps})
+
+    # Standing scenario registry
+
+    def _drop_standing(self, index: int):
+        del self.standing[index], self._standing_series[index], self._standing_added[index]
+
+    def _prune_standing(self, room: int = 0):
+        """Drop expired standing scenarios, then the oldest until ``room`` more fit"""
+        cutoff = time.monotonic() - self.standing_ttl_s
+        while self._standing_added and self._standing_added[0] < cutoff:
+            self._drop_standing(0)
+        while self.standing and len(self.standing) + room > self.max_standing:
+            self._drop_standing(0)
+
+    def unregister_standing(self, scenario_id: str) -> bool:
+        """Stop patching a standing scenario. Returns False if it was not standing."""
+        with self._lock:
+            for index, result in enumerate(self.standing):
+                if result.scenario_id == scenario_id:
+                    self._drop_standing(index)
+                    return True
+        return False
+
+    # Incremental updates of standing scenarios
+
+    def _patch_result(self, index: int, dirty: Dict[int, int]) -> bool:
+        """Recompute dirty nodes and everything downstream from their first affected timestep.
+
+        ``dirty`` maps node position to the earliest timestep whose value may
+        change. Returns True if any stored value changed.
+        """
+        result, frames = self.standing[index], self._standing_series[index]
+        horizon = result.duration_hours
+        dirty = {pos: t for pos, t in dirty.items() if t <= horizon}
+        if not dirty:
+            return False
+
+        c = self.compiled
+        affected = c.descendants(list(dirty))
+        t_start = max(1, min(dirty.values()))
+        before = frames[t_start:, affected].copy()
+        self._propagate(c, frames, t_start, horizon, affected)
+        changed = np.flatnonzero((frames[t_start:, affected] != before).any(axis=0))
+        if not len(changed):
+            return False
+        for pos in affected[changed].tolist():
+            result.impact_series[c.id_at(pos)][t_start:] = frames[t_start:, pos]
+        result.kpis = self._kpis(c, frames)
+        return True
+
+    def _edge_dirty(self, frames: np.ndarray, source: int, target: int,
+                    delays: List[int]) -> Dict[int, int]:
+        """Earliest timestep at which a changed source->target edge can alter target"""
+        active = np.flatnonzero(frames[:, source])
+        if not len(active):
+            return {}
+        first = int(active[0])
+        # Delays longer than t read the source's t=0 value
+        if first == 0:
+            return {target: 1}
+        return {target: first + max(0, min(delays))}
+
+    def _patch_standing(self, edges: List[Tuple[int, int, List[int]]], persist: bool) -> List[str]:
+        """Patch every standing scenario for a set of changed edges (by node position)"""
+        patched = []
+        for index, frames in enumerate(self._standing_series):
+            dirty: Dict[int, int] = {}
+            for source, target, delays in edges:
+                for pos, t in self._edge_dirty(frames, source, target, delays).items():
+                    dirty[pos] = min(t, dirty.get(pos, t))
+            if self._patch_result(index, dirty):
+                result = self.standing[index]
+                patched.append(result.scenario_id)
+                if persist:
+                    self._save_scenario(result)
+        return patched
+
+    def _edge_attrs(self, source: int, target: int) -> Optional[Dict[str, Any]]:
+        c = self.compiled
+        e = c.find_edge(source, target)
+        if e is None:
+            return None
+        return {'weight': float(c.edge_weight[e]), 'delay_hours': int(c.edge_delay[e]),
+                'decay': float(c.edge_decay[e])}
+
+    def _positions_of(self, *node_ids: str) -> List[int]:
+        positions = [self.compiled.position(node_id) for node_id in node_ids]
+        if any(pos is None for pos in positions):
+            raise ValueError(f"Unknown node in {node_ids}")
+        return positions
+
+    def update_edge(self, source: str, target: str, persist: bool = True, **attrs) -> List[str]:
+        """Add or change an edge (weight, delay_hours, decay) and patch standing scenarios.
+
+        Returns the ids of scenarios whose results changed.
+        """
+        with self._lock:
+            src, dst = self._positions_of(source, target)
+            old = self._edge_attrs(src, dst)
+            new = dict(old or {'weight': 0.0, 'delay_hours': 0, 'decay': 0.1})
+            new.update(attrs)
+            if old == new:
+                return []
+            self.compiled = self.compiled.with_edge(src, dst, new['weight'], new['delay_hours'], new['decay'])
+            self._invalidate()
+            delays = [new['delay_hours']] + ([old['delay_hours']] if old else [])
+            return self._patch_standing([(src, dst, delays)], persist)
+
+    def remove_edge(self, source: str, target: str, persist: bool = True) -> List[str]:
+        """Remove an edge and patch standing scenarios"""
+        with self._lock:
+            src, dst = self._positions_of(source, target)
+            old = self._edge_attrs(src, dst)
+            if old is None:
+                return []
+            self.compiled = self.compiled.without_edge(src, dst)
+            self._invalidate()
+            return self._patch_standing([(src, dst, [old['delay_hours']])], persist)
+
+    def update_node(self, node_id: str, persist: bool = True, **attrs) -> List[str]:
+        """Change node attributes (capacity, lat, lon, region_id) and patch standing scenarios.
+
+        Only ``region_id`` feeds propagation (via the asset -> region edge);
+        the other attributes are stored without re-simulation.
+        """
+        with self._lock:
+            (pos,) = self._positions_of(node_id)
+            old_region = self.compiled.region_id[pos].decode()
+            compiled = self.compiled
+            for column, value in attrs.items():
+                compiled = compiled.with_column(column, pos, value)
+            self.compiled = compiled
+
+            new_region = compiled.region_id[pos].decode()
+            changed = []
+            if new_region != old_region and compiled.category('node_type', pos) == 'asset':
+                old_dst = compiled.position(old_region) if old_region else None
+                old_edge = self._edge_attrs(pos, old_dst) if old_dst is not None else None
+                if old_edge is not None:
+                    compiled = compiled.without_edge(pos, old_dst)
+                    changed.append((pos, old_dst, [old_edge['delay_hours']]))
+                new_dst = compiled.position(new_region)
+                if new_dst is not None:
+                    compiled = compiled.with_edge(pos, new_dst, 0.8, 0, 0.1)
+                    changed.append((pos, new_dst, [0]))
+                self.compiled = compiled
+            self._invalidate()
+            return self._patch_standing(changed, persist) if changed else []
+
+    def _resimulate_standing(self):
+        """Re-run standing scenarios in full against the current graph"""
+        c = self.compiled
+        for index, result in enumerate(self.standing):
+            frames = self._frames(c, result.shock)
+            self._standing_series[index] = frames
+            result.impact_series = self._series(c, frames)
+            result.kpis = self._kpis(c, frames)
+            self._save_scenario(result)
+
+    def _kpis(self, c: CompiledGraph, frames: np.ndarray) -> Dict[str, Any]:
+        """Calculate derived KPIs from a (timesteps + 1) x nodes impact matrix over ``c``"""
         kpis = {}
-        
+        is_asset = c.node_type == c.code('node_type', 'asset')
+
         # Global trade index (weighted by port throughput)
-        port_nodes = [node_id for node_id, node in self.nodes.items() 
-                     if hasattr(node, 'asset_type') and node.asset_type == 'port']
-        
-        if port_nodes:
-            max_port_impact = max(max(impact_series[node_id]) for node_id in port_nodes)
-            kpis['global_trade_index_delta'] = max_port_impact
-        
+        port_nodes = np.flatnonzero(is_asset & (c.asset_type == c.code('asset_type', 'port')))
+
+        if len(port_nodes):
+            kpis['global_trade_index_delta'] = float(frames[:, port_nodes].max())
+
         # Regional energy stress (weighted by grid capacity)
-        grid_nodes = [node_id for node_id, node in self.nodes.items() 
-                     if hasattr(node, 'asset_type') and node.asset_type == 'grid']
-        
-        if grid_nodes:
-            max_grid_impact = max(max(impact_series[node_id]) for node_id in grid_nodes)
-            kpis['regional_energy_stress_delta'] = max_grid_impact
-        
-        # Peak impact time
-        all_impacts = []
-        for node_impacts in impact_series.values():
-            all_impacts.extend(node_impacts)
-        
-        if all_impacts:
-            peak_impact = max(all_impacts)
-            kpis['peak_impact'] = peak_impact
-            kpis['peak_impact_time_hours'] = all_impacts.index(peak_impact)
-        
+        grid_nodes = np.flatnonzero(is_asset & (c.asset_type == c.code('asset_type', 'grid')))
+
+        if len(grid_nodes):
+            kpis['regional_energy_stress_delta'] = float(frames[:, grid_nodes].max())
+
+        # Peak impact time (first peak when series are laid end to end, node by node)
+        if frames.size:
+            flat = frames.T.ravel()
+            peak = int(np.argmax(flat))
+            kpis['peak_impact'] = float(flat[peak])
+            kpis['peak_impact_time_hours'] = peak
+
         return kpis
-    
-    def _save_scenario(self, result: SimulationResult):
-        """Save scenario to file"""
+
+    def _calculate_kpis(self, impact_series: Dict[str, List[float]], shock: Shock) -> Dict[str, Any]:
+        """Calculate derived KPIs from impact series"""
+        c = self.compiled
+        ids = c.id_list()
+        return self._kpis(c, np.array([impact_series[node_id] for node_id in ids]).T)
+
+    def _save_scenario(self, result: SimulationResult, frames: Optional[np.ndarray] = None,
+                       ids: Optional[List[str]] = None):
+        """Save scenario to file, with every node's full series.
+
+        With ``frames`` (columns named by ``ids``) the series are written
+        straight from the matrix instead of from ``result``, which may have
+        been shaped.
+        """
+        if frames is not None:
+            impact_series = dict(zip(ids, np.ascontiguousarray(frames.T)))
+        else:
+            impact_series = result.impact_series
         scenario_data = {
             'scenario_id': result.scenario_id,
-            'shock': result.shock.dict(),
-            'impact_series': result.impact_series,
+            'shock': result.shock.model_dump(mode='json'),
+            'impact_series': impact_series,
             'kpis': result.kpis,
             'duration_hours': result.duration_hours,
             'created_at': datetime.now().isoformat()
         }
-        
+
         scenario_file = self.scenarios_dir / f"{result.scenario_id}.json"
-        with open(scenario_file, 'w') as f:
-            json.dump(scenario_data, f, indent=2, default=str)
-    
-    def load_scenario(self, scenario_id: str) -> Optional[SimulationResult]:
-        """Load a saved scenario"""
+        payload = orjson.dumps(scenario_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        atomic_write(scenario_file, lambda tmp: tmp.write_bytes(payload))
+        SCENARIO_BYTES.observe(len(payload))
+
+    def delete_scenario(self, scenario_id: str) -> bool:
+        """Unregister a standing scenario and delete its saved file. Returns False if neither existed."""
+        unregistered = self.unregister_standing(scenario_id)
+        scenario_file = self.scenarios_dir / f"{scenario_id}.json"
+        try:
+            scenario_file.unlink()
+            return True
+        except FileNotFoundError:
+            return unregistered
+
+    def load_scenario(self, scenario_id: str, shape: Optional[SeriesShape] = None) -> Optional[SimulationResult]:
+        """Load a saved scenario, optionally shaped"""
         scenario_file = self.scenarios_dir / f"{scenario_id}.json"
         if not scenario_file.exists():
             return None
-        
-        with open(scenario_file, 'r') as f:
-            data = json.load(f)
-        
+
+        with open(scenario_file, 'rb') as f:
+            data = orjson.loads(f.read())
+
         shock = Shock(**data['shock'])
-        return SimulationResult(
+        impact_series, timesteps = data['impact_series'], None
+        if shape is not None and shape.active and impact_series:
+            c = self.compiled
+            ids = list(impact_series)
+            positions = np.array([-1 if pos is None else pos
+                                  for pos in map(c.position, ids)], dtype=np.int64)
+            frames = np.array([impact_series[node_id] for node_id in ids], dtype=np.float64).T
+            impact_series, timesteps = self._shaped_series(c, frames, shape, ids=ids, positions=positions)
+        # Written by _save_scenario, so trusted
+        return SimulationResult.model_construct(
             scenario_id=data['scenario_id'],
             shock=shock,
-            impact_series=data['impact_series'],
+            impact_series=impact_series,
             kpis=data['kpis'],
-            duration_hours=data['duration_hours']
+            duration_hours=data['duration_hours'],
+            timesteps=timesteps
         )
-    def get_graph_data(self, planet: str = 'earth') -> Dict[str, Any]:
-        """Get graph structure for visualization, filtered by planet"""
-        nodes = []
-        edges = []
-        
-        # Filter nodes by planet
-        valid_nodes = set()
-        for node_id, node_data in self.graph.nodes(data=True):
-            node = node_data['data']
-            node_planet = getattr(node, 'planet', 'earth')
-            
-            if node_planet == planet:
-                valid_nodes.add(node_id)
-                nodes.append({
-                    'id': node_id,
-                    'name': node.name,
-                    'type': node_data['node_type'],
-                    'lat': getattr(node, 'lat', 0),
-                    'lon': getattr(node, 'lon', 0),
-                    'region': getattr(node, 'region', ''),
-                    'asset_type': getattr(node, 'asset_type', ''),
-                    'capacity': getattr(node, 'capacity', 1.0),
-                    'planet': node_planet
-                })
-        
-        # Filter edges where both source and target are on the planet
-        for source, target, edge_data in self.graph.edges(data=True):
-            if source in valid_nodes and target in valid_nodes:
-                edges.append({
-                    'source': source,
-                    'target': target,
-                    'weight': edge_data.get('weight', 0.0),
-                    'delay_hours': edge_data.get('delay_hours', 0),
-                    'decay': edge_data.get('decay', 0.1)
-                })
-        
+
+    def get_graph_data(self, planet: str = 'earth',
+                       node_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get graph structure for visualization, filtered by planet and optional node ids"""
+        c = self.compiled
+        planet_code = c.code('planet', planet)
+
+        if node_ids is None:
+            candidates = np.flatnonzero(c.planet == planet_code)
+        else:
+            positions = [c.position(node_id) for node_id in node_ids]
+            candidates = np.array([p for p in positions if p is not None], dtype=np.int64)
+            # Filter nodes by planet
+            candidates = candidates[c.planet[candidates] == planet_code]
+
+        ids = c.id_list(candidates)
+        node_types = [c.categories['node_type'][code] for code in c.node_type[candidates].tolist()]
+        asset_types = [c.categories['asset_type'][code] for code in c.asset_type[candidates].tolist()]
+        names = [value.decode() for value in c.names[candidates].tolist()]
+        nodes = [
+            {
+                'id': node_id,
+                'name': name,
+                'type': node_type,
+                'lat': lat,
+                'lon': lon,
+                'region': name if node_type == 'region' else '',
+                'asset_type': asset_type,
+                'capacity': capacity,
+                'planet': planet
+            }
+            for node_id, name, node_type, lat, lon, asset_type, capacity in zip(
+                ids, names, node_types, c.lat[candidates].tolist(), c.lon[candidates].tolist(),
+                asset_types, c.capacity[candidates].tolist())
+        ]
+
+        # Keep edges where both source and target are on the planet
+        valid = np.zeros(len(c), dtype=bool)
+        valid[candidates] = True
+        edges_idx = c.out_edges[valid[c.edge_src[c.out_edges]] & valid[c.edge_dst[c.out_edges]]]
+        all_ids = c.id_list() if len(edges_idx) else []
+        edges = [
+            {
+                'source': all_ids[source],
+                'target': all_ids[target],
+                'weight': weight,
+                'delay_hours': delay,
+                'decay': decay
+            }
+            for source, target, weight, delay, decay in zip(
+                c.edge_src[edges_idx].tolist(), c.edge_dst[edges_idx].tolist(),
+                c.edge_weight[edges_idx].tolist(), c.edge_delay[edges_idx].tolist(),
+                c.edge_decay[edges_idx].tolist())
+        ]
+
         return {'nodes': nodes, 'edges': edges}
@@ -0,0 +1,113 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('max', 'lttb')
+
+
+def bucket_edges(steps: int, points: int) -> np.ndarray:
+    """Start of each of ``points`` near-equal buckets over ``steps`` timesteps"""
+    return np.linspace(0, steps, points + 1).astype(np.int64)[:-1]
+
+
+def downsample_max(values: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket maxima of a (timesteps x series) matrix; returns (bucket starts, values).
+
+    Every series keeps its peak, which is what impact charts care about.
+    """
+    starts = bucket_edges(len(values), points)
+    return starts, np.maximum.reduceat(values, starts, axis=0)
+
+
+def lttb_indices(y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets sample of a series over uniform x.
+
+    Keeps the first and last points; in each bucket between them picks the
+    point forming the largest triangle with the previous pick and the
+    average of the next bucket.
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n) if points >= n else np.array([0, n - 1][:points])
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    picked = np.empty(points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    x = np.arange(n, dtype=np.float64)
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        a = picked[i]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        picked[i + 1] = lo + int(np.argmax(area))
+    return picked
+
+
+class SeriesShape:
+    """Which impact series a result carries, and at what resolution.
+
+    Applied to the propagation matrix before any per-node list is built, so
+    filtered-out nodes and dropped points are never materialized. KPIs are
+    always computed on the full matrix.
+    """
+
+    def __init__(self, node_ids: Optional[List[str]] = None, planet: Optional[str] = None,
+                 top_k: Optional[int] = None, drop_zero: bool = False,
+                 points: Optional[int] = None, downsample: str = 'max'):
+        if downsample not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        if points is not None and points < 2:
+            raise ValueError("points must be at least 2")
+        self.node_ids = node_ids
+        self.planet = planet
+        self.top_k = top_k
+        self.drop_zero = drop_zero
+        self.points = points
+        self.downsample = downsample
+
+    @property
+    def active(self) -> bool:
+        return (self.node_ids is not None or self.planet is not None or self.top_k is not None
+                or self.drop_zero or self.points is not None)
+
+    def columns(self, compiled, frames: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Columns of ``frames`` to keep: column order, or most impacted first with top_k.
+
+        ``positions`` maps each column to its node position in ``compiled``
+        (-1 for nodes no longer in the graph); by default column i is node i.
+        """
+        if positions is None:
+            positions = np.arange(frames.shape[1])
+        keep = np.ones(len(positions), dtype=bool)
+        if self.node_ids is not None:
+            wanted = [compiled.position(node_id) for node_id in self.node_ids]
+            keep &= np.isin(positions, [p for p in wanted if p is not None])
+        if self.planet is not None:
+            code = compiled.code('planet', self.planet)
+            keep &= (positions >= 0) & (compiled.planet[np.maximum(positions, 0)] == code)
+        columns = np.flatnonzero(keep)
+
+        if self.drop_zero or self.top_k is not None:
+            peaks = frames[:, columns].max(axis=0) if len(frames) else np.zeros(len(columns))
+            if self.drop_zero:
+                columns, peaks = columns[peaks > 0], peaks[peaks > 0]
+            if self.top_k is not None:
+                # Stable on ties: column order
+                columns = columns[np.argsort(-peaks, kind='stable')[:self.top_k]]
+        return columns
+
+    def sample(self, values: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Downsample a (timesteps x kept nodes) matrix; returns (timesteps or None, values)"""
+        if self.points is None or self.points >= len(values):
+            return None, values
+        if self.downsample == 'lttb':
+            # One shared time axis: LTTB over the envelope of all kept series
+            envelope = values.max(axis=1) if values.shape[1] else np.zeros(len(values))
+            steps = lttb_indices(envelope, self.points)
+            return steps, values[steps]
+        return downsample_max(values, self.points)
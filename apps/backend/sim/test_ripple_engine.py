@@ -21,3 +21,161 @@ def test_ripple_engine_loads_json():
     
     # Check edges
     assert engine.graph.has_edge("suez_canal", "rotterdam")
+
+def test_ripple_engine_spatial_selection():
+    engine = RippleEngine()
+
+    nearest = engine.select_nodes('earth', near=(30.0, 32.0), k=2)
+    assert nearest[0] == "suez_canal"
+    assert len(nearest) == 2
+
+    europe = engine.select_nodes('earth', bbox=(-10, 35, 30, 60))
+    assert "rotterdam" in europe
+    assert "suez_canal" not in europe
+
+    graph = engine.get_graph_data(node_ids=europe)
+    assert {n['id'] for n in graph['nodes']} == set(europe)
+    assert all(e['source'] in europe and e['target'] in europe for e in graph['edges'])
+
+def _standing_engine(*shocks):
+    engine = RippleEngine()
+    results = [engine.simulate_shock(shock, standing=True) for shock in shocks]
+    return engine, results
+
+def _lists(impact_series):
+    return {node_id: list(map(float, series)) for node_id, series in impact_series.items()}
+
+def _assert_matches_full_run(engine, results):
+    for result in results:
+        assert _lists(result.impact_series) == _lists(engine._run(result.shock))
+        assert result.kpis == engine._calculate_kpis(result.impact_series, result.shock)
+
+def test_incremental_edge_updates_match_full_rerun():
+    from schemas import Shock
+    engine, results = _standing_engine(
+        Shock(target_ids=["suez_canal"], magnitude=0.7, duration_hours=72),
+        Shock(target_ids=["na"], magnitude=0.4, duration_hours=48),
+    )
+
+    engine.update_edge("suez_canal", "rotterdam", weight=0.2)
+    _assert_matches_full_run(engine, results)
+    engine.update_edge("eu", "as", delay_hours=6)
+    _assert_matches_full_run(engine, results)
+    engine.update_edge("rotterdam", "na", weight=0.3, delay_hours=0, decay=0.05)
+    _assert_matches_full_run(engine, results)
+    engine.remove_edge("na", "eu")
+    _assert_matches_full_run(engine, results)
+    engine.update_node("rotterdam", region_id="as")
+    _assert_matches_full_run(engine, results)
+
+def test_incremental_update_skips_unaffected_scenarios():
+    from schemas import Shock
+    engine, (result,) = _standing_engine(Shock(target_ids=["rotterdam"], magnitude=0.5, duration_hours=24))
+    before = _lists(result.impact_series)
+
+    # suez_canal is never hit by this shock, so its outgoing edges cannot matter
+    assert engine.update_edge("suez_canal", "rotterdam", weight=0.1) == []
+    assert _lists(result.impact_series) == before
+    assert engine.update_node("rotterdam", capacity=0.5) == []
+
+def test_refresh_world_patches_standing_scenarios(tmp_path):
+    from schemas import Shock
+    from world import WorldRepository
+    world_data = json.loads(Path(__file__).parent.parent.joinpath("data/world_nodes.json").read_text())
+    path = tmp_path / "world_nodes.json"
+    path.write_text(json.dumps(world_data))
+
+    engine = RippleEngine(world=WorldRepository(path))
+    result = engine.simulate_shock(Shock(target_ids=["na"], magnitude=0.6, duration_hours=72), standing=True)
+
+    world_data['edges'][0]['weight'] = 0.9
+    path.write_text(json.dumps(world_data) + "\n")
+    assert engine.refresh_world()
+    assert engine.graph["na"]["eu"]["weight"] == 0.9
+    _assert_matches_full_run(engine, [result])
+
+def test_refresh_mid_run_keeps_the_run_on_its_graph(tmp_path, monkeypatch):
+    from schemas import Shock
+    from world import WorldRepository
+    world_data = json.loads(Path(__file__).parent.parent.joinpath("data/world_nodes.json").read_text())
+    path = tmp_path / "world_nodes.json"
+    path.write_text(json.dumps(world_data))
+    engine = RippleEngine(world=WorldRepository(path))
+    engine.scenarios_dir = tmp_path / "scenarios"
+    shock = Shock(target_ids=["na"], magnitude=0.6, duration_hours=24)
+    expected = engine._run(shock)
+
+    # The node set changes while the run is propagating
+    world_data['nodes'] = [n for n in world_data['nodes'] if n['id'] != 'eu']
+    world_data['edges'] = [e for e in world_data['edges'] if 'eu' not in (e['source'], e['target'])]
+    path.write_text(json.dumps(world_data))
+    propagate = engine._propagate
+    def refresh_then_propagate(*args, **kwargs):
+        assert engine.refresh_world()
+        monkeypatch.setattr(engine, '_propagate', propagate)
+        return propagate(*args, **kwargs)
+    monkeypatch.setattr(engine, '_propagate', refresh_then_propagate)
+
+    result = engine.simulate_shock(shock)
+    assert 'eu' not in engine.nodes
+    assert _lists(result.impact_series) == expected
+
+def test_standing_scenarios_are_bounded_and_can_be_unregistered(tmp_path):
+    from schemas import Shock
+    engine = RippleEngine()
+    engine.scenarios_dir = tmp_path
+    engine.max_standing = 2
+    shock = Shock(target_ids=["na"], magnitude=0.2, duration_hours=4)
+    first, second, third = (engine.simulate_shock(shock, standing=True) for _ in range(3))
+    assert [r.scenario_id for r in engine.standing] == [second.scenario_id, third.scenario_id]
+
+    assert engine.delete_scenario(second.scenario_id)
+    assert [r.scenario_id for r in engine.standing] == [third.scenario_id]
+    assert engine.load_scenario(second.scenario_id) is None
+    assert not engine.delete_scenario(second.scenario_id)
+
+    engine.standing_ttl_s = 0
+    engine.simulate_shock(shock)
+    engine._prune_standing()
+    assert engine.standing == [] and engine._standing_series == []
+
+def test_scenario_ids_are_unique_within_a_second():
+    from schemas import Shock
+    engine = RippleEngine()
+    shock = Shock(target_ids=["na"], magnitude=0.1, duration_hours=1)
+    ids = {engine.simulate_shock(shock).scenario_id for _ in range(5)}
+    assert len(ids) == 5
+    assert all(engine.load_scenario(scenario_id) is not None for scenario_id in ids)
+
+def test_batched_shocks_match_single_runs(monkeypatch):
+    import sim.ripple_engine
+    from schemas import Shock
+    engine = RippleEngine()
+    shocks = [
+        Shock(target_ids=["suez_canal"], magnitude=0.7, duration_hours=72),
+        Shock(target_ids=["na", "rotterdam"], magnitude=0.4, duration_hours=12),
+        Shock(target_ids=["singapore"], magnitude=1.0, duration_hours=30),
+    ]
+    # Small enough to force several propagation runs
+    monkeypatch.setattr(sim.ripple_engine, 'BATCH_CELLS', 60 * len(engine.nodes))
+    for shock, result in zip(shocks, engine.simulate_shocks(shocks)):
+        single = engine.simulate_shock(shock)
+        assert result.duration_hours == shock.duration_hours
+        assert _lists(result.impact_series) == _lists(single.impact_series)
+        assert result.kpis == single.kpis
+
+def test_shocks_differing_in_start_time_share_a_propagation(monkeypatch):
+    from datetime import datetime
+    from schemas import Shock
+    engine = RippleEngine()
+    runs = []
+    frames_batch = engine._frames_batch
+    monkeypatch.setattr(engine, '_frames_batch', lambda c, shocks: runs.append(len(shocks)) or frames_batch(c, shocks))
+    shocks = [
+        Shock(target_ids=["na", "eu"], magnitude=0.4, duration_hours=12, start_ts=datetime(2026, 1, 1)),
+        Shock(target_ids=["eu", "na"], magnitude=0.4, duration_hours=12, start_ts=datetime(2026, 2, 1)),
+    ]
+    first, second = engine.simulate_shocks(shocks)
+    assert runs == [1]
+    assert first.shock.start_ts != second.shock.start_ts and first.scenario_id != second.scenario_id
+    assert _lists(first.impact_series) == _lists(second.impact_series)
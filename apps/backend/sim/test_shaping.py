@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from schemas import Shock
+from sim import RippleEngine
+from sim.shaping import SeriesShape, downsample_max, lttb_indices
+
+SHOCK = Shock(target_ids=["suez_canal"], magnitude=0.7, duration_hours=720)
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    y = np.zeros(1000)
+    y[377] = 1.0
+    picked = lttb_indices(y, 50)
+    assert len(picked) == 50
+    assert picked[0] == 0 and picked[-1] == 999
+    assert np.all(np.diff(picked) > 0)
+    assert 377 in picked
+    assert list(lttb_indices(y[:10], 20)) == list(range(10))
+
+
+def test_max_downsampling_keeps_every_series_peak():
+    rng = np.random.default_rng(0)
+    values = rng.random((721, 5))
+    starts, sampled = downsample_max(values, 30)
+    assert len(starts) == 30 and starts[0] == 0
+    assert np.array_equal(sampled.max(axis=0), values.max(axis=0))
+
+
+def test_shaped_results_match_the_full_run():
+    engine = RippleEngine()
+    full = engine.simulate_shock(SHOCK)
+
+    top = engine.simulate_shock(SHOCK, shape=SeriesShape(top_k=3, planet='earth'))
+    peaks = {node_id: max(series) for node_id, series in full.impact_series.items()
+             if engine.nodes[node_id].planet == 'earth'}
+    assert list(top.impact_series) == sorted(peaks, key=lambda n: -peaks[n])[:3]
+    assert top.kpis == full.kpis
+
+    nonzero = engine.simulate_shock(SHOCK, shape=SeriesShape(drop_zero=True))
+    assert set(nonzero.impact_series) == {n for n, s in full.impact_series.items() if max(s) > 0}
+    assert not any(node_id.startswith('colony') for node_id in nonzero.impact_series)
+
+    sampled = engine.simulate_shock(SHOCK, shape=SeriesShape(node_ids=['rotterdam', 'nowhere'], points=24))
+    assert list(sampled.impact_series) == ['rotterdam']
+    assert len(sampled.impact_series['rotterdam']) == len(sampled.timesteps) == 24
+    assert max(sampled.impact_series['rotterdam']) == max(full.impact_series['rotterdam'])
+
+    lttb = engine.simulate_shock(SHOCK, shape=SeriesShape(points=24, downsample='lttb'))
+    assert lttb.timesteps[0] == 0 and lttb.timesteps[-1] == SHOCK.duration_hours
+
+
+def test_saved_scenarios_stay_complete_and_reshape_on_load():
+    engine = RippleEngine()
+    shape = SeriesShape(top_k=5, points=48)
+    shaped = engine.simulate_shock(SHOCK, shape=shape)
+
+    loaded = engine.load_scenario(shaped.scenario_id)
+    assert len(loaded.impact_series) == len(engine.nodes)
+    assert loaded.timesteps is None
+
+    reloaded = engine.load_scenario(shaped.scenario_id, shape=shape)
+    assert {k: list(v) for k, v in reloaded.impact_series.items()} == \
+        {k: list(v) for k, v in shaped.impact_series.items()}
+    assert reloaded.timesteps == shaped.timesteps
+
+
+def test_rejects_unknown_downsampling():
+    with pytest.raises(ValueError):
+        SeriesShape(points=10, downsample='mean')
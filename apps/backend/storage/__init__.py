@@ -0,0 +1,15 @@
+from .files import (
+    FileLock,
+    SharedLayerCache,
+    atomic_write,
+    file_lock_async,
+    get_shared_layer_cache,
+    read_frame,
+    write_frame,
+)
+from .history import LayerHistory, get_layer_history
+from .snapshots import SnapshotRegistry, get_snapshot_registry, sha256_file
+
+__all__ = ['FileLock', 'LayerHistory', 'SharedLayerCache', 'SnapshotRegistry', 'atomic_write',
+           'file_lock_async', 'get_layer_history', 'get_shared_layer_cache', 'get_snapshot_registry',
+           'read_frame', 'sha256_file', 'write_frame']
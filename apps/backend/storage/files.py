@@ -0,0 +1,139 @@
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+import polars as pl
+
+from payloads.arrow import frame_to_polars, polars_to_frame
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks degrade to no-ops
+    fcntl = None
+
+
+class FileLock:
+    """Advisory cross-process lock on a lock file (flock)"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    def acquire(self, shared: bool = False):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+        self._fd = fd
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+@asynccontextmanager
+async def file_lock_async(path: Path):
+    """Hold an exclusive FileLock without blocking the event loop while waiting"""
+    lock = FileLock(path)
+    await asyncio.to_thread(lock.acquire)
+    try:
+        yield lock
+    finally:
+        lock.release()
+
+
+def atomic_write(path: Path, write_fn: Callable[[Path], None]):
+    """Write via a unique temp file in the same directory, then rename over path.
+
+    Readers see either the old file or the complete new one, never a
+    partial write.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        write_fn(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def write_frame(data: pd.DataFrame, path: Path):
+    """Atomically write a frame as Parquet (.parquet) or Arrow IPC (anything else)"""
+    frame = frame_to_polars(data)
+    if Path(path).suffix == '.parquet':
+        atomic_write(path, frame.write_parquet)
+    else:
+        atomic_write(path, lambda tmp: frame.write_ipc(tmp, compression='uncompressed'))
+
+
+def read_frame(path: Path, memory_map: bool = False) -> pd.DataFrame:
+    """Read a frame written by write_frame"""
+    if Path(path).suffix == '.parquet':
+        frame = pl.read_parquet(path)
+    else:
+        frame = pl.read_ipc(path, memory_map=memory_map)
+    return polars_to_frame(frame)
+
+
+class SharedLayerCache:
+    """Normalized layers shared between worker processes.
+
+    Each layer is one uncompressed Arrow IPC file, read back memory-mapped.
+    Point ``root`` at a tmpfs such as /dev/shm to keep it in shared memory.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name: str) -> Path:
+        return self.root / f"{name}.arrow"
+
+    def lock_path(self, name: str) -> Path:
+        return self.root / f"{name}.lock"
+
+    def put(self, name: str, data: pd.DataFrame):
+        """Publish a layer for other workers"""
+        write_frame(data, self.path(name))
+
+    def get(self, name: str, max_age_s: float) -> Optional[Tuple[pd.DataFrame, float]]:
+        """(layer, age in seconds) if another worker published it recently enough"""
+        path = self.path(name)
+        try:
+            age = time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if age >= max_age_s:
+            return None
+        try:
+            return read_frame(path, memory_map=True), max(0.0, age)
+        except Exception as e:
+            print(f"Shared layer cache read failed for {name}: {e}")
+            return None
+
+
+def get_shared_layer_cache() -> Optional[SharedLayerCache]:
+    """Shared cache configured via SHARED_LAYER_CACHE_DIR, or None when unset"""
+    root = os.getenv("SHARED_LAYER_CACHE_DIR")
+    return SharedLayerCache(Path(root)) if root else None
@@ -0,0 +1,173 @@
+import os
+import re
+import shutil
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import polars as pl
+
+from payloads.arrow import frame_to_polars
+from .files import FileLock, atomic_write
+
+TS_COLUMN = 'refreshed_at'
+COMPACTED = 'data.parquet'
+STEP_PATTERN = re.compile(r'^\d+(s|m|h|d|w)$')
+AGGREGATIONS = ('mean', 'min', 'max', 'last')
+
+
+def to_utc_naive(ts: datetime) -> datetime:
+    """Datetime as naive UTC (naive values are taken as UTC)"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+class LayerHistory:
+    """Append-only history of refreshed layers, partitioned by layer and day.
+
+    Every refresh is written as its own Parquet part under
+    ``<root>/<layer>/date=YYYY-MM-DD/``, stamped with ``refreshed_at``, so
+    concurrent workers never write the same file. Once a day is over its
+    parts are compacted into a single ``data.parquet``, and days older than
+    ``retention_days`` are removed. Queries only open the day partitions
+    overlapping the requested range and push the time filter into the
+    Parquet scan.
+    """
+
+    def __init__(self, root: Path, retention_days: Optional[int] = None):
+        self.root = Path(root)
+        self.retention_days = retention_days
+        # Per layer, the day up to which finished partitions were already compacted
+        self._compacted: Dict[str, date] = {}
+
+    def _day_dir(self, name: str, day: date) -> Path:
+        return self.root / name / f"date={day.isoformat()}"
+
+    def append(self, name: str, data: pd.DataFrame, ts: Optional[datetime] = None) -> Optional[Path]:
+        """Record one refresh of a layer"""
+        if data.empty:
+            return None
+        ts = to_utc_naive(ts or datetime.now(timezone.utc))
+        frame = frame_to_polars(data).with_columns(pl.lit(ts).cast(pl.Datetime('us')).alias(TS_COLUMN))
+        path = self._day_dir(name, ts.date()) / f"part-{int(ts.timestamp() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+        atomic_write(path, frame.write_parquet)
+        if self._compacted.get(name) != ts.date():
+            self.compact(name, before=ts.date())
+            self._compacted[name] = ts.date()
+        return path
+
+    def days(self, name: str) -> List[date]:
+        """Days with recorded history for a layer"""
+        layer_dir = self.root / name
+        if not layer_dir.exists():
+            return []
+        return sorted(date.fromisoformat(p.name[5:]) for p in layer_dir.glob("date=*") if p.is_dir())
+
+    def compact(self, name: str, before: date):
+        """Merge the parts of each finished day (earlier than ``before``) into one file,
+        dropping days that fell out of the retention window"""
+        oldest = before - timedelta(days=self.retention_days) if self.retention_days is not None else None
+        for day in self.days(name):
+            if day >= before:
+                continue
+            day_dir = self._day_dir(name, day)
+            if oldest is not None and day < oldest:
+                # Readers retry once if a listed partition disappears
+                shutil.rmtree(day_dir, ignore_errors=True)
+                continue
+            parts = sorted(day_dir.glob("part-*.parquet"))
+            if not parts:
+                continue
+            with FileLock(day_dir / ".compact.lock"):
+                parts = sorted(day_dir.glob("part-*.parquet"))
+                if not parts:
+                    continue
+                sources = parts + ([day_dir / COMPACTED] if (day_dir / COMPACTED).exists() else [])
+                merged = pl.concat([pl.read_parquet(p) for p in sources], how='diagonal_relaxed').sort(TS_COLUMN)
+                # Readers prefer data.parquet once it exists, so parts can go after the rename
+                atomic_write(day_dir / COMPACTED, merged.write_parquet)
+                for part in parts:
+                    part.unlink(missing_ok=True)
+
+    def _files(self, name: str, start: datetime, end: datetime) -> List[Path]:
+        """Parquet files for the day partitions overlapping [start, end]"""
+        files = []
+        for day in self.days(name):
+            if not start.date() <= day <= end.date():
+                continue
+            day_dir = self._day_dir(name, day)
+            compacted = day_dir / COMPACTED
+            files.extend([compacted] if compacted.exists() else sorted(day_dir.glob("part-*.parquet")))
+        return files
+
+    def scan(self, name: str, start: datetime, end: datetime) -> pl.LazyFrame:
+        """Lazy scan of a layer's history between start and end (inclusive)"""
+        start, end = to_utc_naive(start), to_utc_naive(end)
+        scans = [pl.scan_parquet(path) for path in self._files(name, start, end)]
+        if not scans:
+            return pl.LazyFrame(schema={TS_COLUMN: pl.Datetime('us')})
+        frame = pl.concat(scans, how='diagonal_relaxed')
+        return frame.filter(pl.col(TS_COLUMN).is_between(start, end))
+
+    def query(self, name: str, start: datetime, end: datetime, step: Optional[str] = None,
+              agg: str = 'mean', ids: Optional[Sequence[str]] = None,
+              region: Optional[str] = None) -> pl.DataFrame:
+        """History rows, optionally downsampled to one row per entity per ``step`` bucket.
+
+        Entities are keyed by ``id`` (or by lat/lon for gridded layers);
+        numeric columns are aggregated with ``agg`` and other columns keep
+        their last value in the bucket.
+        """
+        if step is not None and not STEP_PATTERN.match(step):
+            raise ValueError("step must look like 15m, 1h, 1d or 1w")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATIONS)}")
+
+        for attempt in range(2):
+            try:
+                return self._query(name, start, end, step, agg, ids, region)
+            except FileNotFoundError:
+                # A part was compacted away between listing and reading; list again
+                if attempt:
+                    raise
+
+    def _query(self, name: str, start: datetime, end: datetime, step: Optional[str],
+               agg: str, ids: Optional[Sequence[str]], region: Optional[str]) -> pl.DataFrame:
+        frame = self.scan(name, start, end)
+        schema = frame.collect_schema()
+        # An empty history has no columns to check yet; a layer without the column cannot be filtered on it
+        if len(schema) > 1:
+            for column, value in (('id', ids), ('region', region)):
+                if value is not None and column not in schema:
+                    raise ValueError(f"Layer {name} has no {column} column to filter on")
+        if ids is not None and 'id' in schema:
+            frame = frame.filter(pl.col('id').is_in(list(ids)))
+        if region is not None and 'region' in schema:
+            frame = frame.filter(pl.col('region') == region)
+        if step is None:
+            return frame.sort(TS_COLUMN).collect()
+
+        keys = ['id'] if 'id' in schema else [c for c in ('lat', 'lon') if c in schema]
+        values = [c for c in schema if c != TS_COLUMN and c not in keys]
+        numeric = [c for c in values if schema[c].is_numeric()]
+        aggs = [getattr(pl.col(c), agg)() for c in numeric]
+        aggs += [pl.col(c).last() for c in values if c not in numeric]
+        return (
+            frame.sort(TS_COLUMN)
+            .with_columns(pl.col(TS_COLUMN).dt.truncate(step))
+            .group_by([TS_COLUMN] + keys, maintain_order=True)
+            .agg(aggs)
+            .sort([TS_COLUMN] + keys)
+            .collect()
+        )
+
+
+def get_layer_history() -> Optional[LayerHistory]:
+    """History store under LAYER_HISTORY_DIR (default .cache/history; set it empty to disable),
+    keeping LAYER_HISTORY_RETENTION_DAYS days (default 30; 0 keeps everything)"""
+    root = os.getenv("LAYER_HISTORY_DIR", ".cache/history")
+    retention_days = int(os.getenv("LAYER_HISTORY_RETENTION_DAYS", "30"))
+    return LayerHistory(Path(root), retention_days=retention_days or None) if root else None
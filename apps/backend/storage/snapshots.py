@@ -0,0 +1,139 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .files import atomic_write
+
+HASH_CHUNK = 8 << 20
+
+
+def sha256_file(path: Path) -> str:
+    """SHA256 of a file, read through a memory map.
+
+    hashlib releases the GIL while digesting large buffers, so several
+    files hash in parallel on plain threads.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, size, HASH_CHUNK):
+                    digest.update(view[offset:offset + HASH_CHUNK])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+class SnapshotRegistry:
+    """Size, mtime and sha256 of every file in a snapshot directory.
+
+    The registry is persisted next to the directory (``.<dir>.registry.json``)
+    so ``scan`` only re-hashes files whose size or mtime changed since the
+    last run. Agents resolve snapshot files through ``path``/``load``
+    instead of hard-coding locations; ``load`` parses a file on first use
+    and again only after it changes.
+    """
+
+    def __init__(self, root: Path, registry_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.registry_path = Path(registry_path) if registry_path is not None else \
+            self.root.parent / f".{self.root.name}.registry.json"
+        self.entries: Dict[str, Dict[str, Any]] = self._read_registry()
+        self._loaded: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        self._lock = threading.Lock()
+
+    def _read_registry(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.registry_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self):
+        """Persist the registry atomically"""
+        payload = json.dumps(self.entries, indent=2, sort_keys=True)
+        atomic_write(self.registry_path, lambda tmp: tmp.write_text(payload))
+
+    def files(self) -> Dict[str, os.stat_result]:
+        """Snapshot files currently on disk, by name"""
+        if not self.root.exists():
+            return {}
+        return {p.name: p.stat() for p in sorted(self.root.iterdir())
+                if p.is_file() and not p.name.startswith('.')}
+
+    def scan(self, workers: Optional[int] = None) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Refresh the registry from disk. Returns (entries, number of files re-hashed).
+
+        Unchanged files (same size and mtime) keep their recorded hash;
+        the rest are hashed in parallel.
+        """
+        stats = self.files()
+        entries, stale = {}, []
+        for name, st in stats.items():
+            known = self.entries.get(name)
+            if known and known.get('size') == st.st_size and known.get('mtime_ns') == st.st_mtime_ns:
+                entries[name] = known
+            else:
+                stale.append(name)
+
+        if stale:
+            workers = workers or min(len(stale), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                digests = pool.map(sha256_file, [self.root / name for name in stale])
+                for name, digest in zip(stale, digests):
+                    st = stats[name]
+                    entries[name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+
+        self.entries = dict(sorted(entries.items()))
+        return self.entries, len(stale)
+
+    def manifest(self) -> Dict[str, str]:
+        """name -> sha256 for every registered file"""
+        return {name: entry['sha256'] for name, entry in self.entries.items()}
+
+    def path(self, name: str) -> Optional[Path]:
+        """Location of a snapshot file, or None if it is not present"""
+        path = self.root / name
+        return path if path.is_file() else None
+
+    def load(self, name: str, reader: Callable[[Path], Any]) -> Optional[Any]:
+        """Parse a snapshot on first use, and again only after it changes on disk.
+
+        Returns None if the file is missing. Treat the result as read-only.
+        """
+        path = self.path(name)
+        if path is None:
+            return None
+        st = path.stat()
+        key = (st.st_size, st.st_mtime_ns)
+        cached = self._loaded.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached is None or cached[0] != key:
+                cached = (key, reader(path))
+                self._loaded[name] = cached
+        return cached[1]
+
+
+_default_registry: Optional[SnapshotRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_snapshot_registry() -> SnapshotRegistry:
+    """Process-wide registry for SNAPSHOTS_DIR (default data/snapshots)"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                _default_registry = SnapshotRegistry(Path(os.getenv("SNAPSHOTS_DIR", "data/snapshots")))
+    return _default_registry
@@ -0,0 +1,96 @@
+import asyncio
+import multiprocessing
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from agents import RefreshScheduler
+from storage import FileLock, SharedLayerCache, atomic_write, read_frame, write_frame
+
+
+def _writer(path, n):
+    for i in range(n):
+        atomic_write(path, lambda tmp: tmp.write_bytes(bytes([i % 256]) * 200_000))
+
+
+def _locked_increment(lock_path, counter_path, n):
+    for _ in range(n):
+        with FileLock(lock_path):
+            value = int(counter_path.read_text())
+            time.sleep(0.0005)
+            counter_path.write_text(str(value + 1))
+
+
+def test_atomic_write_never_exposes_partial_files(tmp_path):
+    path = tmp_path / "layer.bin"
+    atomic_write(path, lambda tmp: tmp.write_bytes(b"\0" * 200_000))
+    procs = [multiprocessing.Process(target=_writer, args=(path, 50)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    while any(p.is_alive() for p in procs):
+        data = path.read_bytes()
+        assert len(data) == 200_000 and len(set(data)) == 1
+    for p in procs:
+        p.join()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+    procs = [multiprocessing.Process(target=_locked_increment, args=(tmp_path / "c.lock", counter, 20))
+             for _ in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert counter.read_text() == "60"
+
+
+def test_frame_roundtrip_keeps_lists_and_timestamps(tmp_path):
+    df = pd.DataFrame({
+        'id': ['a', 'b'],
+        'ts': [datetime(2026, 1, 1), datetime(2026, 1, 2)],
+        'tags': [['x', 'y'], []],
+        'value': [1.5, 2.5],
+    })
+    for name in ("layer.parquet", "layer.arrow"):
+        write_frame(df, tmp_path / name)
+        back = read_frame(tmp_path / name, memory_map=name.endswith('.arrow'))
+        assert back['tags'].tolist() == [['x', 'y'], []]
+        assert back['value'].tolist() == [1.5, 2.5]
+        assert pd.to_datetime(back['ts']).tolist() == df['ts'].tolist()
+
+
+class CountingAgent:
+    ttl_minutes = 30
+
+    def __init__(self):
+        self.calls = 0
+        self.adopted = 0
+
+    async def load_data_async(self, force: bool = False) -> pd.DataFrame:
+        self.calls += 1
+        return pd.DataFrame({'id': ['n1'], 'value': [float(self.calls)]})
+
+    def adopt(self, data: pd.DataFrame):
+        self.adopted += 1
+
+
+def test_schedulers_share_warm_layers(tmp_path):
+    shared = SharedLayerCache(tmp_path)
+    first, second = CountingAgent(), CountingAgent()
+    # Two workers, each with its own scheduler, sharing one cache directory
+    worker_a = RefreshScheduler({'layer': first}, shared=shared)
+    worker_b = RefreshScheduler({'layer': second}, shared=shared)
+
+    async def run():
+        a = await worker_a.get('layer')
+        b = await worker_b.get('layer')
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert first.calls == 1 and second.calls == 0 and second.adopted == 1
+    assert b.to_dict('records') == a.to_dict('records')
+    assert not worker_b.is_stale('layer')
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from storage import LayerHistory
+
+
+def _grid(stress_a, stress_b):
+    return pd.DataFrame({
+        'id': ['a', 'b'],
+        'name': ['A', 'B'],
+        'region': ['eu', 'na'],
+        'stress_index': [stress_a, stress_b],
+    })
+
+
+def _fill(history, start, hours):
+    for h in range(hours):
+        history.append('grid', _grid(h / 100, 1.0), ts=start + timedelta(hours=h))
+
+
+def test_append_partitions_by_day_and_compacts_finished_days(tmp_path):
+    history = LayerHistory(tmp_path)
+    start = datetime(2024, 3, 1, 20)
+    _fill(history, start, 8)
+
+    days = history.days('grid')
+    assert [d.isoformat() for d in days] == ['2024-03-01', '2024-03-02']
+    first, second = (tmp_path / 'grid' / f"date={d.isoformat()}" for d in days)
+    # The finished day is one file, today keeps appending parts
+    assert [p.name for p in first.glob('*.parquet')] == ['data.parquet']
+    assert len(list(second.glob('part-*.parquet'))) == 4
+
+    raw = history.query('grid', start, start + timedelta(hours=8))
+    assert len(raw) == 16
+    assert raw['refreshed_at'].is_sorted()
+
+
+def test_compact_drops_days_outside_retention(tmp_path):
+    history = LayerHistory(tmp_path, retention_days=2)
+    start = datetime(2024, 3, 1, 12)
+    for day in range(5):
+        history.append('grid', _grid(0.1, 0.2), ts=start + timedelta(days=day))
+
+    assert [d.isoformat() for d in history.days('grid')] == ['2024-03-03', '2024-03-04', '2024-03-05']
+    assert len(history.query('grid', start, start + timedelta(days=5))) == 6
+
+
+def test_query_downsamples_and_filters(tmp_path):
+    history = LayerHistory(tmp_path)
+    start = datetime(2024, 3, 1)
+    _fill(history, start, 48)
+
+    daily = history.query('grid', start, start + timedelta(days=2), step='1d', region='eu')
+    assert daily['id'].to_list() == ['a', 'a']
+    assert daily['stress_index'].to_list() == pytest.approx([0.115, 0.355])
+    assert daily['name'].to_list() == ['A', 'A']
+
+    peak = history.query('grid', start, start + timedelta(hours=5), step='6h', agg='max', ids=['a'])
+    assert peak['stress_index'].to_list() == [0.05]
+
+    # Partition pruning: a range inside day two never opens day one
+    files = history._files('grid', start + timedelta(days=1, hours=2), start + timedelta(days=1, hours=3))
+    assert all('2024-03-02' in str(f) for f in files)
+
+    with pytest.raises(ValueError):
+        history.query('grid', start, start + timedelta(days=1), step='fortnight')
+
+
+def test_query_rejects_filters_the_layer_cannot_apply(tmp_path):
+    history = LayerHistory(tmp_path)
+    start = datetime(2024, 3, 1)
+    history.append('weather', pd.DataFrame({'lat': [0.0], 'lon': [0.0], 'value': [1.0]}), ts=start)
+
+    for filters in ({'ids': ['a']}, {'region': 'eu'}):
+        with pytest.raises(ValueError):
+            history.query('weather', start, start + timedelta(hours=1), **filters)
+    # Nothing recorded yet: nothing to filter
+    assert history.query('grid', start, start + timedelta(hours=1), ids=['a']).is_empty()
+
+
+def test_history_endpoint(tmp_path, monkeypatch):
+    import httpx
+    from main import app, services
+
+    history = LayerHistory(tmp_path)
+    now = datetime.utcnow()
+    history.append('grid', _grid(0.2, 0.4), ts=now - timedelta(minutes=30))
+    history.append('grid', _grid(0.4, 0.4), ts=now - timedelta(minutes=10))
+    monkeypatch.setattr(services.layer_scheduler, 'history', history)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            hourly = await client.get("/layers/grid/history", params={'step': '1h', 'ids': 'a'})
+            bad = await client.get("/layers/grid/history", params={'step': 'soon'})
+            unknown = await client.get("/layers/nope/history")
+            unrecorded = await client.get("/layers/alerts/history")
+            history.append('weather', pd.DataFrame({'lat': [0.0], 'lon': [0.0], 'value': [1.0]}),
+                           ts=now - timedelta(minutes=10))
+            gridded = await client.get("/layers/weather/history", params={'ids': 'a'})
+            return hourly, bad, unknown, unrecorded, gridded
+
+    hourly, bad, unknown, unrecorded, gridded = asyncio.run(run())
+    assert hourly.status_code == 200
+    assert sum(row['stress_index'] for row in hourly.json()) / len(hourly.json()) == pytest.approx(0.3)
+    assert bad.status_code == 400
+    assert unknown.status_code == 404
+    assert unrecorded.status_code == 404
+    assert gridded.status_code == 400
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+
+from storage import SnapshotRegistry, sha256_file
+
+
+def test_sha256_file_matches_hashlib(tmp_path):
+    path = tmp_path / "blob.bin"
+    data = os.urandom(3 * (8 << 20) + 123)
+    path.write_bytes(data)
+    assert sha256_file(path) == hashlib.sha256(data).hexdigest()
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert sha256_file(empty) == hashlib.sha256(b"").hexdigest()
+
+
+def test_scan_rehashes_only_changed_files(tmp_path):
+    root = tmp_path / "snapshots"
+    root.mkdir()
+    for i in range(4):
+        (root / f"s{i}.json").write_text(json.dumps({'i': i}))
+
+    registry = SnapshotRegistry(root)
+    entries, rehashed = registry.scan(workers=4)
+    assert rehashed == 4
+    assert entries['s0.json']['sha256'] == hashlib.sha256(b'{"i": 0}').hexdigest()
+    registry.save()
+
+    # A fresh process reuses the persisted registry
+    registry = SnapshotRegistry(root)
+    assert registry.scan()[1] == 0
+
+    (root / "s2.json").write_text(json.dumps({'i': 22}))
+    (root / "s4.json").write_text("{}")
+    (root / "s0.json").unlink()
+    entries, rehashed = registry.scan()
+    assert rehashed == 2
+    assert sorted(entries) == ['s1.json', 's2.json', 's3.json', 's4.json']
+    assert registry.manifest()['s2.json'] == hashlib.sha256(b'{"i": 22}').hexdigest()
+
+
+def test_load_parses_lazily_and_reloads_on_change(tmp_path):
+    root = tmp_path / "snapshots"
+    root.mkdir()
+    path = root / "alerts_sample.json"
+    path.write_text('[1]')
+    registry = SnapshotRegistry(root)
+    reads = []
+
+    def reader(p):
+        reads.append(p)
+        return json.loads(p.read_text())
+
+    assert registry.load("missing.json", reader) is None
+    assert registry.load("alerts_sample.json", reader) == [1]
+    assert registry.load("alerts_sample.json", reader) == [1]
+    assert len(reads) == 1
+
+    path.write_text('[1, 2]')
+    os.utime(path, ns=(1, 1))
+    assert registry.load("alerts_sample.json", reader) == [1, 2]
+    assert len(reads) == 2
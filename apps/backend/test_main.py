@@ -1,4 +1,8 @@
 import pytest
+import os
+import subprocess
+import sys
+from pathlib import Path
 from agents import WeatherAgent, PortsAgent, GridAgent, AlertsAgent
 from sim import RippleEngine
 from schemas import Shock
@@ -73,3 +77,38 @@ def test_ripple_engine():
     assert result.shock == shock
     assert 'impact_series' in result.dict()
     assert 'kpis' in result.dict()
+
+COLD_START_SCRIPT = """
+import asyncio, sys, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter() - t0
+assert 'google.generativeai' not in sys.modules, 'LLM client imported eagerly'
+assert 'networkx' not in sys.modules, 'networkx imported eagerly'
+assert not main.services.is_built('ripple_engine'), 'engine built at import'
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        assert main.services.is_built('nl_engine')
+
+t1 = time.perf_counter()
+asyncio.run(startup())
+print(imported, time.perf_counter() - t1)
+"""
+
+def test_cold_start_budget(tmp_path):
+    """Importing main is cheap and the lifespan warms services within budget"""
+    budget = float(os.getenv("COLD_START_BUDGET_S", "5"))
+    env = dict(os.environ, WARMUP="blocking", BACKGROUND_REFRESH="false", GEMINI_API_KEY="test-key")
+    backend_dir = Path(__file__).parent
+    # Fresh interpreter so nothing is already imported
+    proc = subprocess.run(
+        [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(backend_dir)!r})\n" + COLD_START_SCRIPT],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+    import_s, startup_s = (float(v) for v in proc.stdout.split())
+    assert import_s < budget
+    assert startup_s < budget
+    # Cache and scenario directories are created on first write, not at startup
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,4 @@
+from .repository import WorldRepository, get_world_repository
+from .compiled import CompiledGraph, attach_or_build
+
+__all__ = ['WorldRepository', 'get_world_repository', 'CompiledGraph', 'attach_or_build']
@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .spatial import EARTH_RADIUS_KM, PLANET_RADIUS_KM, SpatialIndex
+
+NODE_ARRAYS = ['ids', 'names', 'node_type', 'asset_type', 'region_id', 'planet',
+               'lat', 'lon', 'capacity', 'id_order', 'sorted_ids']
+EDGE_ARRAYS = ['edge_src', 'edge_dst', 'edge_weight', 'edge_delay', 'edge_decay']
+INDEX_ARRAYS = ['in_edges', 'in_ptr', 'out_edges', 'out_ptr']
+SPATIAL_ARRAYS = ['pos', 'lat', 'lon', 'keys']
+
+
+def _codes(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode strings as uint8 codes plus their category list"""
+    categories = sorted(set(values))
+    lookup = {value: i for i, value in enumerate(categories)}
+    return np.array([lookup[v] for v in values], dtype=np.uint8), categories
+
+
+def _fixed(values: Sequence[str]) -> np.ndarray:
+    """utf-8 fixed-width byte strings (mmap-able, unlike object arrays)"""
+    encoded = [v.encode() for v in values]
+    width = max((len(v) for v in encoded), default=1) or 1
+    return np.array(encoded, dtype=f'S{width}')
+
+
+class CompiledGraph:
+    """Array form of the world graph that can be shared between processes.
+
+    Nodes are rows in update order with fixed-width id/name columns,
+    dictionary-coded categoricals and float coordinates. Edges are flat
+    arrays in networkx edge order; ``in_ptr``/``in_edges`` (grouped by target)
+    and ``out_ptr``/``out_edges`` (grouped by source) index into them;
+    the indexes are persisted too, so attaching does no work per worker.
+
+    ``save`` writes every array as .npy under a directory and ``open``
+    memory-maps them read-only, so workers attached to the same directory
+    share one copy in the page cache. Mutating methods return a private
+    copy-on-write graph.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], categories: Dict[str, List[str]],
+                 spatial: Optional[Dict[str, Dict[str, np.ndarray]]] = None,
+                 cell_deg: float = 1.0, version: Optional[str] = None):
+        self.arrays = arrays
+        self.categories = categories
+        self.version = version
+        self.cell_deg = cell_deg
+        if not all(name in arrays for name in INDEX_ARRAYS):
+            arrays = dict(arrays, **self._index_edges(arrays['edge_src'], arrays['edge_dst'], len(arrays['ids'])))
+            self.arrays = arrays
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        self.spatial = spatial if spatial is not None else self._build_spatial()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_src)
+
+    # Construction
+
+    @classmethod
+    def from_graph(cls, graph: Any, version: Optional[str] = None,
+                   cell_deg: float = 1.0) -> "CompiledGraph":
+        """Compile a networkx DiGraph whose nodes carry RegionNode/AssetNode data"""
+        ids = list(graph.nodes)
+        position = {node_id: i for i, node_id in enumerate(ids)}
+        data = [graph.nodes[node_id]['data'] for node_id in ids]
+        node_type, node_type_cats = _codes([graph.nodes[n]['node_type'] for n in ids])
+        asset_type, asset_type_cats = _codes([getattr(d, 'asset_type', '') for d in data])
+        planet, planet_cats = _codes([getattr(d, 'planet', 'earth') for d in data])
+        id_bytes = _fixed(ids)
+        id_order = np.argsort(id_bytes, kind='stable').astype(np.int64)
+
+        # Edges in networkx order (by source, insertion order per source)
+        edges = [(position[u], position[v], attrs) for u, v, attrs in graph.edges(data=True)]
+        edge_index = {(u, v): i for i, (u, v, _) in enumerate(edges)}
+        # Inputs are summed in predecessor insertion order, as networkx iterates them
+        in_edges = np.array([edge_index[position[u], position[v]] for v in ids for u in graph.pred[v]],
+                            dtype=np.int64)
+        arrays = {
+            'ids': id_bytes,
+            'names': _fixed([d.name for d in data]),
+            'node_type': node_type,
+            'asset_type': asset_type,
+            'region_id': _fixed([getattr(d, 'region_id', '') for d in data]),
+            'planet': planet,
+            'lat': np.array([d.lat for d in data], dtype=np.float64),
+            'lon': np.array([d.lon for d in data], dtype=np.float64),
+            'capacity': np.array([getattr(d, 'capacity', 1.0) for d in data], dtype=np.float64),
+            'id_order': id_order,
+            'sorted_ids': id_bytes[id_order],
+            'edge_src': np.array([e[0] for e in edges], dtype=np.int64),
+            'edge_dst': np.array([e[1] for e in edges], dtype=np.int64),
+            'edge_weight': np.array([e[2].get('weight', 0.0) for e in edges], dtype=np.float64),
+            'edge_delay': np.array([e[2].get('delay_hours', 0) for e in edges], dtype=np.int64),
+            'edge_decay': np.array([e[2].get('decay', 0.1) for e in edges], dtype=np.float64),
+        }
+        index = cls._index_edges(arrays['edge_src'], arrays['edge_dst'], len(ids))
+        index['in_edges'] = in_edges
+        arrays.update(index)
+        categories = {'node_type': node_type_cats, 'asset_type': asset_type_cats, 'planet': planet_cats}
+        return cls(arrays, categories, cell_deg=cell_deg, version=version)
+
+    @staticmethod
+    def _index_edges(src: np.ndarray, dst: np.ndarray, n: int) -> Dict[str, np.ndarray]:
+        """CSR indexes over the flat edge arrays, keeping insertion order within a group"""
+        return {
+            'in_edges': np.argsort(dst, kind='stable'),
+            'in_ptr': np.concatenate([[0], np.cumsum(np.bincount(dst, minlength=n))]).astype(np.int64),
+            'out_edges': np.argsort(src, kind='stable'),
+            'out_ptr': np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64),
+        }
+
+    def _build_spatial(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Per-planet spatial index arrays keyed by node position"""
+        spatial = {}
+        for code, planet in enumerate(self.categories['planet']):
+            pos = np.flatnonzero(self.planet == code)
+            index = SpatialIndex(pos, self.lat[pos], self.lon[pos], cell_deg=self.cell_deg)
+            spatial[planet] = {'pos': index.ids.astype(np.int64), 'lat': index.lats,
+                               'lon': index.lons, 'keys': index.keys}
+        return spatial
+
+    def spatial_index(self, planet: str) -> Optional[SpatialIndex]:
+        """SpatialIndex over a planet's nodes; ids are node positions"""
+        arrays = self.spatial.get(planet)
+        if arrays is None:
+            return None
+        return SpatialIndex.from_sorted(
+            arrays['pos'], arrays['lat'], arrays['lon'], arrays['keys'],
+            cell_deg=self.cell_deg, radius_km=PLANET_RADIUS_KM.get(planet, EARTH_RADIUS_KM),
+        )
+
+    # Lookups
+
+    def id_at(self, pos: int) -> str:
+        return self.ids[pos].decode()
+
+    def id_list(self, positions: Optional[Sequence[int]] = None) -> List[str]:
+        ids = self.ids if positions is None else self.ids[np.asarray(positions, dtype=np.int64)]
+        return [value.decode() for value in ids.tolist()]
+
+    def position(self, node_id: str) -> Optional[int]:
+        """Row of a node id (binary search over the sorted id permutation)"""
+        key = node_id.encode()
+        if not key or len(key) > self.ids.dtype.itemsize:
+            return None
+        i = int(np.searchsorted(self.sorted_ids, key))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == key:
+            return int(self.id_order[i])
+        return None
+
+    def category(self, column: str, pos: int) -> str:
+        return self.categories[column][int(getattr(self, column)[pos])]
+
+    def code(self, column: str, value: str) -> int:
+        """Code of a categorical value, or -1 if it never occurs"""
+        cats = self.categories[column]
+        return cats.index(value) if value in cats else -1
+
+    def find_edge(self, src: int, dst: int) -> Optional[int]:
+        """Index of the src->dst edge in the flat edge arrays"""
+        for e in self.out_edges[self.out_ptr[src]:self.out_ptr[src + 1]]:
+            if self.edge_dst[e] == dst:
+                return int(e)
+        return None
+
+    def predecessors(self, pos: int) -> np.ndarray:
+        return self.in_edges[self.in_ptr[pos]:self.in_ptr[pos + 1]]
+
+    def descendants(self, sources: Sequence[int]) -> np.ndarray:
+        """Positions reachable from sources (sources included)"""
+        seen = np.zeros(len(self.ids), dtype=bool)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        seen[frontier] = True
+        while len(frontier):
+            starts, ends = self.out_ptr[frontier], self.out_ptr[frontier + 1]
+            if not (ends > starts).any():
+                break
+            edges = np.concatenate([self.out_edges[s:e] for s, e in zip(starts, ends)])
+            nxt = np.unique(self.edge_dst[edges])
+            frontier = nxt[~seen[nxt]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    # Copy-on-write mutation
+
+    def _edge_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: np.array(self.arrays[name]) for name in EDGE_ARRAYS}
+
+    def _with_edges(self, edges: Dict[str, np.ndarray]) -> "CompiledGraph":
+        arrays = {name: values for name, values in self.arrays.items() if name not in INDEX_ARRAYS}
+        arrays.update(edges)
+        return CompiledGraph(arrays, self.categories, self.spatial, self.cell_deg, self.version)
+
+    def with_edge(self, src: int, dst: int, weight: float, delay_hours: int,
+                  decay: float) -> "CompiledGraph":
+        """Copy with the src->dst edge set (updated in place, or appended if new)"""
+        edges = self._edge_arrays()
+        e = self.find_edge(src, dst)
+        if e is None:
+            for name, value in zip(EDGE_ARRAYS, (src, dst, weight, delay_hours, decay)):
+                edges[name] = np.append(edges[name], np.array([value], dtype=edges[name].dtype))
+        else:
+            edges['edge_weight'][e] = weight
+            edges['edge_delay'][e] = delay_hours
+            edges['edge_decay'][e] = decay
+        return self._with_edges(edges)
+
+    def without_edge(self, src: int, dst: int) -> "CompiledGraph":
+        """Copy with the src->dst edge removed"""
+        e = self.find_edge(src, dst)
+        if e is None:
+            return self
+        return self._with_edges({name: np.delete(self.arrays[name], e) for name in EDGE_ARRAYS})
+
+    def with_column(self, column: str, pos: int, value: Any) -> "CompiledGraph":
+        """Copy with one node attribute (region_id, capacity, lat or lon) changed"""
+        if column == 'region_id':
+            region_ids = [v.decode() for v in self.region_id.tolist()]
+            region_ids[pos] = value
+            values = _fixed(region_ids)
+        elif column in ('capacity', 'lat', 'lon'):
+            values = np.array(self.arrays[column])
+            values[pos] = value
+        else:
+            raise ValueError(f"Unsupported node attribute: {column}")
+        arrays = dict(self.arrays, **{column: values})
+        # Moving a node invalidates the spatial arrays; rebuild them
+        spatial = None if column in ('lat', 'lon') else self.spatial
+        return CompiledGraph(arrays, self.categories, spatial, self.cell_deg, self.version)
+
+    # Persistence
+
+    def save(self, root: Path):
+        """Write arrays under root; meta.json is written last"""
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        for name, values in self.arrays.items():
+            np.save(root / f"{name}.npy", np.ascontiguousarray(values))
+        for planet, arrays in self.spatial.items():
+            for name, values in arrays.items():
+                np.save(root / f"spatial_{planet}_{name}.npy", values)
+        (root / "meta.json").write_text(json.dumps({
+            'version': self.version,
+            'categories': self.categories,
+            'planets': list(self.spatial),
+            'cell_deg': self.cell_deg,
+        }))
+
+    @classmethod
+    def open(cls, root: Path) -> "CompiledGraph":
+        """Attach to a saved graph; arrays are read-only memory maps"""
+        root = Path(root)
+        meta = json.loads((root / "meta.json").read_text())
+        arrays = {name: np.load(root / f"{name}.npy", mmap_mode='r')
+                  for name in NODE_ARRAYS + EDGE_ARRAYS + INDEX_ARRAYS}
+        spatial = {
+            planet: {name: np.load(root / f"spatial_{planet}_{name}.npy", mmap_mode='r')
+                     for name in SPATIAL_ARRAYS}
+            for planet in meta['planets']
+        }
+        return cls(arrays, meta['categories'], spatial, meta['cell_deg'], meta['version'])
+
+
+def attach_or_build(root: Path, key: str,
+                    build: Callable[[], CompiledGraph]) -> CompiledGraph:
+    """Attach to the compiled graph for ``key`` under root, building it once if missing.
+
+    The first process to take the build lock compiles and publishes the
+    graph (the leader); every other process waits on the lock and then
+    attaches to the published copy. Each build goes to a fresh directory
+    that is renamed into place, so attached readers are never disturbed.
+    """
+    # storage imports payloads, which imports world; import late to avoid the cycle
+    from storage import FileLock
+
+    root = Path(root)
+    target = root / key
+    if (target / "meta.json").exists():
+        return CompiledGraph.open(target)
+    with FileLock(root / "build.lock"):
+        if (target / "meta.json").exists():
+            return CompiledGraph.open(target)
+        tmp = root / f".build-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            build().save(tmp)
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp, ignore_errors=True)
+    return CompiledGraph.open(target)
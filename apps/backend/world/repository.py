@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+import polars as pl
+
+NODE_COLUMNS = ['id', 'name', 'type', 'asset_type', 'region_id', 'lat', 'lon', 'capacity', 'planet']
+EDGE_COLUMNS = ['source', 'target', 'weight', 'delay_hours', 'decay']
+NODE_SCHEMA = {
+    'id': pl.Utf8, 'name': pl.Utf8, 'type': pl.Utf8, 'asset_type': pl.Utf8,
+    'region_id': pl.Utf8, 'lat': pl.Float64, 'lon': pl.Float64,
+    'capacity': pl.Float64, 'planet': pl.Utf8,
+}
+EDGE_SCHEMA = {
+    'source': pl.Utf8, 'target': pl.Utf8, 'weight': pl.Float64,
+    'delay_hours': pl.Int64, 'decay': pl.Float64,
+}
+# Bump when the persisted table layout changes so stale builds are ignored
+TABLE_FORMAT = "t1"
+
+
+def resolve_world_path() -> Path:
+    """Get path to world_nodes.json, resolving relative to backend directory"""
+    # Try relative to current working directory first (for CI)
+    rel_path = Path("data/world_nodes.json")
+    if rel_path.exists():
+        return rel_path
+    # Fallback: relative to this file's parent's parent (backend directory)
+    backend_dir = Path(__file__).parent.parent
+    return backend_dir / "data" / "world_nodes.json"
+
+
+class WorldRepository:
+    """Single shared, validated view of world_nodes.json.
+
+    Each call to ``refresh`` does a cheap ``stat``; the content hash is only
+    recomputed when the mtime changes, and finding the version never parses
+    the file. The node and edge tables are loaded on first use per version.
+    With ``table_dir`` (or the WORLD_GRAPH_DIR env var) they are written once
+    per version as Arrow IPC files that every worker memory-maps, so only the
+    first process parses the JSON.
+    """
+
+    def __init__(self, path: Optional[Path] = None, table_dir: Optional[str] = None):
+        self.path = Path(path) if path is not None else resolve_world_path()
+        table_dir = table_dir or os.getenv("WORLD_GRAPH_DIR")
+        self.table_dir = Path(table_dir) if table_dir else None
+        self.version: Optional[str] = None
+        self.mtime: Optional[float] = None
+        # (version, nodes, edges) once loaded
+        self._tables: Optional[Tuple[str, pl.DataFrame, pl.DataFrame]] = None
+        self._views: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+        self.refresh()
+
+    @property
+    def exists(self) -> bool:
+        """Whether a world file was found"""
+        return self.version is not None
+
+    def refresh(self) -> bool:
+        """Pick up a new version if the file changed on disk. Returns True on a new version."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+
+        if mtime == self.mtime:
+            return False
+
+        with self._lock:
+            if mtime == self.mtime:
+                return False
+            with open(self.path, 'rb') as f:
+                digest = hashlib.file_digest(f, 'sha256').hexdigest()[:16]
+            self.mtime = mtime
+            if digest == self.version:
+                return False
+            self.version = digest
+            return True
+
+    def _load(self) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        """Node and edge tables for the current version, parsed or attached on first use"""
+        tables = self._tables
+        if tables is not None and tables[0] == self.version:
+            return tables[1], tables[2]
+        with self._lock:
+            if self._tables is None or self._tables[0] != self.version:
+                if self.version is None:
+                    tables = (None, self._node_table([]), self._edge_table([]))
+                elif self.table_dir is not None:
+                    tables = self._attach_tables(self.version)
+                else:
+                    tables = self._read_file()
+                # The file may have changed since it was hashed; tables carry what was parsed
+                self.version = tables[0]
+                self._tables = tables
+                self._views = {}
+            return self._tables[1], self._tables[2]
+
+    def _read_file(self) -> Tuple[str, pl.DataFrame, pl.DataFrame]:
+        """Parse and validate the world file: (content hash, nodes, edges)"""
+        raw = self.path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()[:16]
+        nodes, edges = self._parse(json.loads(raw))
+        return digest, nodes, edges
+
+    def _attach_tables(self, version: str) -> Tuple[str, pl.DataFrame, pl.DataFrame]:
+        """Memory-map the persisted tables for ``version``, building them once if missing.
+
+        Same scheme as the compiled graph: one process parses under a file
+        lock into a fresh directory renamed into place, the others attach.
+        """
+        # storage imports payloads, which imports world; import late to avoid the cycle
+        from storage import FileLock
+
+        target = self.table_dir / f"{TABLE_FORMAT}-{version}"
+        if not target.exists():
+            with FileLock(self.table_dir / "tables.lock"):
+                if not target.exists():
+                    version, nodes, edges = self._read_file()
+                    target = self.table_dir / f"{TABLE_FORMAT}-{version}"
+                    if not target.exists():
+                        tmp = self.table_dir / f".tables-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                        try:
+                            tmp.mkdir(parents=True)
+                            nodes.write_ipc(tmp / "nodes.arrow", compression='uncompressed')
+                            edges.write_ipc(tmp / "edges.arrow", compression='uncompressed')
+                            os.replace(tmp, target)
+                        finally:
+                            if tmp.exists():
+                                shutil.rmtree(tmp, ignore_errors=True)
+        return (
+            version,
+            pl.read_ipc(target / "nodes.arrow", memory_map=True),
+            pl.read_ipc(target / "edges.arrow", memory_map=True),
+        )
+
+    def _parse(self, world_data: Dict[str, Any]) -> Tuple[pl.DataFrame, pl.DataFrame]:
+        """Validate raw world data and build typed columnar tables"""
+        raw_nodes: List[Dict[str, Any]] = world_data.get('nodes', [])
+        raw_edges: List[Dict[str, Any]] = world_data.get('edges', [])
+
+        seen = set()
+        for node in raw_nodes:
+            for field in ('id', 'name', 'type', 'lat', 'lon'):
+                if field not in node:
+                    raise ValueError(f"World node missing required field '{field}': {node}")
+            if node['type'] not in ('region', 'asset'):
+                raise ValueError(f"Unknown node type '{node['type']}' for {node['id']}")
+            if node['type'] == 'asset':
+                for field in ('asset_type', 'region_id'):
+                    if field not in node:
+                        raise ValueError(f"Asset node {node['id']} missing '{field}'")
+            if node['id'] in seen:
+                raise ValueError(f"Duplicate world node id: {node['id']}")
+            seen.add(node['id'])
+
+        for edge in raw_edges:
+            for field in EDGE_COLUMNS:
+                if field not in edge:
+                    raise ValueError(f"World edge missing required field '{field}': {edge}")
+
+        return self._node_table(raw_nodes), self._edge_table(raw_edges)
+
+    def _node_table(self, raw_nodes: List[Dict[str, Any]]) -> pl.DataFrame:
+        """Arrow-backed node table for lazy, pushed-down queries"""
+        table = pl.from_dicts(
+            [{col: node.get(col) for col in NODE_COLUMNS} for node in raw_nodes],
+            schema=NODE_SCHEMA,
+        )
+        return table.with_columns(
+            pl.col('planet').fill_null('earth'),
+            pl.col('asset_type').fill_null(''),
+            pl.col('region_id').fill_null(''),
+        )
+
+    def _edge_table(self, raw_edges: List[Dict[str, Any]]) -> pl.DataFrame:
+        """Arrow-backed edge table"""
+        return pl.from_dicts(
+            [{col: edge[col] for col in EDGE_COLUMNS} for edge in raw_edges],
+            schema=EDGE_SCHEMA,
+        )
+
+    def scan(self) -> pl.LazyFrame:
+        """Lazy scan over all nodes; filters and projections are pushed down.
+
+        With persisted tables this scans the memory-mapped IPC file itself.
+        """
+        self.refresh()
+        nodes, _ = self._load()
+        if self.table_dir is not None and self.version is not None:
+            return pl.scan_ipc(self.table_dir / f"{TABLE_FORMAT}-{self.version}" / "nodes.arrow", memory_map=True)
+        return nodes.lazy()
+
+    def _view(self, key: str, predicate: Optional[pl.Expr] = None) -> pd.DataFrame:
+        """Cache a filtered pandas view of the node table for the current version"""
+        self.refresh()
+        nodes, _ = self._load()
+        view = self._views.get(key)
+        if view is None:
+            from payloads.arrow import polars_to_frame
+            view = polars_to_frame(nodes if predicate is None else nodes.filter(predicate))
+            self._views[key] = view
+        return view
+
+    def nodes(self, planet: Optional[str] = None) -> pd.DataFrame:
+        """All nodes, optionally for a single planet. Treat as read-only."""
+        if planet is None:
+            return self._view("all")
+        return self._view(f"planet:{planet}", pl.col('planet') == planet)
+
+    def edges(self) -> pd.DataFrame:
+        """All edges. Treat as read-only."""
+        self.refresh()
+        _, edges = self._load()
+        view = self._views.get("edges")
+        if view is None:
+            from payloads.arrow import polars_to_frame
+            view = self._views["edges"] = polars_to_frame(edges)
+        return view
+
+    def assets(self, asset_type: str, planet: Optional[str] = None) -> pd.DataFrame:
+        """Asset nodes of one type, optionally for a single planet"""
+        predicate = (pl.col('type') == 'asset') & (pl.col('asset_type') == asset_type)
+        if planet is not None:
+            predicate &= pl.col('planet') == planet
+        return self._view(f"asset:{asset_type}:{planet}", predicate)
+
+    def ports(self, planet: Optional[str] = None) -> pd.DataFrame:
+        """Port asset nodes"""
+        return self.assets('port', planet)
+
+    def grids(self, planet: Optional[str] = None) -> pd.DataFrame:
+        """Grid asset nodes"""
+        return self.assets('grid', planet)
+
+    def regions(self, planet: Optional[str] = None) -> pd.DataFrame:
+        """Region nodes"""
+        predicate = pl.col('type') == 'region'
+        if planet is not None:
+            predicate &= pl.col('planet') == planet
+        return self._view(f"region:{planet}", predicate)
+
+
+_default_repository: Optional[WorldRepository] = None
+_default_lock = threading.Lock()
+
+
+def get_world_repository() -> WorldRepository:
+    """Process-wide shared repository used by agents and the engine"""
+    global _default_repository
+    if _default_repository is None:
+        with _default_lock:
+            if _default_repository is None:
+                _default_repository = WorldRepository()
+    return _default_repository
@@ -0,0 +1,158 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+PLANET_RADIUS_KM = {'earth': EARTH_RADIUS_KM, 'mars': 3389.5}
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray,
+                 radius_km: float = EARTH_RADIUS_KM) -> np.ndarray:
+    """Great-circle distance from one point to many"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * radius_km * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def normalize_lon(lons: np.ndarray) -> np.ndarray:
+    """Wrap longitudes into [-180, 180) (Mars data uses 0-360 east)"""
+    return (np.asarray(lons, dtype=np.float64) + 180.0) % 360.0 - 180.0
+
+
+class SpatialIndex:
+    """Fixed-grid (geohash-style) index over lat/lon points.
+
+    Points are sorted by cell key (row-major lat/lon cells), so every lat row
+    of a query window is one contiguous slice found with ``searchsorted``.
+    """
+
+    def __init__(self, ids: Sequence[str], lats: Sequence[float], lons: Sequence[float],
+                 cell_deg: float = 1.0, radius_km: float = EARTH_RADIUS_KM):
+        self.cell_deg = cell_deg
+        self.radius_km = radius_km
+        self.nrows = int(math.ceil(180 / cell_deg))
+        self.ncols = int(math.ceil(360 / cell_deg))
+
+        ids = np.asarray(ids, dtype=object)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = normalize_lon(lons)
+        keys = self._keys(lats, lons)
+        order = np.argsort(keys, kind='stable')
+
+        self.ids = ids[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.keys = keys[order]
+
+    @classmethod
+    def from_sorted(cls, ids: np.ndarray, lats: np.ndarray, lons: np.ndarray, keys: np.ndarray,
+                    cell_deg: float = 1.0, radius_km: float = EARTH_RADIUS_KM) -> "SpatialIndex":
+        """Wrap arrays already sorted by cell key (e.g. memory-mapped) without copying"""
+        index = cls.__new__(cls)
+        index.cell_deg = cell_deg
+        index.radius_km = radius_km
+        index.nrows = int(math.ceil(180 / cell_deg))
+        index.ncols = int(math.ceil(360 / cell_deg))
+        index.ids, index.lats, index.lons, index.keys = ids, lats, lons, keys
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _rows(self, lats: np.ndarray) -> np.ndarray:
+        return np.clip(((lats + 90) // self.cell_deg).astype(np.int64), 0, self.nrows - 1)
+
+    def _cols(self, lons: np.ndarray) -> np.ndarray:
+        return np.clip(((lons + 180) // self.cell_deg).astype(np.int64), 0, self.ncols - 1)
+
+    def _keys(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        return self._rows(lats) * self.ncols + self._cols(lons)
+
+    def _candidates(self, min_lat: float, max_lat: float,
+                    lon_ranges: List[Tuple[float, float]]) -> np.ndarray:
+        """Positions of points in the cells covering a lat band and lon ranges"""
+        r0, r1 = self._rows(np.array([min_lat, max_lat]))
+        col_ranges = [tuple(self._cols(np.array([lo, hi]))) for lo, hi in lon_ranges]
+
+        # Wide windows are cheaper as a single vectorized scan
+        cells = (r1 - r0 + 1) * sum(c1 - c0 + 1 for c0, c1 in col_ranges)
+        if cells >= len(self.ids):
+            return np.arange(len(self.ids))
+
+        rows = np.arange(r0, r1 + 1)
+        starts, ends = [], []
+        for c0, c1 in col_ranges:
+            starts.append(np.searchsorted(self.keys, rows * self.ncols + c0, side='left'))
+            ends.append(np.searchsorted(self.keys, rows * self.ncols + c1, side='right'))
+        starts = np.concatenate(starts)
+        ends = np.concatenate(ends)
+        keep = ends > starts
+        if not keep.any():
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts[keep], ends[keep])])
+
+    @staticmethod
+    def _split_lon(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+        """Lon ranges for a span, split when it crosses the antimeridian"""
+        if min_lon <= max_lon:
+            return [(min_lon, max_lon)]
+        return [(min_lon, 180.0), (-180.0, max_lon)]
+
+    def bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[str]:
+        """Ids of points inside a viewport (min_lon > max_lon wraps the antimeridian)"""
+        lon_ranges = self._split_lon(min_lon, max_lon)
+        pos = self._candidates(min_lat, max_lat, lon_ranges)
+        lats, lons = self.lats[pos], self.lons[pos]
+        inside = (lats >= min_lat) & (lats <= max_lat)
+        lon_mask = np.zeros(len(pos), dtype=bool)
+        for lo, hi in lon_ranges:
+            lon_mask |= (lons >= lo) & (lons <= hi)
+        return self.ids[pos[inside & lon_mask]].tolist()
+
+    def _within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and distances of points within a radius, nearest first"""
+        dlat = math.degrees(radius_km / self.radius_km)
+        min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        widest = max(abs(min_lat), abs(max_lat))
+        if widest >= 89.9 or dlat >= 90:
+            lon_ranges = [(-180.0, 180.0)]
+        else:
+            dlon = dlat / math.cos(math.radians(widest))
+            if dlon >= 180:
+                lon_ranges = [(-180.0, 180.0)]
+            else:
+                lo = (lon - dlon + 180) % 360 - 180
+                hi = (lon + dlon + 180) % 360 - 180
+                lon_ranges = self._split_lon(lo, hi)
+
+        pos = self._candidates(min_lat, max_lat, lon_ranges)
+        dist = haversine_km(lat, lon, self.lats[pos], self.lons[pos], self.radius_km)
+        keep = dist <= radius_km
+        pos, dist = pos[keep], dist[keep]
+        order = np.argsort(dist, kind='stable')
+        return pos[order], dist[order]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[str]:
+        """Ids within a great-circle radius, nearest first"""
+        pos, _ = self._within(lat, lon, radius_km)
+        return self.ids[pos].tolist()
+
+    def nearest(self, lat: float, lon: float, k: int,
+                max_radius_km: Optional[float] = None) -> List[str]:
+        """k nearest ids, optionally capped to a radius, nearest first"""
+        if k <= 0 or not len(self.ids):
+            return []
+        half_circumference = math.pi * self.radius_km
+        limit = min(max_radius_km or half_circumference, half_circumference)
+
+        # Start from a radius expected to hold k points, then double until it does
+        area_per_point = 4 * math.pi * self.radius_km ** 2 / len(self.ids)
+        radius = min(limit, max(1.0, math.sqrt(k * area_per_point / math.pi)))
+        while True:
+            pos, _ = self._within(lat, lon, radius)
+            if len(pos) >= k or radius >= limit:
+                return self.ids[pos[:k]].tolist()
+            radius = min(limit, radius * 2)
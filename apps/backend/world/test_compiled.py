@@ -0,0 +1,68 @@
+import numpy as np
+from world import CompiledGraph, attach_or_build
+
+
+def _engine(graph_dir=None):
+    from sim.ripple_engine import RippleEngine
+    return RippleEngine(graph_dir=graph_dir)
+
+
+def test_save_and_open_round_trip(tmp_path):
+    compiled = _engine().compiled
+    compiled.save(tmp_path / "g")
+    attached = CompiledGraph.open(tmp_path / "g")
+
+    assert attached.id_list() == compiled.id_list()
+    assert attached.version == compiled.version
+    for name, values in compiled.arrays.items():
+        assert np.array_equal(attached.arrays[name], values), name
+    # Attached arrays are read-only views of the files, not private copies
+    assert all(isinstance(values, np.memmap) for values in attached.arrays.values())
+    assert not attached.edge_weight.flags.writeable
+    assert attached.position("suez_canal") == compiled.position("suez_canal")
+    assert attached.position("missing") is None
+
+
+def test_attach_or_build_builds_once(tmp_path):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return _engine().compiled
+
+    first = attach_or_build(tmp_path, "k", build)
+    second = attach_or_build(tmp_path, "k", build)
+    assert len(builds) == 1
+    assert first.id_list() == second.id_list()
+    assert not any(p.name.startswith(".build-") for p in tmp_path.iterdir())
+
+
+def test_attached_engine_matches_in_process(tmp_path):
+    from schemas import Shock
+    local = _engine()
+    leader = _engine(graph_dir=str(tmp_path))
+    worker = _engine(graph_dir=str(tmp_path))
+    assert isinstance(worker.compiled.edge_src, np.memmap)
+
+    shock = Shock(target_ids=["suez_canal", "na"], magnitude=0.7, duration_hours=48)
+    expected = local._run(shock)
+    assert leader._run(shock) == expected
+    assert worker._run(shock) == expected
+    assert worker.select_nodes(near=(30.0, 32.0), k=3) == local.select_nodes(near=(30.0, 32.0), k=3)
+
+    # Mutations copy the arrays they touch; the shared files stay unchanged
+    worker.update_edge("na", "eu", weight=0.05)
+    assert worker.graph["na"]["eu"]["weight"] == 0.05
+    assert _engine(graph_dir=str(tmp_path))._run(shock) == expected
+
+
+def test_attaching_worker_never_parses_the_world_file(tmp_path, monkeypatch):
+    import pytest
+    from sim.ripple_engine import RippleEngine
+    from world import WorldRepository
+    leader = RippleEngine(world=WorldRepository(table_dir=str(tmp_path)), graph_dir=str(tmp_path))
+
+    monkeypatch.setattr(WorldRepository, '_read_file', lambda self: pytest.fail("worker parsed the world file"))
+    worker = RippleEngine(world=WorldRepository(table_dir=str(tmp_path)), graph_dir=str(tmp_path))
+    assert isinstance(worker.compiled.ids, np.memmap)
+    assert worker.compiled.id_list() == leader.compiled.id_list()
@@ -0,0 +1,73 @@
+import pytest
+import json
+import os
+import polars as pl
+from world import WorldRepository, get_world_repository
+
+
+def _write_world(path, nodes, edges=None):
+    path.write_text(json.dumps({'nodes': nodes, 'edges': edges or []}))
+
+
+def test_repository_views():
+    repo = get_world_repository()
+    assert repo.exists
+    assert 'suez_canal' in set(repo.ports()['id'])
+    assert (repo.grids()['asset_type'] == 'grid').all()
+    assert (repo.nodes(planet='mars')['planet'] == 'mars').all()
+    assert repo.nodes()['lat'].dtype == 'float64'
+    # Views are cached per version
+    assert repo.ports() is repo.ports()
+
+
+def test_repository_reloads_on_change(tmp_path):
+    path = tmp_path / "world_nodes.json"
+    node = {'id': 'a', 'name': 'A', 'type': 'region', 'lat': 1.0, 'lon': 2.0}
+    _write_world(path, [node])
+    repo = WorldRepository(path)
+    first_version = repo.version
+    assert len(repo.nodes()) == 1
+
+    # Touching the file without changing content keeps the version
+    os.utime(path, (1, 1))
+    assert repo.refresh() is False
+    assert repo.version == first_version
+
+    _write_world(path, [node, dict(node, id='b')])
+    os.utime(path, (2, 2))
+    assert repo.refresh() is True
+    assert repo.version != first_version
+    assert len(repo.nodes()) == 2
+
+
+def test_repository_rejects_invalid_nodes(tmp_path):
+    path = tmp_path / "world_nodes.json"
+    _write_world(path, [{'id': 'a', 'name': 'A', 'type': 'asset', 'lat': 0, 'lon': 0}])
+    # Validated when the tables are first loaded
+    with pytest.raises(ValueError, match='asset_type'):
+        WorldRepository(path).nodes()
+
+
+def test_version_is_found_without_parsing(tmp_path, monkeypatch):
+    path = tmp_path / "world_nodes.json"
+    _write_world(path, [{'id': 'a', 'name': 'A', 'type': 'region', 'lat': 1.0, 'lon': 2.0}])
+    monkeypatch.setattr(json, 'loads', lambda raw: pytest.fail("parsed to find the version"))
+    repo = WorldRepository(path)
+    assert repo.exists and repo.version
+
+
+def test_tables_are_parsed_once_and_memory_mapped(tmp_path, monkeypatch):
+    path = tmp_path / "world_nodes.json"
+    nodes = [{'id': 'r', 'name': 'R', 'type': 'region', 'lat': 1, 'lon': 2},
+             {'id': 'p', 'name': 'P', 'type': 'asset', 'asset_type': 'port', 'region_id': 'r', 'lat': 1, 'lon': 2}]
+    _write_world(path, nodes, [{'source': 'p', 'target': 'r', 'weight': 0.5, 'delay_hours': 1, 'decay': 0.1}])
+    leader = WorldRepository(path, table_dir=str(tmp_path / "tables"))
+    assert list(leader.ports()['id']) == ['p']
+
+    # A second worker attaches to the persisted tables without parsing the JSON
+    monkeypatch.setattr(json, 'loads', lambda raw: pytest.fail("worker parsed the world file"))
+    worker = WorldRepository(path, table_dir=str(tmp_path / "tables"))
+    assert worker.nodes()['id'].tolist() == ['r', 'p']
+    assert worker.nodes()['capacity'].isna().all()
+    assert worker.edges()['delay_hours'].tolist() == [1]
+    assert worker.scan().filter(pl.col('type') == 'asset').collect()['id'].to_list() == ['p']
@@ -0,0 +1,34 @@
+import pytest
+import numpy as np
+from world.spatial import SpatialIndex, haversine_km
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(0)
+    n = 20000
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    lons = rng.uniform(-180, 180, n)
+    ids = [str(i) for i in range(n)]
+    return ids, lats, lons, SpatialIndex(ids, lats, lons)
+
+
+@pytest.mark.parametrize("lat,lon", [(10, 20), (89.5, 0), (-45, 179.9)])
+def test_nearest_and_radius_match_brute_force(points, lat, lon):
+    ids, lats, lons, index = points
+    dist = haversine_km(lat, lon, lats, lons)
+    assert index.nearest(lat, lon, 10) == [ids[i] for i in np.argsort(dist)[:10]]
+    assert set(index.within(lat, lon, 750)) == {ids[i] for i in np.where(dist <= 750)[0]}
+
+
+def test_bbox_wraps_antimeridian(points):
+    ids, lats, lons, index = points
+    expected = {
+        ids[i] for i in np.where((lats >= -10) & (lats <= 10) & ((lons >= 170) | (lons <= -170)))[0]
+    }
+    assert set(index.bbox(170, -10, -170, 10)) == expected
+
+
+def test_nearest_respects_radius_cap(points):
+    _, _, _, index = points
+    assert len(index.nearest(0, 0, 1000, max_radius_km=100)) < 1000
@@ -0,0 +1,114 @@
+// Decoder for the backend's binary globe payloads
+// (Accept: application/vnd.neuralterra.globe)
+
+export const GLOBE_MEDIA_TYPE = 'application/vnd.neuralterra.globe'
+
+export interface GlobeField {
+  name: string
+  dtype: string
+  shape: number[]
+  byte_offset: number
+  byte_length: number
+  scale?: number
+  offset?: number
+  delta?: 'mod256'
+}
+
+export interface GlobeHeader {
+  kind: string
+  ids?: string[]
+  fields: GlobeField[]
+  [key: string]: unknown
+}
+
+type TypedArray =
+  | Int32Array | Uint32Array | Uint8Array | Uint16Array | Float32Array | Float64Array
+
+const ARRAY_TYPES: Record<string, new (buffer: ArrayBuffer, offset: number, length: number) => TypedArray> = {
+  int32: Int32Array,
+  uint32: Uint32Array,
+  uint8: Uint8Array,
+  uint16: Uint16Array,
+  float16: Uint16Array, // raw half floats; use halfToFloat to widen
+  float32: Float32Array,
+  float64: Float64Array,
+}
+
+// Widen an IEEE half float stored as uint16
+export const halfToFloat = (h: number): number => {
+  const sign = h & 0x8000 ? -1 : 1
+  const exp = (h >> 10) & 0x1f
+  const frac = h & 0x3ff
+  if (exp === 0) return sign * 2 ** -14 * (frac / 1024)
+  if (exp === 31) return frac ? NaN : sign * Infinity
+  return sign * 2 ** (exp - 15) * (1 + frac / 1024)
+}
+
+// Parse header and return zero-copy typed-array views over the body
+export const decodeGlobe = (buffer: ArrayBuffer): { header: GlobeHeader; arrays: Record<string, TypedArray> } => {
+  const view = new DataView(buffer)
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+  if (magic !== 'NTG1') throw new Error('Not a globe payload')
+
+  const headerLen = view.getUint32(4, true)
+  const header: GlobeHeader = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLen)))
+  const bodyStart = Math.ceil((8 + headerLen) / 8) * 8
+
+  const arrays: Record<string, TypedArray> = {}
+  for (const field of header.fields) {
+    const ArrayType = ARRAY_TYPES[field.dtype]
+    const length = field.shape.reduce((a, b) => a * b, 1)
+    arrays[field.name] = new ArrayType(buffer, bodyStart + field.byte_offset, length)
+  }
+  return { header, arrays }
+}
+
+// Dequantize a scaled field into floats
+export const dequantize = (field: GlobeField, raw: TypedArray): Float32Array => {
+  const scale = field.scale ?? 1
+  const offset = field.offset ?? 0
+  const out = new Float32Array(raw.length)
+  for (let i = 0; i < raw.length; i++) out[i] = raw[i] * scale + offset
+  return out
+}
+
+// Undo mod-256 delta coding of (timesteps x nodes) uint8 frames
+export const undeltaFrames = (frames: Uint8Array, nodes: number): Uint8Array => {
+  const out = new Uint8Array(frames)
+  for (let i = nodes; i < out.length; i++) out[i] = (out[i] + out[i - nodes]) & 0xff
+  return out
+}
+
+export interface GlobeGraph {
+  nodes: { id: string; name: string; type: string; asset_type: string; lat: number; lon: number; capacity: number }[]
+  edges: { source: string; target: string; weight: number }[]
+}
+
+// Rebuild /graph JSON shape from a binary 'graph' payload
+export const decodeGraph = (buffer: ArrayBuffer): GlobeGraph => {
+  const { header, arrays } = decodeGlobe(buffer)
+  const field = (name: string) => header.fields.find((f) => f.name === name)!
+  const ids = header.ids ?? []
+  const names = (header.names as string[] | undefined) ?? ids
+  const types = header.types as string[]
+  const assetTypes = header.asset_types as string[]
+  const lat = dequantize(field('lat'), arrays.lat)
+  const lon = dequantize(field('lon'), arrays.lon)
+  const weight = dequantize(field('edge_weight'), arrays.edge_weight)
+
+  const nodes = ids.map((id, i) => ({
+    id,
+    name: names[i],
+    type: types[i],
+    asset_type: assetTypes[i],
+    lat: lat[i],
+    lon: lon[i],
+    capacity: arrays.capacity[i],
+  }))
+  const edges = Array.from(arrays.edge_source, (source, i) => ({
+    source: ids[source],
+    target: ids[arrays.edge_target[i]],
+    weight: weight[i],
+  }))
+  return { nodes, edges }
+}
@@ -1,5 +1,6 @@
 import { create } from 'zustand'
 import { devtools } from 'zustand/middleware'
+import { GLOBE_MEDIA_TYPE, decodeGraph } from './globeCodec'
 
 export interface LayerState {
   weather: boolean
@@ -70,9 +71,12 @@ export const useGlobeStore = create<GlobeStore>()(
         try {
           const planet = get().currentPlanet
           const endpoint = planet === 'earth' ? '/api/graph' : '/api/mars/graph'
-          const response = await fetch(endpoint)
+          const response = await fetch(endpoint, {
+            headers: { Accept: `${GLOBE_MEDIA_TYPE}, application/json;q=0.5` },
+          })
           if (!response.ok) throw new Error('Failed to fetch graph')
-          const data = await response.json()
+          const isGlobe = response.headers.get('content-type')?.includes(GLOBE_MEDIA_TYPE)
+          const data = isGlobe ? decodeGraph(await response.arrayBuffer()) : await response.json()
           set({ graphData: data })
         } catch (error) {
           console.error('Graph fetch failed:', error)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Simulation response serialization benchmark for Neural Terra.
+Compares the validated pydantic response path with the NumPy/orjson fast path
+on a synthetic world graph.
+"""
+
+import argparse
+import asyncio
+import json
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+# Project root (parent of scripts directory)
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "apps" / "backend"))
+
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from payloads import simulation_payload
+from schemas import Shock, SimulationResult
+from sim import RippleEngine
+from world import WorldRepository
+
+
+def synthetic_world(path: pathlib.Path, nodes: int, seed: int = 1337):
+    """Base world plus ``nodes`` ports, each wired to a random earlier node"""
+    rng = random.Random(seed)
+    world = json.loads((ROOT / "apps" / "backend" / "data" / "world_nodes.json").read_text())
+    ids = [node['id'] for node in world['nodes']]
+    for i in range(nodes):
+        node_id = f"bench_port_{i}"
+        world['nodes'].append({
+            'id': node_id, 'name': f"Bench Port {i}", 'type': 'asset', 'asset_type': 'port',
+            'lat': rng.uniform(-60, 60), 'lon': rng.uniform(-180, 180),
+            'region_id': 'eu', 'capacity': 0.5, 'planet': 'earth',
+        })
+        world['edges'].append({
+            'source': rng.choice(ids), 'target': node_id,
+            'weight': rng.uniform(0.2, 0.8), 'delay_hours': rng.randint(0, 6), 'decay': 0.01,
+        })
+        ids.append(node_id)
+    path.write_text(json.dumps(world))
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    """Main function to run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=2000, help="Synthetic nodes added to the base world")
+    parser.add_argument("--hours", type=int, default=168, help="Shock duration in hours")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        world_path = pathlib.Path(tmp) / "world_nodes.json"
+        synthetic_world(world_path, args.nodes)
+        engine = RippleEngine(world=WorldRepository(world_path))
+        engine.scenarios_dir = pathlib.Path(tmp) / "scenarios"
+
+        shock = Shock(target_ids=["suez_canal", "rotterdam"], magnitude=0.7, duration_hours=args.hours)
+        frames = engine._frames(shock)
+        field = create_model_field("Response", SimulationResult, mode="serialization")
+
+        def validated():
+            # What a `-> SimulationResult` handler did: build lists, validate, re-validate, encode
+            result = SimulationResult(
+                scenario_id="bench", shock=shock, kpis=engine._kpis(frames), duration_hours=args.hours,
+                impact_series=dict(zip(engine.compiled.id_list(), frames.T.tolist())),
+            )
+            content = asyncio.run(serialize_response(field=field, response_content=result))
+            return ORJSONResponse(content).body
+
+        def fast():
+            result = SimulationResult.model_construct(
+                scenario_id="bench", shock=shock, kpis=engine._kpis(frames), duration_hours=args.hours,
+                impact_series=engine._series(frames), timesteps=None,
+            )
+            return ORJSONResponse(simulation_payload(result)).body
+
+        if json.loads(validated()) != json.loads(fast()):
+            print("❌ Fast path output differs from the validated path")
+            return 1
+
+        slow_s, fast_s = best_of(validated, args.repeat), best_of(fast, args.repeat)
+        nodes, points = len(engine.compiled), len(engine.compiled) * (args.hours + 1)
+        print(f"📦 {nodes} nodes x {args.hours + 1} steps = {points:,} points, {len(fast()) / 1e6:.1f} MB JSON")
+        print(f"   validated: {slow_s * 1000:8.1f} ms")
+        print(f"   fast path: {fast_s * 1000:8.1f} ms  ({slow_s / fast_s:.1f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
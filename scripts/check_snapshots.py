@@ -1,43 +1,55 @@
 #!/usr/bin/env python3
 """
 Snapshot integrity checker for Neural Terra.
-Computes SHA256 hashes for all files in data/snapshots/ and validates against manifest.
+Validates SHA256 hashes of all files in data/snapshots/ against the manifest.
+
+File sizes, mtimes and hashes are kept in a local registry
+(data/.snapshots.registry.json), so only new or changed files are re-hashed,
+in parallel and through memory maps.
 """
 
-import hashlib
+import argparse
 import json
 import pathlib
 import sys
-from typing import Dict
+import time
+
+# Project root (parent of scripts directory)
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "apps" / "backend"))
+
+from storage.snapshots import SnapshotRegistry
 
-def sha256(p: pathlib.Path) -> str:
-    """Compute SHA256 hash of a file."""
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1<<20), b""):
-            h.update(chunk)
-    return h.hexdigest()
 
 def main():
     """Main function to check snapshot integrity."""
-    # Get project root (parent of scripts directory)
-    root = pathlib.Path(__file__).resolve().parents[1]
-    snapshots_dir = root / "data" / "snapshots"
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Parallel hash workers (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="Re-hash every file, ignoring the registry")
+    args = parser.parse_args()
+
+    snapshots_dir = ROOT / "data" / "snapshots"
     manifest_path = snapshots_dir.parent / "snapshots.manifest.json"
     
     if not snapshots_dir.exists():
         print(f"Error: Snapshots directory {snapshots_dir} does not exist")
         sys.exit(1)
     
-    # Get all files in snapshots directory
-    files = sorted([p for p in snapshots_dir.glob("*") if p.is_file()])
-    
-    if not files:
+    registry = SnapshotRegistry(snapshots_dir)
+    if args.full:
+        registry.entries = {}
+
+    # Compute current hashes (only for files changed since the last run)
+    started = time.perf_counter()
+    entries, rehashed = registry.scan(workers=args.jobs)
+    elapsed = time.perf_counter() - started
+
+    if not entries:
         print("Error: No snapshot files found")
         sys.exit(1)
     
-    # Compute current hashes
-    current_manifest = {p.name: sha256(p) for p in files}
+    current_manifest = registry.manifest()
+    registry.save()
     
     # Check against existing manifest if it exists
     if manifest_path.exists():
@@ -64,13 +76,11 @@ def main():
     
     # Print summary
     print(f"\n📊 Snapshot Summary:")
-    print(f"   Files: {len(files)}")
-    print(f"   Total size: {sum(f.stat().st_size for f in files):,} bytes")
+    print(f"   Files: {len(entries)} ({rehashed} re-hashed in {elapsed:.2f}s)")
+    print(f"   Total size: {sum(e['size'] for e in entries.values()):,} bytes")
     
-    for file_path in files:
-        size = file_path.stat().st_size
-        hash_val = current_manifest[file_path.name]
-        print(f"   {file_path.name}: {size:,} bytes, {hash_val[:8]}...")
+    for name, entry in entries.items():
+        print(f"   {name}: {entry['size']:,} bytes, {entry['sha256'][:8]}...")
 
 if __name__ == "__main__":
     main()
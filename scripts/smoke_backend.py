@@ -1,89 +1,119 @@
 #!/usr/bin/env python3
 """
-Backend smoke test for Neural Terra.
-Tests that the backend is running and can process a Suez Canal scenario.
+Backend smoke and load test for Neural Terra.
+Tests that the backend can process a Suez Canal scenario and a natural language
+query; with --load, drives a concurrent request mix and reports throughput and
+latency percentiles, optionally against a baseline recorded on the same machine.
 """
 
-import requests
+import argparse
+import asyncio
+import json
+import math
+import os
+import pathlib
+import platform
+import random
 import sys
+import tempfile
 import time
-import json
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Project root (parent of scripts directory)
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT / "apps" / "backend"
+BASE_URL = "http://127.0.0.1:8000"
+
+SUEZ_SHOCK = {
+    "target_ids": ["suez_canal"],
+    "magnitude": 0.4,
+    "duration_hours": 168,  # 7 days
+}
+NL_TEXT = "Simulate 30% slowdown in Panama Canal for 7 days"
+
+# Requests per endpoint group: (method, path, JSON body)
+ENDPOINTS: Dict[str, List[Tuple[str, str, Optional[Dict[str, Any]]]]] = {
+    "simulate": [("POST", "/simulate", SUEZ_SHOCK)],
+    "nl": [("POST", "/nl/run", {"text": NL_TEXT})],
+    "layers": [("GET", "/layers/ports", None), ("GET", "/layers/grid", None), ("GET", "/layers/weather", None)],
+    "graph": [("GET", "/graph", None)],
+}
+DEFAULT_MIX = "simulate=4,nl=2,layers=3,graph=1"
+PERCENTILES = (50, 95, 99)
+# Endpoint groups with fewer measured requests are reported but not compared with the baseline
+MIN_COMPARED = 100
 
-def wait_for_backend(max_attempts: int = 30, timeout: float = 1.0) -> bool:
+
+async def wait_for_backend(client: httpx.AsyncClient, max_attempts: int = 30, timeout: float = 1.0) -> bool:
     """Wait for backend to be ready."""
     print("🔄 Waiting for backend to start...")
-    
+
     for attempt in range(max_attempts):
         try:
-            response = requests.get("http://127.0.0.1:8000/healthz", timeout=timeout)
-            if response.ok:
+            response = await client.get("/healthz", timeout=timeout)
+            if response.is_success:
                 print("✅ Backend is ready")
                 return True
         except Exception as e:
             if attempt < max_attempts - 1:
                 print(f"   Attempt {attempt + 1}/{max_attempts}: {e}")
-                time.sleep(0.2)
+                await asyncio.sleep(0.2)
             else:
                 print(f"❌ Backend failed to start: {e}")
                 return False
-    
+
     return False
 
-def test_suez_scenario() -> bool:
+
+async def test_suez_scenario(client: httpx.AsyncClient) -> bool:
     """Test Suez Canal scenario simulation."""
     print("🧪 Testing Suez Canal scenario...")
-    
-    payload = {
-        "target_ids": ["suez_canal"],
-        "magnitude": 0.4,
-        "duration_hours": 168,  # 7 days
-        "start_ts": datetime.now().isoformat()
-    }
-    
+
+    payload = {**SUEZ_SHOCK, "start_ts": datetime.now().isoformat()}
+
     try:
-        response = requests.post(
-            "http://127.0.0.1:8000/simulate", 
-            json=payload, 
-            timeout=30
-        )
+        response = await client.post("/simulate", json=payload, timeout=30)
         response.raise_for_status()
-        
+
         data = response.json()
-        
+
         # Validate response structure
         required_fields = ["scenario_id", "shock", "impact_series", "kpis", "duration_hours"]
         for field in required_fields:
             if field not in data:
                 print(f"❌ Missing required field: {field}")
                 return False
-        
+
         # Check that impact series is not empty
         impact_series = data.get("impact_series", {})
         if not impact_series:
             print("❌ Impact series is empty")
             return False
-        
+
         # Check that at least one node has non-empty time series
         has_data = any(len(series) > 0 for series in impact_series.values())
         if not has_data:
             print("❌ All impact series are empty")
             return False
-        
+
         # Check KPIs
         kpis = data.get("kpis", {})
         if not kpis:
             print("⚠️  No KPIs generated")
-        
+
         print("✅ Suez scenario simulation successful")
         print(f"   Scenario ID: {data['scenario_id']}")
         print(f"   Duration: {data['duration_hours']} hours")
         print(f"   Nodes with data: {len([s for s in impact_series.values() if len(s) > 0])}")
         print(f"   KPIs: {len(kpis)} metrics")
-        
+
         return True
-        
-    except requests.exceptions.RequestException as e:
+
+    except httpx.HTTPError as e:
         print(f"❌ Request failed: {e}")
         return False
     except json.JSONDecodeError as e:
@@ -93,60 +123,301 @@ def test_suez_scenario() -> bool:
         print(f"❌ Unexpected error: {e}")
         return False
 
-def test_nl_query() -> bool:
+
+async def test_nl_query(client: httpx.AsyncClient) -> bool:
     """Test natural language query processing."""
     print("🧪 Testing natural language query...")
-    
-    payload = {
-        "text": "Simulate 30% slowdown in Panama Canal for 7 days"
-    }
-    
+
     try:
-        response = requests.post(
-            "http://127.0.0.1:8000/nl/run", 
-            json=payload, 
-            timeout=30
-        )
+        response = await client.post("/nl/run", json={"text": NL_TEXT}, timeout=30)
         response.raise_for_status()
-        
+
         data = response.json()
-        
+
         # Check response structure
         if "interpretation" not in data:
             print("❌ Missing interpretation in NL response")
             return False
-        
+
         interpretation = data["interpretation"]
         if interpretation.get("confidence", 0) < 0.5:
             print("⚠️  Low confidence NL interpretation")
-        
+
         print("✅ Natural language query successful")
         print(f"   Confidence: {interpretation.get('confidence', 0):.2f}")
-        
+
         return True
-        
+
     except Exception as e:
         print(f"❌ NL query failed: {e}")
         return False
 
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``simulate=4,nl=2`` -> relative weights per endpoint group"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint group '{name}' (expected one of {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def plan_requests(mix: Dict[str, float], count: int, seed: int) -> List[Tuple[str, Tuple[str, str, Optional[Dict[str, Any]]]]]:
+    """Seeded sequence of (group, request) drawn from the mix"""
+    rng = random.Random(seed)
+    groups = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    return [(group, rng.choice(ENDPOINTS[group])) for group in groups]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+class LoadStats:
+    """Latencies and failures per endpoint group"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, group: str, seconds: float, ok: bool):
+        self.latencies.setdefault(group, []).append(seconds)
+        if not ok:
+            self.errors[group] = self.errors.get(group, 0) + 1
+
+    def summary(self, elapsed_s: float) -> Dict[str, Dict[str, float]]:
+        groups = dict(self.latencies)
+        groups["total"] = [seconds for values in self.latencies.values() for seconds in values]
+        report = {}
+        for group, values in groups.items():
+            values = sorted(values)
+            errors = sum(self.errors.values()) if group == "total" else self.errors.get(group, 0)
+            report[group] = {
+                "requests": len(values),
+                "errors": errors,
+                "rps": len(values) / elapsed_s if elapsed_s else 0.0,
+                **{f"p{q}_ms": percentile(values, q) * 1000 for q in PERCENTILES},
+            }
+        return report
+
+
+async def send(client: httpx.AsyncClient, request: Tuple[str, str, Optional[Dict[str, Any]]]) -> bool:
+    method, path, body = request
+    try:
+        response = await client.request(method, path, json=body)
+        return response.is_success
+    except httpx.HTTPError:
+        return False
+
+
+async def closed_loop(client: httpx.AsyncClient, plan, concurrency: int, stats: Optional[LoadStats]):
+    """``concurrency`` workers, each sending its next request when the last one completes"""
+    queue = iter(plan)
+
+    async def worker():
+        for group, request in queue:
+            started = time.perf_counter()
+            ok = await send(client, request)
+            if stats is not None:
+                stats.record(group, time.perf_counter() - started, ok)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, plan, rate: float, concurrency: int, stats: LoadStats, seed: int):
+    """Poisson arrivals at ``rate`` per second, independent of completions.
+
+    Latency counts from the scheduled arrival, so time queued behind the
+    ``concurrency`` in-flight cap is included rather than hidden.
+    """
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(group, request, arrival):
+        async with limit:
+            ok = await send(client, request)
+        stats.record(group, time.perf_counter() - arrival, ok)
+
+    tasks = []
+    arrival = time.perf_counter()
+    for group, request in plan:
+        arrival += rng.expovariate(rate)
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(group, request, arrival)))
+    await asyncio.gather(*tasks)
+
+
+def print_report(report: Dict[str, Dict[str, float]], elapsed_s: float):
+    print(f"\n📊 {report['total']['requests']} requests in {elapsed_s:.2f}s")
+    print(f"   {'endpoint':<10} {'requests':>8} {'errors':>6} {'req/s':>8} " +
+          " ".join(f"{f'p{q} ms':>9}" for q in PERCENTILES))
+    for group, row in report.items():
+        print(f"   {group:<10} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.1f} " +
+              " ".join(f"{row[f'p{q}_ms']:>9.1f}" for q in PERCENTILES))
+
+
+def environment() -> Dict[str, Any]:
+    """The machine a run was measured on; baselines only compare within one"""
+    return {"host": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version()}
+
+
+def compare_baseline(report: Dict[str, Dict[str, float]], config: Dict[str, Any],
+                     baseline: Dict[str, Any], tolerance: float) -> Optional[List[str]]:
+    """Regressions beyond ``tolerance`` (a fraction) in p95 latency or throughput.
+
+    Returns None when the baseline was recorded on another machine or with
+    other settings, since absolute timings do not carry over.
+    """
+    if baseline.get("environment") != environment():
+        print(f"⚠️  Baseline was recorded on another machine ({baseline.get('environment')}); skipping comparison")
+        return None
+    if baseline.get("config") != config:
+        print(f"⚠️  Baseline was recorded with other settings ({baseline.get('config')}); skipping comparison")
+        return None
+    regressions = []
+    for group, row in report.items():
+        base = baseline.get("results", {}).get(group)
+        # A p95 over a handful of requests is mostly noise
+        if base is None or min(row["requests"], base["requests"]) < MIN_COMPARED:
+            continue
+        if row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{group}: p95 {row['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if row["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{group}: {row['rps']:.1f} req/s vs baseline {base['rps']:.1f} req/s")
+    return regressions
+
+
+@asynccontextmanager
+async def backend_client(in_process: bool, base_url: str, timeout: float):
+    """HTTP client for a running backend, or for the app served in-process (no network)"""
+    if not in_process:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+            yield client
+        return
+
+    # Offline and deterministic: snapshots only, no background refresh, scenarios in a scratch directory
+    os.environ.setdefault("SNAPSHOTS_DIR", str(BACKEND_DIR / "data" / "snapshots"))
+    os.environ.setdefault("WARMUP", "blocking")
+    os.environ.setdefault("BACKGROUND_REFRESH", "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            import main
+            async with main.app.router.lifespan_context(main.app):
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=timeout) as client:
+                    yield client
+        finally:
+            os.chdir(cwd)
+
+
+async def run_smoke(args) -> bool:
+    async with backend_client(args.in_process, args.base_url, args.timeout) as client:
+        # Wait for backend
+        if not await wait_for_backend(client):
+            return False
+
+        # Test Suez scenario
+        if not await test_suez_scenario(client):
+            return False
+
+        # Test NL query
+        if not await test_nl_query(client):
+            return False
+
+    print("\n🎉 All smoke tests passed!")
+    print("✅ Backend is ready for production")
+    return True
+
+
+async def run_load(args) -> bool:
+    mix = parse_mix(args.mix)
+    config = {
+        "in_process": args.in_process, "requests": args.requests, "concurrency": args.concurrency,
+        "rate": args.rate, "mix": mix, "seed": args.seed,
+    }
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else "closed loop"
+    print(f"   {args.requests} requests, {mode}, concurrency {args.concurrency}, mix {args.mix}")
+
+    async with backend_client(args.in_process, args.base_url, args.timeout) as client:
+        if not await wait_for_backend(client):
+            return False
+
+        if args.warmup:
+            print(f"🔥 Warming up with {args.warmup} requests...")
+            await closed_loop(client, plan_requests(mix, args.warmup, args.seed + 1), args.concurrency, None)
+
+        stats = LoadStats()
+        plan = plan_requests(mix, args.requests, args.seed)
+        started = time.perf_counter()
+        if args.rate:
+            await open_loop(client, plan, args.rate, args.concurrency, stats, args.seed)
+        else:
+            await closed_loop(client, plan, args.concurrency, stats)
+        elapsed = time.perf_counter() - started
+
+    report = stats.summary(elapsed)
+    print_report(report, elapsed)
+    ok = report["total"]["errors"] == 0
+    if not ok:
+        print(f"❌ {report['total']['errors']} requests failed")
+
+    # A baseline that does not exist yet is recorded by this run, so the first run on a machine sets it
+    save_to = args.save_baseline or (args.baseline if args.baseline and not pathlib.Path(args.baseline).exists() else None)
+    if save_to:
+        path = pathlib.Path(save_to)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"environment": environment(), "config": config, "results": report}, indent=2) + "\n")
+        print(f"💾 Baseline saved to {save_to}")
+    elif args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text())
+        regressions = compare_baseline(report, config, baseline, args.tolerance)
+        for regression in regressions or []:
+            print(f"❌ Regression: {regression}")
+        if regressions == []:
+            print(f"✅ Within {args.tolerance:.0%} of baseline {args.baseline}")
+        ok = ok and not regressions
+    return ok
+
+
 def main():
     """Main smoke test function."""
-    print("🚀 Starting Neural Terra backend smoke test")
-    
-    # Wait for backend
-    if not wait_for_backend():
-        sys.exit(1)
-    
-    # Test Suez scenario
-    if not test_suez_scenario():
-        sys.exit(1)
-    
-    # Test NL query
-    if not test_nl_query():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default=BASE_URL, help="Backend to test")
+    parser.add_argument("--in-process", action="store_true", help="Serve the app in this process over ASGI (no network)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--load", action="store_true", help="Run the load test instead of the smoke checks")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers (closed loop) or in-flight cap (open loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in req/s (default: closed loop)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (groups: {', '.join(ENDPOINTS)})")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed for the request mix and arrivals")
+    parser.add_argument("--baseline", help="Baseline JSON from this machine to compare against (recorded if missing)")
+    parser.add_argument("--save-baseline", help="Write this run's results as a baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed p95/throughput regression vs baseline")
+    args = parser.parse_args()
+
+    if args.load:
+        print("🚀 Starting Neural Terra backend load test")
+        ok = asyncio.run(run_load(args))
+    else:
+        print("🚀 Starting Neural Terra backend smoke test")
+        ok = asyncio.run(run_smoke(args))
+    if not ok:
         sys.exit(1)
-    
-    print("\n🎉 All smoke tests passed!")
-    print("✅ Backend is ready for production")
+
 
 if __name__ == "__main__":
     main()